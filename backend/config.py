@@ -28,10 +28,118 @@ class Config:
         # Collection names (can remain class-level or move to self. if preferred)
         self.LOGS_COLLECTION_NAME = "logs"
         self.ALERTS_COLLECTION_NAME = "alerts"
+        self.HUNT_RESULTS_COLLECTION_NAME = "hunt_results" # Retro-hunt hits (scripts/retro_hunt.py)
+
+        # At startup (MongoDB only): create the indexes the queries need, then explain() each
+        # query shape and refuse to start if any would still do a collection scan.
+        self.DB_ENSURE_INDEXES = os.getenv("DB_ENSURE_INDEXES", "true").lower() in ("1", "true", "yes")
+        self.DB_VERIFY_QUERY_PLANS = os.getenv("DB_VERIFY_QUERY_PLANS", "true").lower() in ("1", "true", "yes")
+
+        # Storage backend: "mongodb" (MongoDB, falling back to in-memory storage when unreachable)
+        # or "sqlite" (embedded, persistent, WAL mode; for edge deployments and CI).
+        self.DATABASE_BACKEND = os.getenv("DATABASE_BACKEND", "mongodb").lower()
+        self.SQLITE_PATH = os.getenv("SQLITE_PATH", "siem.db")
+        self.SQLITE_CACHE_MB = int(os.getenv("SQLITE_CACHE_MB", 64)) # Page cache per connection
+        self.SQLITE_READ_POOL_SIZE = int(os.getenv("SQLITE_READ_POOL_SIZE", 8)) # Max reader connections (threads share them)
+        self.SQLITE_FTS_ENABLED = os.getenv("SQLITE_FTS_ENABLED", "true").lower() in ("1", "true", "yes") # Message search index
+
+        # Write-behind persistence: buffer log and network flow inserts in memory and
+        # write them in batches from a background thread. Alerts are always synchronous.
+        self.WRITE_BEHIND_ENABLED = os.getenv("WRITE_BEHIND_ENABLED", "false").lower() in ("1", "true", "yes")
+        self.WRITE_BEHIND_BATCH_SIZE = int(os.getenv("WRITE_BEHIND_BATCH_SIZE", 500)) # Flush when this many are waiting
+        self.WRITE_BEHIND_MAX_AGE_MS = int(os.getenv("WRITE_BEHIND_MAX_AGE_MS", 100)) # ...or the oldest has waited this long
+        self.WRITE_BEHIND_CAPACITY = int(os.getenv("WRITE_BEHIND_CAPACITY", 50000)) # Max buffered documents per collection
+        self.WRITE_BEHIND_BLOCK_TIMEOUT_MS = int(os.getenv("WRITE_BEHIND_BLOCK_TIMEOUT_MS", 1000)) # Wait for space before dropping
+        # Write concern for buffered log/flow writes: 1 = acknowledged, 0 = fire-and-forget.
+        self.LOGS_WRITE_CONCERN = int(os.getenv("LOGS_WRITE_CONCERN", 1))
+
+        # Durable spill queue: when set, inserts made while MongoDB is unreachable are appended
+        # to segment files in this directory and replayed in order once it is back.
+        self.SPILL_QUEUE_DIR = os.getenv("SPILL_QUEUE_DIR", "")
+        self.SPILL_SEGMENT_MAX_MB = int(os.getenv("SPILL_SEGMENT_MAX_MB", 64))
+        self.SPILL_FSYNC_INTERVAL_MS = int(os.getenv("SPILL_FSYNC_INTERVAL_MS", 200))
+        self.SPILL_RECONNECT_INTERVAL_SECONDS = float(os.getenv("SPILL_RECONNECT_INTERVAL_SECONDS", 15))
+        self.SPILL_DRAIN_BATCH_SIZE = int(os.getenv("SPILL_DRAIN_BATCH_SIZE", 1000))
+
+        # Time partitioning (MongoDB): logs and network flows go to one collection per day
+        # (logs_YYYYMMDD), and queries only read the days overlapping their time range. After
+        # *_HOT_DAYS a day is moved into a compressed archive segment under PARTITION_ARCHIVE_DIR
+        # (retro-hunts still read it); after *_RETENTION_DAYS it is deleted (0 = never).
+        # Ageing runs every PARTITION_MAINTENANCE_INTERVAL_SECONDS in this process (0 = off; enable
+        # it in one process only, or run scripts/maintain_partitions.py from cron).
+        self.PARTITIONING_ENABLED = os.getenv("PARTITIONING_ENABLED", "false").lower() in ("1", "true", "yes")
+        self.PARTITION_ARCHIVE_DIR = os.getenv("PARTITION_ARCHIVE_DIR", "archive")
+        self.LOGS_HOT_DAYS = int(os.getenv("LOGS_HOT_DAYS", 7))
+        self.LOGS_RETENTION_DAYS = int(os.getenv("LOGS_RETENTION_DAYS", 90))
+        self.NETWORK_FLOWS_HOT_DAYS = int(os.getenv("NETWORK_FLOWS_HOT_DAYS", 3))
+        self.NETWORK_FLOWS_RETENTION_DAYS = int(os.getenv("NETWORK_FLOWS_RETENTION_DAYS", 30))
+        self.PARTITION_MAINTENANCE_INTERVAL_SECONDS = float(os.getenv("PARTITION_MAINTENANCE_INTERVAL_SECONDS", 0))
+
+        # In-memory storage (used when MongoDB is unreachable): max records kept per collection;
+        # the oldest are evicted beyond this (0 = unbounded).
+        self.MEMORY_STORE_CAPACITY = int(os.getenv("MEMORY_STORE_CAPACITY", 1000000))
 
         # Anomaly Detection Configuration
         self.FAILED_LOGIN_THRESHOLD = int(os.getenv("FAILED_LOGIN_THRESHOLD", 3))
         self.FAILED_LOGIN_TIME_WINDOW_SECONDS = int(os.getenv("FAILED_LOGIN_TIME_WINDOW_SECONDS", 60))
+        # Max group_by keys (e.g. distinct source IPs) tracked by threshold rules; the least
+        # recently seen key is evicted beyond this and counted as overflow.
+        self.CORRELATION_MAX_KEYS = int(os.getenv("CORRELATION_MAX_KEYS", 100000))
+
+        # Alert suppression: repeat hits for the same (rule, host, source IP) within the TTL are
+        # folded into the open alert (occurrence_count/log_ids) instead of creating new alerts.
+        self.ALERT_SUPPRESSION_TTL_SECONDS = float(os.getenv("ALERT_SUPPRESSION_TTL_SECONDS", 300)) # 0 disables
+        self.ALERT_SUPPRESSION_MAX_KEYS = int(os.getenv("ALERT_SUPPRESSION_MAX_KEYS", 10000)) # LRU beyond this
+        self.ALERT_SUPPRESSION_FLUSH_INTERVAL_SECONDS = float(os.getenv("ALERT_SUPPRESSION_FLUSH_INTERVAL_SECONDS", 2))
+
+        # Detection stage: stored logs are queued and run through the rules by a pool of worker
+        # threads, so rule evaluation and alert writes stay off the ingest request path.
+        self.DETECTION_WORKERS = int(os.getenv("DETECTION_WORKERS", 2)) # 0 = run rules inline in the request
+        self.DETECTION_QUEUE_SIZE = int(os.getenv("DETECTION_QUEUE_SIZE", 100000)) # Logs beyond this skip detection
+        self.DETECTION_BATCH_SIZE = int(os.getenv("DETECTION_BATCH_SIZE", 500)) # Max logs per worker batch
+
+        # Threat intel: a feed file or directory of feed files (one IP, CIDR or domain per line,
+        # optionally ",description"; "" = disabled). Event source/destination IPs and domains
+        # that match raise an alert. Feeds are re-read when the files change.
+        self.THREAT_INTEL_PATH = os.getenv("THREAT_INTEL_PATH", "")
+        self.THREAT_INTEL_RELOAD_INTERVAL_SECONDS = float(os.getenv("THREAT_INTEL_RELOAD_INTERVAL_SECONDS", 30))
+        self.THREAT_INTEL_SEVERITY = os.getenv("THREAT_INTEL_SEVERITY", "High")
+        self.THREAT_INTEL_BLOOM_ERROR_RATE = float(os.getenv("THREAT_INTEL_BLOOM_ERROR_RATE", 0.01))
+
+        # Network flow analytics, per source IP over tumbling windows: distinct destination ports
+        # (port scan) and IPs (fan-out) via HyperLogLog, bytes vs the previous window via count-min.
+        self.FLOW_WINDOW_SECONDS = float(os.getenv("FLOW_WINDOW_SECONDS", 60))
+        self.FLOW_PORT_SCAN_THRESHOLD = int(os.getenv("FLOW_PORT_SCAN_THRESHOLD", 100)) # Distinct ports per window
+        self.FLOW_FANOUT_THRESHOLD = int(os.getenv("FLOW_FANOUT_THRESHOLD", 50)) # Distinct destination IPs per window
+        self.FLOW_VOLUME_SPIKE_FACTOR = float(os.getenv("FLOW_VOLUME_SPIKE_FACTOR", 10)) # x previous window's bytes
+        self.FLOW_VOLUME_SPIKE_MIN_BYTES = int(os.getenv("FLOW_VOLUME_SPIKE_MIN_BYTES", 10 * 1024 * 1024))
+        self.FLOW_MAX_SOURCES = int(os.getenv("FLOW_MAX_SOURCES", 10000)) # Sources with distinct counters per window
+        self.FLOW_MAX_CLOCK_SKEW_SECONDS = float(os.getenv("FLOW_MAX_CLOCK_SKEW_SECONDS", 5)) # Later flow timestamps are capped at now + this
+
+        # Log rate anomalies: per (host, source, level) logs-per-minute baselines (EWMA mean and
+        # variance, needs NumPy); a minute whose z-score exceeds the threshold raises an alert.
+        self.RATE_ANOMALY_ENABLED = os.getenv("RATE_ANOMALY_ENABLED", "true").lower() in ("1", "true", "yes")
+        self.RATE_ANOMALY_Z_THRESHOLD = float(os.getenv("RATE_ANOMALY_Z_THRESHOLD", 4.0))
+        self.RATE_ANOMALY_ALPHA = float(os.getenv("RATE_ANOMALY_ALPHA", 0.1)) # EWMA weight of the newest minute
+        self.RATE_ANOMALY_MIN_COUNT = int(os.getenv("RATE_ANOMALY_MIN_COUNT", 20)) # Ignore minutes quieter than this
+        self.RATE_ANOMALY_WARMUP_MINUTES = int(os.getenv("RATE_ANOMALY_WARMUP_MINUTES", 30)) # History before alerting
+        self.RATE_ANOMALY_HISTORY_MINUTES = int(os.getenv("RATE_ANOMALY_HISTORY_MINUTES", 60)) # Ring of minute counts
+        self.RATE_ANOMALY_MAX_SERIES = int(os.getenv("RATE_ANOMALY_MAX_SERIES", 50000))
+        self.RATE_ANOMALY_SEVERITY = os.getenv("RATE_ANOMALY_SEVERITY", "Medium")
+
+        # Retro-hunt: logs read per cursor batch when replaying rules over stored logs
+        self.RETRO_HUNT_BATCH_SIZE = int(os.getenv("RETRO_HUNT_BATCH_SIZE", 5000))
+
+        # Rule profiling: per-rule evaluation/match/alert counters are always kept; evaluation time
+        # is measured on 1 in RULE_PROFILE_SAMPLE_EVERY logs (0 = no timing). The top rules are
+        # logged every RULE_PROFILE_SUMMARY_INTERVAL_SECONDS (0 = never) and served at /api/rules/profile.
+        self.RULE_PROFILE_SAMPLE_EVERY = int(os.getenv("RULE_PROFILE_SAMPLE_EVERY", 100))
+        self.RULE_PROFILE_SUMMARY_INTERVAL_SECONDS = float(os.getenv("RULE_PROFILE_SUMMARY_INTERVAL_SECONDS", 300))
+
+        # Detection rule files: a YAML/JSON file or a directory of them ("" = built-in rules).
+        # Changes are picked up by polling every RULES_RELOAD_INTERVAL_SECONDS, without a restart.
+        self.RULES_PATH = os.getenv("RULES_PATH", "")
+        self.RULES_RELOAD_INTERVAL_SECONDS = float(os.getenv("RULES_RELOAD_INTERVAL_SECONDS", 2))
 
         # API Configuration
         # Render provides the PORT environment variable. Ensure it's an integer.
@@ -44,4 +152,19 @@ class Config:
 
         # Log Ingestion Configuration (conceptual)
         self.SYSLOG_LISTENER_PORT = int(os.getenv("SYSLOG_LISTENER_PORT", 514))
-        self.KAFKA_BROKER = os.getenv("KAFKA_BROKER", "localhost:9092")
\ No newline at end of file
+        self.SYSLOG_LISTENER_HOST = os.getenv("SYSLOG_LISTENER_HOST", "0.0.0.0")
+        self.SYSLOG_QUEUE_SIZE = int(os.getenv("SYSLOG_QUEUE_SIZE", 100000)) # Max lines buffered between socket and DB
+        self.SYSLOG_BATCH_SIZE = int(os.getenv("SYSLOG_BATCH_SIZE", 1000)) # Max lines per bulk insert
+        self.SYSLOG_FLUSH_INTERVAL_MS = int(os.getenv("SYSLOG_FLUSH_INTERVAL_MS", 200)) # Max wait to fill a batch
+        self.SYSLOG_UDP_RCVBUF_BYTES = int(os.getenv("SYSLOG_UDP_RCVBUF_BYTES", 8 * 1024 * 1024))
+        self.SYSLOG_MAX_FRAME_BYTES = int(os.getenv("SYSLOG_MAX_FRAME_BYTES", 65536)) # Larger TCP frames close the connection
+        self.KAFKA_BROKER = os.getenv("KAFKA_BROKER", "localhost:9092")
+
+        # Batch Ingestion Configuration
+        # Number of lines parsed, bulk-inserted and run through detection at a time
+        # by the batch ingest endpoint (bounds memory for large streamed bodies).
+        self.INGEST_BATCH_SIZE = int(os.getenv("INGEST_BATCH_SIZE", 1000))
+        # Parser worker processes for bulk ingest (0 or 1 = parse in the request process).
+        # Raise INGEST_BATCH_SIZE along with it so each batch has enough lines to spread out.
+        self.PARSE_WORKERS = int(os.getenv("PARSE_WORKERS", 0))
+        self.PARSE_CHUNK_LINES = int(os.getenv("PARSE_CHUNK_LINES", 2000)) # Max lines per shard sent to a worker
\ No newline at end of file
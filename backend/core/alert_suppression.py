@@ -0,0 +1,152 @@
+# backend/core/alert_suppression.py
+
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from bson import ObjectId
+
+from backend.database.db_client import SiemDatabase
+
+MAX_LOG_IDS_PER_ALERT = 1000 # Only the most recent log ids are kept on a deduplicated alert
+
+
+class AlertSuppressor:
+    """
+    Deduplicates alerts per (rule_name, host, source_ip_host). The first hit creates an alert
+    as usual and opens a suppression window of ttl_seconds for its key; further hits inside
+    the window only bump a pending counter and collect log ids in memory. Pending hits are
+    written every flush_interval_seconds as one $inc/$push update per alert (a single
+    bulk write), so a host repeating the same event costs one alert document, not one per log.
+
+    A miss reserves its key under the lock before returning (an entry with no alert id yet),
+    so workers racing on the same key suppress against the reservation instead of each
+    creating an alert; remember() fills in the alert id once it is inserted, and forget()
+    drops the reservation if the insert failed. Hits on a reservation are held until then.
+
+    Keys live in an OrderedDict in least-recently-hit order: beyond max_keys the least
+    recently hit key is evicted (its pending hits are written first), and expired keys are
+    dropped when they are next looked up.
+    """
+
+    def __init__(self, db_client: SiemDatabase, ttl_seconds: float = 300, max_keys: int = 10000,
+                 flush_interval_seconds: float = 2.0):
+        self.db_client = db_client
+        self.ttl = ttl_seconds
+        self.max_keys = max_keys
+        self.flush_interval = flush_interval_seconds
+        # key -> [alert id (None while reserved), expires at (monotonic), pending count, pending log ids]
+        self._entries: "OrderedDict[Tuple, list]" = OrderedDict()
+        self._unflushed: List[list] = [] # Evicted/expired entries whose pending hits are not written yet
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock() # One flush at a time, so updates for an alert stay in order
+        self._stop = threading.Event()
+        self.stats: Dict[str, int] = {"suppressed": 0, "alerts_tracked": 0, "updates_written": 0,
+                                      "update_failures": 0, "evicted_overflow": 0, "expired": 0,
+                                      "reservations_dropped": 0}
+        self._thread = threading.Thread(target=self._run, name="alert-suppression-flusher", daemon=True)
+        self._thread.start()
+
+    def suppress(self, key: Tuple, log_ids: List[str]) -> bool:
+        """
+        Returns True if key already has an open (or reserved) alert inside its window; the hit
+        is then recorded against that alert. Returns False if a new alert should be created:
+        the key is then reserved for the caller, who must call remember() or forget() next.
+        """
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and now >= entry[1]:
+                del self._entries[key]
+                self.stats["expired"] += 1
+                if entry[2]:
+                    self._unflushed.append(entry)
+                entry = None
+            if entry is None:
+                self._put(key, [None, float("inf"), 0, []]) # Reserved until remember()/forget()
+                return False
+            self._entries.move_to_end(key)
+            entry[2] += 1
+            entry[3].extend(log_ids)
+            if len(entry[3]) > MAX_LOG_IDS_PER_ALERT:
+                del entry[3][:-MAX_LOG_IDS_PER_ALERT]
+            self.stats["suppressed"] += 1
+            return True
+
+    def remember(self, key: Tuple, alert_id: ObjectId):
+        """Opens the suppression window for key after its alert was created."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] is None:
+                # Keep the hits suppressed against the reservation; they are written on the next flush
+                entry[0] = alert_id
+                entry[1] = time.monotonic() + self.ttl
+                self._entries.move_to_end(key)
+            else:
+                self._put(key, [alert_id, time.monotonic() + self.ttl, 0, []])
+            self.stats["alerts_tracked"] += 1
+
+    def forget(self, key: Tuple):
+        """Drops the reservation suppress() made for key when its alert could not be created."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] is None:
+                del self._entries[key]
+                self.stats["reservations_dropped"] += 1
+
+    def _put(self, key: Tuple, entry: list):
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        if len(self._entries) > self.max_keys:
+            _, evicted = self._entries.popitem(last=False) # Least recently hit key
+            self.stats["evicted_overflow"] += 1
+            if evicted[2]:
+                self._unflushed.append(evicted)
+
+    def release_alert(self, alert_id: str):
+        """Ends suppression for an alert (e.g. it was closed), so the next hit opens a new one."""
+        with self._lock:
+            for key, entry in list(self._entries.items()):
+                if str(entry[0]) == alert_id:
+                    del self._entries[key]
+                    if entry[2]:
+                        self._unflushed.append(entry)
+
+    def flush(self) -> int:
+        """Writes all pending hits as one batch of per-alert updates. Returns the number of alerts updated."""
+        with self._flush_lock:
+            with self._lock:
+                # An entry evicted while still reserved has no alert to count its hits on
+                entries = [entry for entry in self._unflushed if entry[0] is not None]
+                self._unflushed = []
+                entries.extend(entry for entry in self._entries.values() if entry[2] and entry[0] is not None)
+                updates = [(entry[0], entry[2], entry[3]) for entry in entries]
+                for entry in entries: # Reset in place; hits arriving from now on go to the next flush
+                    entry[2] = 0
+                    entry[3] = []
+            if not updates:
+                return 0
+            try:
+                updated = self.db_client.update_alert_occurrences(updates, datetime.now(), MAX_LOG_IDS_PER_ALERT)
+            except Exception as e:
+                print(f"ERROR: Failed to write {len(updates)} deduplicated alert updates: {e}")
+                updated = 0
+            with self._lock:
+                self.stats["updates_written"] += updated
+                self.stats["update_failures"] += len(updates) - updated
+            return updated
+
+    def _run(self):
+        while not self._stop.wait(self.flush_interval):
+            self.flush()
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return dict(self.stats, keys=len(self._entries), max_keys=self.max_keys, ttl_seconds=self.ttl)
+
+    def close(self):
+        self._stop.set()
+        self._thread.join()
+        self.flush()
@@ -0,0 +1,85 @@
+# backend/core/correlation.py
+
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Any, Dict, List, Optional
+
+from backend.database.models import LogEntry
+
+
+class ThresholdCorrelator:
+    """
+    In-memory sliding-window counter for threshold rules ("threshold_count" matching logs
+    within "threshold_time_window_minutes", counted per "group_by" key).
+
+    Each (rule, group key) owns a ring buffer (deque with maxlen = threshold_count) of
+    (event time, log id). Once the buffer is full and its oldest event is still inside the
+    window, the threshold is crossed: the buffered log ids are returned for the alert and
+    the window starts over. Buffers never hold more than threshold_count events.
+
+    Keys are kept in least-recently-seen order, which bounds memory in two ways:
+      - keys not seen for longer than their window are swept out (they can no longer fire)
+      - beyond max_keys, the least recently seen key is evicted and counted as overflow
+    """
+
+    def __init__(self, max_keys: int = 100000, sweep_interval_seconds: float = 10.0):
+        self.max_keys = max_keys
+        self.sweep_interval = sweep_interval_seconds
+        # (rule name, count, window, group values) -> [ring buffer, window seconds, last seen (monotonic)]
+        self._windows: "OrderedDict[tuple, list]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._next_sweep = time.monotonic() + sweep_interval_seconds
+        self.stats: Dict[str, int] = {"observed": 0, "fired": 0, "evicted_idle": 0, "evicted_overflow": 0}
+
+    def observe(self, rule: Dict[str, Any], log_entry: LogEntry) -> Optional[List[str]]:
+        """
+        Records one matching log for a threshold rule. Returns the ids of every contributing
+        log when this log crosses the threshold, otherwise None.
+        """
+        threshold = rule.get("threshold_count", 1)
+        window_seconds = rule.get("threshold_time_window_minutes", 5) * 60
+        # count and window are part of the key: a reload that changes them starts fresh windows
+        # (the old buffers, sized for the old count, age out in the idle sweep)
+        key = (rule["name"], threshold, window_seconds) + tuple(getattr(log_entry, field, None) for field in rule.get("group_by", ()))
+        event_time = log_entry.timestamp.timestamp()
+        now = time.monotonic()
+
+        with self._lock:
+            self.stats["observed"] += 1
+            state = self._windows.get(key)
+            if state is None:
+                state = [deque(maxlen=threshold), window_seconds, now]
+                self._windows[key] = state
+                if len(self._windows) > self.max_keys:
+                    self._windows.popitem(last=False) # Least recently seen key
+                    self.stats["evicted_overflow"] += 1
+            else:
+                state[2] = now
+                self._windows.move_to_end(key)
+            events = state[0]
+            events.append((event_time, str(log_entry._id)))
+
+            fired = None
+            if len(events) == threshold and events[-1][0] - events[0][0] <= window_seconds:
+                fired = [log_id for _, log_id in events]
+                events.clear() # Start a new window so the same burst does not re-fire per log
+                self.stats["fired"] += 1
+
+            if now >= self._next_sweep:
+                self._sweep_idle(now)
+            return fired
+
+    def _sweep_idle(self, now: float):
+        """Drops keys idle for longer than their window. Oldest-seen keys come first, so this stops early."""
+        while self._windows:
+            key, (_, window_seconds, last_seen) = next(iter(self._windows.items()))
+            if now - last_seen <= window_seconds:
+                break
+            del self._windows[key]
+            self.stats["evicted_idle"] += 1
+        self._next_sweep = now + self.sweep_interval
+
+    def get_stats(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self.stats, keys=len(self._windows), max_keys=self.max_keys)
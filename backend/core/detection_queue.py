@@ -0,0 +1,169 @@
+# backend/core/detection_queue.py
+
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, List, Optional
+
+from backend.core.detection_rules import DetectionRules
+from backend.database.models import LogEntry
+
+
+class DetectionStage:
+    """
+    Runs detection rules off the request path. Callers submit logs once they are stored;
+    a pool of worker threads pulls them off a bounded queue in batches of up to batch_size,
+    so a slow rule or a slow alert write no longer adds to ingest latency.
+    Workers match their batches concurrently (DetectionRules.match_logs, stateless), but apply
+    the matches (alerts, threshold/sequence correlation, rate baselines) one batch at a time
+    in the order the batches were taken off the queue, so the correlators see logs in
+    arrival order whatever the number of workers.
+    When the queue is full, submit() drops the log (it is already stored, only its
+    detection is skipped) and counts it. With workers=0 rules run inline in submit().
+    """
+
+    def __init__(self, rules_engine: DetectionRules, workers: int = 2, capacity: int = 100000,
+                 batch_size: int = 500):
+        self.rules_engine = rules_engine
+        self.workers = workers
+        self.capacity = capacity
+        self.batch_size = batch_size
+
+        self._pending = deque() # (enqueued_at, log_entry) pairs in arrival order
+        self._lock = threading.Lock()
+        self._not_empty = threading.Condition(self._lock)
+        self._drained = threading.Condition(self._lock)
+        self._in_flight = 0 # Logs popped by a worker whose batch has not finished yet
+        self._taken = 0 # Batches taken off the queue so far...
+        self._applied = 0 # ...and applied: batch n is applied once batches 0..n-1 are
+        self._apply_turn = threading.Condition(self._lock)
+        self._closed = False
+
+        self.stats: Dict[str, Any] = {
+            "enqueued": 0,
+            "processed": 0,
+            "dropped": 0,
+            "batches": 0,
+            "rule_failures": 0,
+            "max_depth": 0,
+            "last_lag_ms": 0.0, # Queue wait of the oldest log in the last batch
+            "max_lag_ms": 0.0,
+        }
+
+        self._threads = [threading.Thread(target=self._run, name=f"detection-worker-{n}", daemon=True)
+                         for n in range(workers)]
+        for thread in self._threads:
+            thread.start()
+
+    def submit(self, log_entry: LogEntry) -> bool:
+        """Queues one stored log for detection. Returns False if it was dropped."""
+        return self.submit_many([log_entry]) == 1
+
+    def submit_many(self, log_entries: List[LogEntry]) -> int:
+        """
+        Queues stored logs for detection. Logs without an _id (failed inserts) are skipped so
+        alerts never reference missing logs. Returns the number of logs accepted.
+        """
+        log_entries = [log_entry for log_entry in log_entries if log_entry._id is not None]
+        if not log_entries:
+            return 0
+        if not self.workers:
+            started = time.monotonic()
+            self._record(len(log_entries), self.rules_engine.run_rules_on_logs(log_entries), started)
+            return len(log_entries)
+        now = time.monotonic()
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("Detection stage is closed.")
+            room = max(0, self.capacity - len(self._pending))
+            accepted = log_entries[:room]
+            self._pending.extend((now, log_entry) for log_entry in accepted)
+            self.stats["enqueued"] += len(accepted)
+            self.stats["dropped"] += len(log_entries) - len(accepted)
+            if len(self._pending) > self.stats["max_depth"]:
+                self.stats["max_depth"] = len(self._pending)
+            if accepted:
+                self._not_empty.notify(min(len(accepted), self.workers))
+        return len(accepted)
+
+    def join(self, timeout: Optional[float] = None) -> bool:
+        """Blocks until every queued log has been run through the rules."""
+        with self._lock:
+            return self._drained.wait_for(lambda: not self._pending and not self._in_flight, timeout)
+
+    def close(self, timeout: Optional[float] = None):
+        """Processes what is left and stops the workers."""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._not_empty.notify_all()
+        for thread in self._threads:
+            thread.join(timeout)
+
+    def depth(self) -> int:
+        return len(self._pending)
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self.stats)
+            stats["depth"] = len(self._pending)
+            stats["in_flight"] = self._in_flight
+            stats["capacity"] = self.capacity
+            stats["workers"] = self.workers
+            # Current lag: how long the oldest waiting log has been queued
+            stats["lag_ms"] = round((time.monotonic() - self._pending[0][0]) * 1000, 1) if self._pending else 0.0
+        return stats
+
+    def _next_batch(self) -> Optional[tuple]:
+        """
+        Waits for queued logs and pops up to batch_size of them, with the batch's position in
+        the apply order. Returns None when closed and drained.
+        """
+        with self._lock:
+            while not self._pending:
+                if self._closed:
+                    return None
+                self._not_empty.wait()
+            count = min(self.batch_size, len(self._pending))
+            batch = [self._pending.popleft() for _ in range(count)]
+            self._in_flight += count
+            turn = self._taken
+            self._taken += 1
+            return turn, batch
+
+    def _record(self, count: int, failed: int, oldest_enqueued_at: float):
+        lag_ms = round((time.monotonic() - oldest_enqueued_at) * 1000, 1)
+        with self._lock:
+            self.stats["batches"] += 1
+            self.stats["processed"] += count - failed
+            self.stats["rule_failures"] += failed
+            self.stats["last_lag_ms"] = lag_ms
+            if lag_ms > self.stats["max_lag_ms"]:
+                self.stats["max_lag_ms"] = lag_ms
+
+    def _run(self):
+        while True:
+            next_batch = self._next_batch()
+            if next_batch is None:
+                return
+            turn, batch = next_batch
+            log_entries = [log_entry for _, log_entry in batch]
+            failed = 0
+            try:
+                matched, failed = self.rules_engine.match_logs(log_entries) # Concurrently with other workers
+                with self._lock:
+                    self._apply_turn.wait_for(lambda: self._applied == turn)
+                failed += self.rules_engine.apply_matches(matched) # One batch at a time, in queue order
+            except Exception as e:
+                print(f"ERROR: Detection stage failed to run rules on a batch of {len(log_entries)}: {e}")
+                failed = len(log_entries)
+            finally:
+                with self._lock:
+                    self._apply_turn.wait_for(lambda: self._applied == turn) # Also when matching failed
+                    self._applied += 1
+                    self._apply_turn.notify_all()
+                    self._in_flight -= len(batch)
+                    if not self._pending and not self._in_flight:
+                        self._drained.notify_all()
+            self._record(len(log_entries), failed, batch[0][0])
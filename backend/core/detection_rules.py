@@ -1,24 +1,94 @@
 from backend.database.db_client import SiemDatabase
-from backend.database.models import LogEntry, Alert # Ensure Alert is imported
+from backend.database.models import LogEntry, Alert, NetworkFlowEntry # Ensure Alert is imported
 from backend.config import Config
+from backend.core.alert_suppression import AlertSuppressor
+from backend.core.correlation import ThresholdCorrelator
+from backend.core.sequence_correlation import SequenceCorrelator
+from backend.core.flow_analytics import FlowAnalytics
+from backend.core.rate_anomaly import RateAnomalyDetector
+from backend.core.rule_loader import RuleFileError, RuleFileWatcher, load_rules
+from backend.core.rule_profiler import RuleProfiler
+from backend.core.threat_intel import ThreatIntel
 from datetime import datetime, timedelta
+import time
 from typing import List, Dict, Any, Optional
 
 class DetectionRules:
     def __init__(self, db_client: SiemDatabase, config: Config):
         self.db_client = db_client
         self.config = config
-        self.rules = self._load_rules()
+        # Sliding-window state for threshold rules (those without "alert_immediately")
+        self.correlator = ThresholdCorrelator(max_keys=config.CORRELATION_MAX_KEYS if config else 100000)
+        # Partial matches of sequence rules (those with "sequence"), indexed per step and key
+        self.sequences = SequenceCorrelator(max_keys=config.CORRELATION_MAX_KEYS if config else 100000)
+        # Folds repeat alerts per (rule, host, source IP) into the open alert (None = disabled)
+        self.suppressor = None
+        if config is not None and config.ALERT_SUPPRESSION_TTL_SECONDS > 0:
+            self.suppressor = AlertSuppressor(db_client, config.ALERT_SUPPRESSION_TTL_SECONDS,
+                                              config.ALERT_SUPPRESSION_MAX_KEYS,
+                                              config.ALERT_SUPPRESSION_FLUSH_INTERVAL_SECONDS)
+        # IoC feeds checked against every log's source/destination (None = no feeds configured)
+        self.threat_intel = None
+        if config is not None and config.THREAT_INTEL_PATH:
+            self.threat_intel = ThreatIntel(config.THREAT_INTEL_PATH, config.THREAT_INTEL_RELOAD_INTERVAL_SECONDS,
+                                            config.THREAT_INTEL_BLOOM_ERROR_RATE)
+            self.threat_intel.start()
+        # Port scan / fan-out / volume spike detection over network flows
+        if config is not None:
+            self.flow_analytics = FlowAnalytics(config.FLOW_WINDOW_SECONDS, config.FLOW_PORT_SCAN_THRESHOLD,
+                                                config.FLOW_FANOUT_THRESHOLD, config.FLOW_VOLUME_SPIKE_FACTOR,
+                                                config.FLOW_VOLUME_SPIKE_MIN_BYTES, config.FLOW_MAX_SOURCES,
+                                                max_clock_skew_seconds=config.FLOW_MAX_CLOCK_SKEW_SECONDS)
+        else:
+            self.flow_analytics = FlowAnalytics()
+        # Per (host, source, level) logs-per-minute baselines, scored once a minute (None = disabled)
+        self.rate_anomaly = None
+        if config is not None and config.RATE_ANOMALY_ENABLED:
+            try:
+                self.rate_anomaly = RateAnomalyDetector(
+                    self._raise_rate_anomalies, config.RATE_ANOMALY_Z_THRESHOLD, config.RATE_ANOMALY_ALPHA,
+                    config.RATE_ANOMALY_MIN_COUNT, config.RATE_ANOMALY_WARMUP_MINUTES,
+                    config.RATE_ANOMALY_HISTORY_MINUTES, config.RATE_ANOMALY_MAX_SERIES
+                )
+            except RuntimeError as e:
+                print(f"WARNING: Rate anomaly detection disabled: {e}")
+        # Per-rule evaluations, matches, alerts and sampled evaluation time
+        if config is not None:
+            self.profiler = RuleProfiler(config.RULE_PROFILE_SAMPLE_EVERY, config.RULE_PROFILE_SUMMARY_INTERVAL_SECONDS)
+        else:
+            self.profiler = RuleProfiler()
+        self.rule_watcher = None
+        rules = self._load_rules()
+        if config is not None and config.RULES_PATH:
+            # NEW: Rules from YAML/JSON files, recompiled and swapped in whenever the files change.
+            # Threshold state is keyed by rule name, count and window, so it survives reloads
+            # that leave a rule's threshold alone and restarts for rules whose threshold changed.
+            try:
+                rules = load_rules(config.RULES_PATH)
+                print(f"Detection rules loaded from {config.RULES_PATH}: {len(rules)} rules.")
+            except RuleFileError as e:
+                print(f"ERROR: Could not load rules from {config.RULES_PATH}, using built-in rules: {e}")
+            self.rule_watcher = RuleFileWatcher(config.RULES_PATH, self.set_rules, config.RULES_RELOAD_INTERVAL_SECONDS)
+            self.rule_watcher.start()
+        self.set_rules(rules)
+        self.profiler.start_summary(self.get_rule_profile)
 
     def _load_rules(self) -> List[Dict[str, Any]]:
         """
-        Loads detection rules. In a real scenario, this might load from a file,
-        database, or external service. For now, hardcoded.
+        Built-in detection rules, used when Config.RULES_PATH is not set
+        (rules/detection_rules.yaml holds the same rules in rule-file form).
+        Rules are declarative so they can be indexed:
+          - "match": exact field equality ({"level": ..., "source": ...}); omitted fields match anything
+          - "message_contains": substrings that must all appear in the message (case-insensitive)
+          - "condition": optional extra callable(log) for anything the above cannot express
+        A "sequence" rule fires on ordered events instead: {"within_minutes": N, "steps": [...]},
+        each step having the fields above plus "key" (the log field its events are grouped on)
+        and an optional "count".
         """
         return [
             {
                 "name": "Multiple Failed Logins",
-                "condition": lambda log: log.level == "AUTH_FAILED" and log.source == "Authentication",
+                "match": {"level": "AUTH_FAILED", "source": "Authentication"},
                 "threshold_count": 3, # e.g., 3 failed logins
                 "threshold_time_window_minutes": 5, # within 5 minutes
                 "severity": "High",
@@ -27,65 +97,311 @@ class DetectionRules:
             },
             {
                 "name": "Unauthorized Data Export",
-                "condition": lambda log: log.level == "CRITICAL" and "unauthorized data export" in log.message.lower(),
+                "match": {"level": "CRITICAL"},
+                "message_contains": ["unauthorized data export"],
                 "severity": "Critical",
                 "description_template": "Unauthorized data export attempt detected from {source_ip_host} on {host}.",
                 "alert_immediately": True # This rule triggers an alert immediately
             },
+            {
+                "name": "Brute Force Followed By Data Export",
+                "sequence": {
+                    "within_minutes": 30,
+                    "steps": [
+                        # Repeated failures from one IP...
+                        {"match": {"level": "AUTH_FAILED", "source": "Authentication"}, "key": "source_ip_host", "count": 3},
+                        # ...then a successful login from that IP...
+                        {"match": {"source": "Authentication"}, "message_contains": ["accepted password"], "key": "source_ip_host"},
+                        # ...then a data export on the host it logged into
+                        {"match": {"level": "CRITICAL"}, "message_contains": ["unauthorized data export"], "key": "host"}
+                    ]
+                },
+                "severity": "Critical",
+                "description_template": "Failed logins, a successful login and a data export on {host} in sequence (last from {source_ip_host})."
+            },
             {
                 "name": "Ransomware Activity Detected",
-                "condition": lambda log: log.level == "CRITICAL" and "ransomware activity detected" in log.message.lower(),
+                "match": {"level": "CRITICAL"},
+                "message_contains": ["ransomware activity detected"],
                 "severity": "Critical",
                 "description_template": "Ransomware activity detected and blocked on {host} at {raw_log_short}.",
                 "alert_immediately": True
             },
             {
                 "name": "Suspicious Outbound Network Flow",
-                "condition": lambda log: log.source == "Network Flow" and log.level == "ALERT" and "suspicious high volume outbound connections" in log.message.lower(),
+                "match": {"source": "Network Flow", "level": "ALERT"},
+                "message_contains": ["suspicious high volume outbound connections"],
                 "severity": "High",
                 "description_template": "Suspicious high volume outbound network connections detected from {source_ip_host}.",
                 "alert_immediately": True
             },
             {
                 "name": "Low Disk Space Alert",
-                "condition": lambda log: log.source == "System Monitor" and log.level == "WARN" and "low disk space" in log.message.lower(),
+                "match": {"source": "System Monitor", "level": "WARN"},
+                "message_contains": ["low disk space"],
                 "severity": "Medium",
                 "description_template": "Low disk space detected on host {host} at {raw_log_short}.",
                 "alert_immediately": True
             },
             {
                 "name": "SSL Certificate Nearing Expiry",
-                "condition": lambda log: log.source == "Certificate Monitor" and log.level == "WARN" and "ssl certificate" in log.message.lower() and "expires in" in log.message.lower(),
+                "match": {"source": "Certificate Monitor", "level": "WARN"},
+                "message_contains": ["ssl certificate", "expires in"],
                 "severity": "Medium",
                 "description_template": "SSL certificate {message_snippet} is nearing expiry on {host}.",
                 "alert_immediately": True
             }
         ]
 
+    def set_rules(self, rules: List[Dict[str, Any]]):
+        """
+        Replaces the rule set and rebuilds the dispatch index. The new index is built first and
+        swapped in with one assignment, so concurrent rule runs see either the old or the new set.
+        """
+        rule_index: Dict[tuple, list] = {}
+        for position, rule in enumerate(rules):
+            # A sequence rule is indexed once per step; a matched step comes back as a
+            # {"sequence_rule": rule, "step": i} entry and is routed to the SequenceCorrelator.
+            # Its steps share the rule name, which the profiler counts once per log.
+            if "sequence" in rule:
+                entries = [((position, index), {"sequence_rule": rule, "step": index}, step)
+                           for index, step in enumerate(rule["sequence"]["steps"])]
+            else:
+                entries = [((position, 0), rule, rule)]
+            for order, entry, matcher in entries:
+                match = matcher.get("match", {})
+                key = (match.get("level"), match.get("source")) # None = wildcard
+                substrings = tuple(substring.lower() for substring in matcher.get("message_contains", ()))
+                rule_index.setdefault(key, []).append((order, rule["name"], entry, substrings, matcher.get("condition")))
+        if hasattr(self, "_dispatch"):
+            self._fold_profile(self._dispatch[1]) # Against the index those logs were dispatched with
+        self._dispatch = (rule_index, {})
+        self.rules = rules
+
+    def _candidate_slot(self, level: str, source: str) -> list:
+        """
+        [candidates, logs dispatched, rule names] for a (level, source) pair (cached per pair). The
+        candidates are the rules whose level/source equality predicates accept the pair, in rule
+        order; the count is the profiler's evaluation counter, handed over by _fold_profile for
+        each distinct rule name (a sequence rule's steps are one rule to the profiler).
+        """
+        rule_index, slots = self._dispatch
+        slot = slots.get((level, source))
+        if slot is None:
+            candidates = sorted(
+                rule_index.get((level, source), []) + rule_index.get((level, None), []) +
+                rule_index.get((None, source), []) + rule_index.get((None, None), []),
+                key=lambda compiled: compiled[0]
+            )
+            if len(slots) >= 4096: # Bound the cache against unbounded level/source values
+                self._fold_profile(slots)
+                slots.clear()
+            slot = [candidates, 0, list(dict.fromkeys(name for _, name, _, _, _ in candidates))]
+            slots[(level, source)] = slot
+        return slot
+
+    def _fold_profile(self, slots: Dict[tuple, list]):
+        """Hands the per-pair log counts to the profiler as per-rule evaluations."""
+        evaluated = []
+        for slot in list(slots.values()):
+            count, slot[1] = slot[1], 0
+            if count:
+                evaluated.append((slot[2], count))
+        self.profiler.fold_evaluations(evaluated)
+
+    def matching_rules(self, log_entry: LogEntry, timed: bool = False) -> List[Dict[str, Any]]:
+        """
+        Rules matched by a log. Only the candidates for its (level, source) pair are evaluated,
+        and every message predicate reads one shared lowercase copy of the message.
+        Sequence rules show up as one {"sequence_rule": rule, "step": i} entry per matched step.
+        Evaluations and matches are counted for the profiler; with timed, each candidate's
+        evaluation is timed too.
+        """
+        slot = self._candidate_slot(log_entry.level, log_entry.source)
+        slot[1] += 1
+        candidates = slot[0]
+        if timed:
+            return self._matching_rules_timed(log_entry, candidates)
+        hits = []
+        message_lower = None
+        for candidate in candidates:
+            _, _, _, substrings, condition = candidate
+            if substrings:
+                if message_lower is None:
+                    message_lower = log_entry.message.lower()
+                if not all(substring in message_lower for substring in substrings):
+                    continue
+            if condition is not None and not condition(log_entry):
+                continue
+            hits.append(candidate)
+        if not hits:
+            return hits
+        self.profiler.record_matches(list(dict.fromkeys(name for _, name, _, _, _ in hits)))
+        return [rule for _, _, rule, _, _ in hits]
+
+    def _matching_rules_timed(self, log_entry: LogEntry, candidates: list) -> List[Dict[str, Any]]:
+        """matching_rules for a sampled log: the same evaluation, with each candidate timed."""
+        matched = []
+        matched_names = {}
+        timings: Dict[str, int] = {} # Per rule name: a sequence rule's steps add up to one timing
+        message_lower = log_entry.message.lower() # Shared by all candidates, so not charged to any one rule
+        for _, name, rule, substrings, condition in candidates:
+            started = time.perf_counter_ns()
+            hit = all(substring in message_lower for substring in substrings) and (condition is None or condition(log_entry))
+            timings[name] = timings.get(name, 0) + time.perf_counter_ns() - started
+            if hit:
+                matched.append(rule)
+                matched_names[name] = None
+        self.profiler.record_matches(list(matched_names))
+        self.profiler.record_timings(list(timings.items()))
+        return matched
+
+    def get_rule_profile(self) -> List[Dict[str, Any]]:
+        """Per-rule counters and timing from the profiler, most expensive rules first."""
+        self._fold_profile(self._dispatch[1])
+        return self.profiler.get_stats()
+
     def run_rules_on_log(self, log_entry: LogEntry):
         """
         Runs all configured detection rules against a single LogEntry.
         """
         print(f"Running rules on log: {log_entry.message[:50]}...") # Debug print
+        self._run_rules(log_entry, bool(self.profiler.sample_positions(1)))
 
-        for rule in self.rules:
-            if rule["condition"](log_entry):
-                if rule.get("alert_immediately"):
+    def _run_rules(self, log_entry: LogEntry, timed: bool = False):
+        self._apply_rules(log_entry, self.matching_rules(log_entry, timed))
+
+    def _apply_rules(self, log_entry: LogEntry, matched_rules: List[Dict[str, Any]]):
+        """Raises alerts for a log's matched rules and feeds the stateful detectors (correlators, rates)."""
+        sequence_steps: Dict[str, tuple] = {} # rule name -> (rule, matched step indexes)
+        for rule in matched_rules:
+            if "sequence_rule" in rule:
+                sequence_steps.setdefault(rule["sequence_rule"]["name"], (rule["sequence_rule"], []))[1].append(rule["step"])
+            elif rule.get("alert_immediately"):
+                description = self._format_description(rule["description_template"], log_entry)
+                self._create_and_save_alert(
+                    severity=rule["severity"],
+                    description=description,
+                    source_ip_host=log_entry.source_ip_host,
+                    rule_name=rule["name"],
+                    log_ids=[str(log_entry._id)], # Associate with the log that triggered it
+                    host=log_entry.host
+                )
+            else:
+                # Threshold rule: count the match per group_by key; alert once the window fills up
+                log_ids = self.correlator.observe(rule, log_entry)
+                if log_ids:
                     description = self._format_description(rule["description_template"], log_entry)
                     self._create_and_save_alert(
                         severity=rule["severity"],
                         description=description,
                         source_ip_host=log_entry.source_ip_host,
                         rule_name=rule["name"],
-                        log_ids=[str(log_entry._id)] # Associate with the log that triggered it
+                        log_ids=log_ids, # Every log that contributed to crossing the threshold
+                        host=log_entry.host
                     )
-                else:
-                    # For threshold-based rules, we'd typically store the log
-                    # and then have a separate process aggregate and check thresholds.
-                    # For simplicity, we'll just log if a threshold rule condition is met.
-                    # A full SIEM would use a stateful correlation engine here.
-                    # print(f"  Rule '{rule['name']}' matched, but requires aggregation.")
-                    pass
+        for rule, step_indexes in sequence_steps.values():
+            log_ids = self.sequences.observe(rule, step_indexes, log_entry)
+            if log_ids:
+                self._create_and_save_alert(
+                    severity=rule["severity"],
+                    description=self._format_description(rule["description_template"], log_entry),
+                    source_ip_host=log_entry.source_ip_host,
+                    rule_name=rule["name"],
+                    log_ids=log_ids, # Every log in the sequence, in order
+                    host=log_entry.host
+                )
+        if self.rate_anomaly is not None:
+            self.rate_anomaly.observe(log_entry)
+        if self.threat_intel is not None:
+            for hit in self.threat_intel.match_log(log_entry):
+                self._create_and_save_alert(
+                    severity=self.config.THREAT_INTEL_SEVERITY,
+                    description=f"Threat intel match: {hit['value']} ({hit['field']}) is listed as {hit['indicator']} "
+                                f"in feed '{hit['feed']}'" + (f" ({hit['description']})" if hit['description'] else "") +
+                                f" on {log_entry.host}.",
+                    source_ip_host=log_entry.source_ip_host,
+                    rule_name=f"Threat Intel: {hit['feed']}",
+                    log_ids=[str(log_entry._id)],
+                    host=log_entry.host
+                )
+
+    def run_rules_on_logs(self, log_entries: List[LogEntry]) -> int:
+        """
+        Runs all configured detection rules against a batch of LogEntry objects.
+        Logs without an _id (failed inserts) are skipped so alerts never reference missing logs.
+        Returns the number of logs whose rules raised an error (the rest of the batch still runs).
+        """
+        matched, failed = self.match_logs(log_entries)
+        return failed + self.apply_matches(matched)
+
+    def match_logs(self, log_entries: List[LogEntry]) -> tuple:
+        """
+        The stateless half of run_rules_on_logs: ([(log, matched rules)], failed count). It touches
+        no correlation state, so batches can be matched concurrently (see DetectionStage).
+        """
+        log_entries = [log_entry for log_entry in log_entries if log_entry._id is not None]
+        timed = self.profiler.sample_positions(len(log_entries))
+        matched, failed = [], 0
+        for position, log_entry in enumerate(log_entries):
+            try:
+                matched.append((log_entry, self.matching_rules(log_entry, position in timed)))
+            except Exception as e:
+                print(f"ERROR: Rule matching failed for log {log_entry._id}: {e}")
+                failed += 1
+        return matched, failed
+
+    def apply_matches(self, matched: List[tuple]) -> int:
+        """
+        The stateful half: alerts, threshold/sequence correlation and rate baselines, in log
+        order. Correlators assume events arrive in order, so batches must be applied one at a
+        time in arrival order. Returns the number of logs that raised an error.
+        """
+        failed = 0
+        for log_entry, matched_rules in matched:
+            try:
+                self._apply_rules(log_entry, matched_rules)
+            except Exception as e:
+                print(f"ERROR: Detection failed for log {log_entry._id}: {e}")
+                failed += 1
+        return failed
+
+    def _raise_rate_anomalies(self, anomalies: List[Dict[str, Any]]):
+        """Alerts for the series RateAnomalyDetector flagged in its last scoring pass."""
+        for anomaly in anomalies:
+            self._create_and_save_alert(
+                severity=self.config.RATE_ANOMALY_SEVERITY,
+                description=f"Unusual log rate: {anomaly['count']} {anomaly['level']} logs from {anomaly['source']} "
+                            f"on {anomaly['host']} in one minute (baseline {anomaly['baseline_mean']:g} "
+                            f"± {anomaly['baseline_std']:g}, z-score {anomaly['z_score']:g}).",
+                source_ip_host=None,
+                rule_name="Log Rate Anomaly",
+                log_ids=[],
+                host=anomaly["host"]
+            )
+
+    FLOW_DETECTIONS = {
+        "port_scan": ("Port Scan Detected", "High", "{source_ip} contacted {value} distinct destination ports"),
+        "fanout": ("Network Fan-Out Detected", "Medium", "{source_ip} contacted {value} distinct destination IPs"),
+        "volume_spike": ("Network Volume Spike", "Medium", "{source_ip} sent {value} bytes (previous window x{factor:g} = {threshold})"),
+    }
+
+    def run_rules_on_flow(self, flow_entry: NetworkFlowEntry):
+        """
+        Feeds a stored NetworkFlowEntry to the flow analytics and raises an alert for each
+        detection it triggers (at most once per source and kind per window).
+        """
+        for detection in self.flow_analytics.observe(flow_entry):
+            rule_name, severity, template = self.FLOW_DETECTIONS[detection["kind"]]
+            description = template.format(factor=self.flow_analytics.volume_spike_factor, **detection)
+            self._create_and_save_alert(
+                severity=severity,
+                description=f"{description} within {self.flow_analytics.window_seconds:g}s.",
+                source_ip_host=flow_entry.source_ip,
+                rule_name=rule_name,
+                log_ids=[str(flow_entry._id)] if flow_entry._id else [], # The flow that crossed the threshold
+                host=flow_entry.source_ip
+            )
 
     def _format_description(self, template: str, log_entry: LogEntry) -> str:
         """Formats the alert description using log_entry attributes."""
@@ -103,10 +419,18 @@ class DetectionRules:
         }
         return template.format(**attrs)
 
-    def _create_and_save_alert(self, severity: str, description: str, source_ip_host: Optional[str], rule_name: str, log_ids: List[str]):
+    def _create_and_save_alert(self, severity: str, description: str, source_ip_host: Optional[str], rule_name: str,
+                               log_ids: List[str], host: Optional[str] = None):
         """
-        Creates an Alert object and saves it to the database.
+        Creates an Alert object and saves it to the database, unless an alert for the same
+        (rule, host, source IP) is still inside its suppression window: the hit is then
+        counted on that alert instead.
         """
+        suppression_key = (rule_name, host, source_ip_host)
+        if self.suppressor is not None and self.suppressor.suppress(suppression_key, log_ids):
+            self.profiler.record_alert(rule_name, suppressed=True)
+            return
+
         new_alert = Alert(
             timestamp=datetime.now(),
             severity=severity,
@@ -118,10 +442,20 @@ class DetectionRules:
         )
         
         # CORRECTED LINE: Pass the Alert object directly, not its dictionary
-        inserted_id = self.db_client.insert_alert(new_alert)
+        try:
+            inserted_id = self.db_client.insert_alert(new_alert)
+        except Exception:
+            if self.suppressor is not None:
+                self.suppressor.forget(suppression_key)
+            raise
         if inserted_id:
             print(f"  ALERT GENERATED: Rule '{rule_name}' triggered. Severity: {severity}, ID: {inserted_id}")
             new_alert._id = inserted_id # Assign the DB-generated ID back to the object
+            self.profiler.record_alert(rule_name)
+            if self.suppressor is not None:
+                self.suppressor.remember(suppression_key, inserted_id)
         else:
             print(f"  WARNING: Failed to save alert for rule '{rule_name}'.")
+            if self.suppressor is not None:
+                self.suppressor.forget(suppression_key)
 
@@ -0,0 +1,188 @@
+# backend/core/flow_analytics.py
+
+import math
+import threading
+import time
+from array import array
+from typing import Any, Dict, List, Optional
+
+from backend.database.models import NetworkFlowEntry
+
+MASK_64 = 0xFFFFFFFFFFFFFFFF
+
+
+def _mix64(value: int) -> int:
+    """SplitMix64 finalizer: spreads Python's hash() bits over all 64 bits."""
+    value = (value + 0x9E3779B97F4A7C15) & MASK_64
+    value = ((value ^ (value >> 30)) * 0xBF58476D1CE4E5B9) & MASK_64
+    value = ((value ^ (value >> 27)) * 0x94D049BB133111EB) & MASK_64
+    return value ^ (value >> 31)
+
+
+class HyperLogLog:
+    """
+    Distinct-count estimator in 2**precision one-byte registers (256 bytes at the default
+    precision of 8, about 6.5% standard error). add() reports whether a register changed,
+    so callers only need to re-estimate when the count can actually have moved.
+    """
+
+    def __init__(self, precision: int = 8):
+        self.precision = precision
+        self.register_count = 1 << precision
+        self._registers = bytearray(self.register_count)
+        self._alpha = 0.7213 / (1 + 1.079 / self.register_count)
+
+    def add(self, item: Any) -> bool:
+        h = _mix64(hash(item))
+        index = h >> (64 - self.precision)
+        remaining = (h << self.precision) & MASK_64
+        rank = 65 - remaining.bit_length() if remaining else 65 - self.precision # Leading zeros + 1
+        if rank > self._registers[index]:
+            self._registers[index] = rank
+            return True
+        return False
+
+    def count(self) -> int:
+        registers = self._registers
+        estimate = self._alpha * self.register_count ** 2 / sum(2.0 ** -register for register in registers)
+        if estimate <= 2.5 * self.register_count:
+            zeros = registers.count(0)
+            if zeros:
+                estimate = self.register_count * math.log(self.register_count / zeros) # Linear counting
+        return int(round(estimate))
+
+
+class CountMinSketch:
+    """
+    Fixed-size frequency sketch: depth rows of width counters. estimate() never
+    under-counts and over-counts by at most ~e/width of the total with probability
+    1 - e**-depth.
+    """
+
+    def __init__(self, width: int = 2048, depth: int = 4):
+        self.width = width
+        self.depth = depth
+        self._rows = [array('q', [0]) * width for _ in range(depth)]
+        self._seeds = [_mix64(row + 1) for row in range(depth)]
+
+    def _columns(self, key: Any) -> List[int]:
+        h = hash(key)
+        return [_mix64(h ^ seed) % self.width for seed in self._seeds]
+
+    def add(self, key: Any, amount: int = 1) -> int:
+        """Adds amount to key and returns its new estimate."""
+        estimate = None
+        for row, column in zip(self._rows, self._columns(key)):
+            row[column] += amount
+            if estimate is None or row[column] < estimate:
+                estimate = row[column]
+        return estimate
+
+    def estimate(self, key: Any) -> int:
+        return min(row[column] for row, column in zip(self._rows, self._columns(key)))
+
+
+class FlowAnalytics:
+    """
+    Streaming detections over network flows in tumbling windows of window_seconds (by flow
+    timestamp, capped at the ingest clock plus max_clock_skew_seconds, so one flow stamped in
+    the future cannot pin the window ahead of every later flow). Per source IP it keeps two
+    HyperLogLogs, distinct destination ports and distinct destination IPs, for port scan and
+    fan-out detection, and one count-min sketch of bytes per source shared by all sources
+    for volume spikes against the previous window.
+
+    Memory is bounded independently of traffic: at most max_sources sources get HLLs per
+    window (flows from later sources only feed the sketch and "untracked_flows"), and
+    the sketches have a fixed size. Each (detection, source) fires at most once per window.
+    """
+
+    def __init__(self, window_seconds: float = 60, port_scan_threshold: int = 100, fanout_threshold: int = 50,
+                 volume_spike_factor: float = 10.0, volume_spike_min_bytes: int = 10 * 1024 * 1024,
+                 max_sources: int = 10000, hll_precision: int = 8, sketch_width: int = 2048, sketch_depth: int = 4,
+                 max_clock_skew_seconds: float = 5.0):
+        self.window_seconds = window_seconds
+        self.max_clock_skew = max_clock_skew_seconds
+        self.port_scan_threshold = port_scan_threshold
+        self.fanout_threshold = fanout_threshold
+        self.volume_spike_factor = volume_spike_factor
+        self.volume_spike_min_bytes = volume_spike_min_bytes
+        self.max_sources = max_sources
+        self.hll_precision = hll_precision
+        self.sketch_width = sketch_width
+        self.sketch_depth = sketch_depth
+        self._lock = threading.Lock()
+        self._window: Optional[int] = None
+        self._sources: Dict[str, list] = {} # source_ip -> [port HLL, IP HLL, fired detections]
+        self._bytes = CountMinSketch(sketch_width, sketch_depth)
+        self._previous_bytes: Optional[CountMinSketch] = None
+        self._spiked: set = set() # Sources that already raised a volume spike this window
+        self.stats: Dict[str, int] = {"flows": 0, "windows": 0, "untracked_flows": 0, "future_flows_clamped": 0,
+                                      "port_scans": 0, "fanouts": 0, "volume_spikes": 0}
+
+    def _roll(self, window: int):
+        """Starts a new tumbling window; the byte sketch of the window just closed becomes the baseline."""
+        if self._window is not None:
+            self._previous_bytes = self._bytes if window == self._window + 1 else None # Gap: no baseline
+            self._bytes = CountMinSketch(self.sketch_width, self.sketch_depth)
+        self._window = window
+        self._sources = {}
+        self._spiked = set()
+        self.stats["windows"] += 1
+
+    def observe(self, flow: NetworkFlowEntry) -> List[Dict[str, Any]]:
+        """
+        Adds one flow and returns the detections it triggered, each a dict with "kind"
+        (port_scan, fanout or volume_spike), "source_ip", "value" and "threshold".
+        """
+        flow_time = flow.timestamp.timestamp()
+        latest = time.time() + self.max_clock_skew
+        if flow_time > latest: # Sender clock ahead (or a forged timestamp): count it as arriving now
+            flow_time = latest
+        window = int(flow_time // self.window_seconds)
+        source = flow.source_ip
+        detections = []
+        with self._lock:
+            if flow_time == latest:
+                self.stats["future_flows_clamped"] += 1
+            if self._window is None or window > self._window:
+                self._roll(window) # Late flows from an older window are counted in the current one
+            self.stats["flows"] += 1
+
+            total_bytes = self._bytes.add(source, flow.byte_count or 0)
+            if total_bytes >= self.volume_spike_min_bytes and self._previous_bytes is not None and source not in self._spiked:
+                baseline = self._previous_bytes.estimate(source)
+                if total_bytes >= self.volume_spike_factor * max(baseline, 1):
+                    if len(self._spiked) < self.max_sources:
+                        self._spiked.add(source)
+                    detections.append({"kind": "volume_spike", "source_ip": source, "value": total_bytes,
+                                       "threshold": int(self.volume_spike_factor * max(baseline, 1))})
+                    self.stats["volume_spikes"] += 1
+
+            state = self._sources.get(source)
+            if state is None:
+                if len(self._sources) >= self.max_sources:
+                    self.stats["untracked_flows"] += 1
+                    return detections
+                state = [HyperLogLog(self.hll_precision), HyperLogLog(self.hll_precision), set()]
+                self._sources[source] = state
+            port_hll, ip_hll, fired = state
+            if flow.destination_port is not None and "port_scan" not in fired and port_hll.add(flow.destination_port):
+                distinct_ports = port_hll.count()
+                if distinct_ports >= self.port_scan_threshold:
+                    fired.add("port_scan")
+                    detections.append({"kind": "port_scan", "source_ip": source, "value": distinct_ports,
+                                       "threshold": self.port_scan_threshold})
+                    self.stats["port_scans"] += 1
+            if "fanout" not in fired and ip_hll.add(flow.destination_ip):
+                distinct_ips = ip_hll.count()
+                if distinct_ips >= self.fanout_threshold:
+                    fired.add("fanout")
+                    detections.append({"kind": "fanout", "source_ip": source, "value": distinct_ips,
+                                       "threshold": self.fanout_threshold})
+                    self.stats["fanouts"] += 1
+        return detections
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return dict(self.stats, tracked_sources=len(self._sources), max_sources=self.max_sources,
+                        window_seconds=self.window_seconds)
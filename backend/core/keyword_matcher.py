@@ -0,0 +1,154 @@
+# backend/core/keyword_matcher.py
+
+import re
+from typing import Any, Dict, FrozenSet, Iterable, List, Sequence, Tuple
+
+EMPTY_HITS: FrozenSet[int] = frozenset()
+
+
+def _trie_regex(words: Sequence[str]) -> str:
+    """
+    Builds a regex alternation factored by common prefixes (a trie), e.g.
+    ['deny', 'denied', 'data export'] -> d(?:ata\\ export|en(?:ied|y)).
+    The regex engine then rejects a position after one character comparison per
+    distinct first letter, instead of trying every keyword, and returns the longest
+    keyword starting at each position because longer branches are tried first.
+    """
+    trie: Dict[str, Any] = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[''] = True # End-of-keyword marker
+
+    def build(node: Dict[str, Any]) -> str:
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char != '']
+        if not branches:
+            return ''
+        body = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+        if '' in node: # A keyword ends here, the longer continuations are optional
+            body = ('(?:' + body + ')' if len(branches) == 1 else body) + '?'
+        return body
+
+    return build(trie)
+
+
+class KeywordMatcher:
+    """
+    Multi-keyword matcher that finds every keyword occurring in a text with a single scan
+    (the same result as Aho-Corasick), built on one trie-factored compiled regex.
+    Cost per scan depends on the text length, not on the number of keywords.
+
+    A left-to-right scan reports non-overlapping, longest-at-position matches, so keywords
+    hidden inside a match are recovered from a precomputed containment closure. Keywords that
+    start inside a match and run past its end (e.g. 'failed password' + 'deny' in
+    '...passwordeny') can only start at a few precomputed offsets of that match; those offsets
+    are probed with an anchored match, which only costs anything on lines that matched.
+    """
+
+    def __init__(self, keywords: Iterable[str]):
+        self.keywords: List[str] = list(dict.fromkeys(keyword.lower() for keyword in keywords if keyword))
+        self._index = {keyword: i for i, keyword in enumerate(self.keywords)}
+        if not self.keywords:
+            self._pattern = None
+            return
+        self._pattern = re.compile(_trie_regex(self.keywords))
+        self._memo: Dict[Any, FrozenSet[int]] = {} # findall result -> keyword ids
+        # keyword -> ids of keywords it contains / starts with
+        self._closure: Dict[str, FrozenSet[int]] = {
+            outer: frozenset(i for i, inner in enumerate(self.keywords) if inner in outer) for outer in self.keywords
+        }
+        self._prefix_closure: Dict[str, FrozenSet[int]] = {
+            outer: frozenset(i for i, inner in enumerate(self.keywords) if outer.startswith(inner)) for outer in self.keywords
+        }
+        # keyword -> offsets where another keyword could start inside it and straddle its end
+        prefixes = {keyword[:length] for keyword in self.keywords for length in range(1, len(keyword))}
+        self._straddle_offsets: Dict[str, Tuple[int, ...]] = {}
+        for keyword in self.keywords:
+            offsets = tuple(start for start in range(1, len(keyword)) if keyword[start:] in prefixes)
+            if offsets:
+                self._straddle_offsets[keyword] = offsets
+
+    def find(self, text: str) -> FrozenSet[int]:
+        """Returns the indexes (into self.keywords) of all keywords present in an already-lowercased text."""
+        if self._pattern is None:
+            return EMPTY_HITS
+        found = self._pattern.findall(text)
+        if not found:
+            return EMPTY_HITS
+        key = found[0] if len(found) == 1 else tuple(found)
+        hits = self._memo.get(key)
+        if hits is not None:
+            return hits
+        if any(keyword in self._straddle_offsets for keyword in found):
+            return self._find_with_straddles(text) # Depends on positions, so not memoized
+        hits = frozenset().union(*(self._closure[keyword] for keyword in found))
+        if len(self._memo) >= 4096: # Bound the memo against unbounded match sequences
+            self._memo.clear()
+        self._memo[key] = hits
+        return hits
+
+    def _find_with_straddles(self, text: str) -> FrozenSet[int]:
+        # Re-walk the matches to probe the offsets where a keyword could straddle.
+        closure = self._closure
+        straddle_offsets = self._straddle_offsets
+        hits = set()
+        for match in self._pattern.finditer(text):
+            keyword = match.group()
+            hits.update(closure[keyword])
+            for offset in straddle_offsets.get(keyword, ()):
+                straddler = self._pattern.match(text, match.start() + offset)
+                if straddler:
+                    hits.update(self._prefix_closure[straddler.group()])
+        return frozenset(hits)
+
+
+class KeywordRuleSet:
+    """
+    Several declarative, priority-ordered keyword tables compiled into one KeywordMatcher,
+    so a message is scanned once no matter how many tables or keywords consult it.
+    tables: {table_name: [(keywords, payload), ...]} where earlier rows have higher priority.
+    """
+
+    def __init__(self, tables: Dict[str, Sequence[Tuple[Sequence[str], Any]]]):
+        self.tables = tables
+        self._results: Dict[FrozenSet[int], Dict[str, List[Any]]] = {} # Few distinct hit sets occur in practice
+        self.matcher = KeywordMatcher(keyword for rows in tables.values() for keywords, _ in rows for keyword in keywords)
+        # keyword index -> [(table_name, priority), ...]
+        self._rules_by_keyword: Dict[int, List[Tuple[str, int]]] = {}
+        for table_name, rows in tables.items():
+            for priority, (keywords, _) in enumerate(rows):
+                for keyword in keywords:
+                    keyword_id = self.matcher._index[keyword.lower()]
+                    self._rules_by_keyword.setdefault(keyword_id, []).append((table_name, priority))
+
+    def scan(self, text: str) -> Dict[str, List[Any]]:
+        """
+        Scans an already-lowercased text once and returns, per table with at least one hit,
+        the payloads of every matching row in priority order. The result is cached; do not mutate it.
+        """
+        keyword_ids = self.matcher.find(text)
+        if not keyword_ids:
+            return {}
+        result = self._results.get(keyword_ids)
+        if result is None:
+            result = self._resolve(keyword_ids)
+            if len(self._results) >= 4096: # Bound the cache against pathological keyword combinations
+                self._results.clear()
+            self._results[keyword_ids] = result
+        return result
+
+    def _resolve(self, keyword_ids: FrozenSet[int]) -> Dict[str, List[Any]]:
+        hits: Dict[str, set] = {}
+        for keyword_id in keyword_ids:
+            for table_name, priority in self._rules_by_keyword[keyword_id]:
+                hits.setdefault(table_name, set()).add(priority)
+        return {
+            table_name: [self.tables[table_name][priority][1] for priority in sorted(priorities)]
+            for table_name, priorities in hits.items()
+        }
+
+    def first(self, text: str, table_name: str, default: Any = None) -> Any:
+        """Payload of the highest-priority matching row of one table, or default."""
+        payloads = self.scan(text).get(table_name)
+        return payloads[0] if payloads else default
@@ -0,0 +1,331 @@
+# backend/core/log_formats.py
+
+import json
+import re
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from backend.core.timestamp_decoder import MONTHS
+
+# Parsed fields, in LogEntry order: (timestamp, host, source, level, message, source_ip_host, destination_ip_host).
+# A timestamp of None means "not present / not parseable"; LogParser substitutes the current time.
+ParsedFields = Tuple[Optional[datetime], str, str, str, str, Optional[str], Optional[str]]
+
+# Syslog severity (PRI % 8) -> level names used throughout the SIEM.
+SYSLOG_SEVERITY_LEVELS = ('CRITICAL', 'ALERT', 'CRITICAL', 'ERROR', 'WARN', 'INFO', 'INFO', 'DEBUG')
+
+# Free-form level spellings seen in JSON/LEEF payloads -> level names used throughout the SIEM.
+LEVEL_ALIASES = {
+    'WARNING': 'WARN', 'ERR': 'ERROR', 'CRIT': 'CRITICAL', 'FATAL': 'CRITICAL',
+    'EMERG': 'CRITICAL', 'EMERGENCY': 'CRITICAL', 'NOTICE': 'INFO', 'INFORMATIONAL': 'INFO',
+}
+
+# CEF extension keys start after whitespace: "src=10.0.0.1 msg=a value with spaces act=blocked"
+CEF_EXTENSION_KEY = re.compile(r'(?:^|(?<=\s))([A-Za-z0-9_.\[\]]+)=')
+
+
+def normalize_level(value: Any, default: str = 'INFO') -> str:
+    """Maps a level/severity value from a structured payload onto the SIEM's level names."""
+    if value is None or value == '':
+        return default
+    if isinstance(value, int) and not isinstance(value, bool):
+        return SYSLOG_SEVERITY_LEVELS[value] if 0 <= value <= 7 else default
+    level = str(value).strip().upper()
+    if level.isdigit():
+        return normalize_level(int(level), default)
+    return LEVEL_ALIASES.get(level, level)
+
+
+def scaled_severity_level(severity: Any) -> str:
+    """CEF/LEEF 0-10 severities (or CEF's Low/Medium/High/Very-High) -> level names."""
+    try:
+        score = int(severity)
+    except (TypeError, ValueError):
+        return {'LOW': 'INFO', 'MEDIUM': 'WARN', 'HIGH': 'ERROR', 'VERY-HIGH': 'CRITICAL'}.get(str(severity).strip().upper(), 'INFO')
+    if score >= 9:
+        return 'CRITICAL'
+    if score >= 7:
+        return 'ERROR'
+    if score >= 4:
+        return 'WARN'
+    return 'INFO'
+
+
+def parse_structured_timestamp(value: Any) -> Optional[datetime]:
+    """
+    Timestamps found in structured payloads: epoch seconds/milliseconds, ISO 8601 and
+    'MMM dd yyyy HH:mm:ss' (CEF rt / LEEF devTime). Returns naive local time like the
+    rest of the parser, or None if the value is not understood.
+    """
+    if value is None or isinstance(value, bool):
+        return None
+    try:
+        if isinstance(value, (int, float)) or (isinstance(value, str) and value.isdigit()):
+            seconds = float(value)
+            if seconds > 1e11: # Milliseconds since the epoch (CEF rt, Java senders)
+                seconds /= 1000.0
+            return datetime.fromtimestamp(seconds)
+        value = value.strip()
+        if value[:3].lower() in MONTHS and len(value) >= 20: # 'Jun 17 2025 10:00:01'
+            return datetime(int(value[7:11]), MONTHS[value[:3].lower()], int(value[4:6]),
+                            int(value[12:14]), int(value[15:17]), int(value[18:20]))
+        timestamp = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    except (ValueError, TypeError, OverflowError, OSError):
+        return None
+    if timestamp.tzinfo is not None:
+        timestamp = timestamp.astimezone().replace(tzinfo=None) # Store naive local time
+    return timestamp
+
+
+def _first(payload: Dict[str, Any], keys: Tuple[str, ...]) -> Any:
+    for key in keys:
+        value = payload.get(key)
+        if value not in (None, ''):
+            return value
+    return None
+
+
+class LogFormat:
+    """
+    One wire format. detect() is a cheap check on the line (after any '<PRI>' header);
+    parse() returns ParsedFields, or None if the line turns out not to be in this format,
+    in which case the registry moves on to the next format.
+    """
+    name = 'base'
+
+    def detect(self, body: str, pri: Optional[int]) -> bool:
+        raise NotImplementedError
+
+    def parse(self, body: str, pri: Optional[int], parser) -> Optional[ParsedFields]:
+        raise NotImplementedError
+
+
+class Rfc5424Format(LogFormat):
+    """<PRI>1 TIMESTAMP HOSTNAME APP-NAME PROCID MSGID [STRUCTURED-DATA] MSG"""
+    name = 'rfc5424'
+
+    def detect(self, body: str, pri: Optional[int]) -> bool:
+        return pri is not None and body[:2] == '1 '
+
+    def parse(self, body: str, pri: Optional[int], parser) -> Optional[ParsedFields]:
+        if not self.detect(body, pri):
+            return None
+        parts = body.split(' ', 6)
+        if len(parts) < 6:
+            return None
+        _, timestamp_raw, host, app_name, _, _ = parts[:6]
+        rest = parts[6] if len(parts) > 6 else ''
+        message = self._skip_structured_data(rest).strip()
+        if message.startswith('\ufeff'): # BOM marks a UTF-8 MSG
+            message = message[1:]
+        timestamp = None if timestamp_raw == '-' else parse_structured_timestamp(timestamp_raw)
+        if timestamp_raw != '-' and timestamp is None:
+            return None # Not actually RFC 5424
+        level = SYSLOG_SEVERITY_LEVELS[pri % 8]
+        return parser._classify_fields(timestamp, host if host != '-' else 'unknown_host',
+                                       app_name if app_name != '-' else '', level, message)
+
+    @staticmethod
+    def _skip_structured_data(rest: str) -> str:
+        """Returns the MSG part after STRUCTURED-DATA ('-' or one or more [id param="v"] elements)."""
+        if rest[:1] == '-':
+            return rest[1:]
+        position = 0
+        while rest[position:position + 1] == '[':
+            position += 1
+            while position < len(rest) and rest[position] != ']':
+                if rest[position] == '\\': # Escaped ']', '"' or '\' inside a param value
+                    position += 1
+                elif rest[position] == '"':
+                    position += 1
+                    while position < len(rest) and rest[position] != '"':
+                        position += 2 if rest[position] == '\\' else 1
+                position += 1
+            position += 1
+        return rest[position:]
+
+
+class JsonFormat(LogFormat):
+    """One JSON object per line (Docker/Bunyan/ECS-style shippers)."""
+    name = 'json'
+
+    TIMESTAMP_KEYS = ('timestamp', '@timestamp', 'time', 'ts', 'date')
+    HOST_KEYS = ('host', 'hostname', 'host_name', 'computer')
+    SOURCE_KEYS = ('source', 'program', 'app', 'application', 'service', 'logger')
+    LEVEL_KEYS = ('level', 'severity', 'log_level', 'loglevel')
+    MESSAGE_KEYS = ('message', 'msg', 'log', 'event')
+    SOURCE_IP_KEYS = ('source_ip_host', 'source_ip', 'src_ip', 'src', 'client_ip')
+    DESTINATION_IP_KEYS = ('destination_ip_host', 'destination_ip', 'dst_ip', 'dst', 'dest_ip')
+
+    def detect(self, body: str, pri: Optional[int]) -> bool:
+        return body[:1] == '{'
+
+    def parse(self, body: str, pri: Optional[int], parser) -> Optional[ParsedFields]:
+        try:
+            payload = json.loads(body)
+        except ValueError:
+            return None
+        if not isinstance(payload, dict):
+            return None
+        host = payload.get('host')
+        if isinstance(host, dict): # ECS: {"host": {"name": ...}}
+            host = host.get('name') or host.get('hostname')
+            payload = dict(payload, host=host)
+        message = _first(payload, self.MESSAGE_KEYS)
+        source_ip = _first(payload, self.SOURCE_IP_KEYS)
+        destination_ip = _first(payload, self.DESTINATION_IP_KEYS)
+        return parser._classify_fields(
+            parse_structured_timestamp(_first(payload, self.TIMESTAMP_KEYS)),
+            str(_first(payload, self.HOST_KEYS) or 'unknown_host'),
+            str(_first(payload, self.SOURCE_KEYS) or ''),
+            normalize_level(_first(payload, self.LEVEL_KEYS)),
+            str(message) if message is not None else body,
+            str(source_ip) if source_ip is not None else None,
+            str(destination_ip) if destination_ip is not None else None,
+            extract_ips=False, # Structured: addresses come from fields or not at all
+        )
+
+
+class CefFormat(LogFormat):
+    """ArcSight CEF, bare or behind a BSD syslog header:
+    [Mmm dd hh:mm:ss host ]CEF:Version|Vendor|Product|Version|SignatureID|Name|Severity|Extension"""
+    name = 'cef'
+    marker = 'CEF:'
+
+    def detect(self, body: str, pri: Optional[int]) -> bool:
+        return body.find(self.marker, 0, 128) != -1
+
+    def _split_header(self, body: str) -> Optional[Tuple[str, List[str]]]:
+        """Returns (syslog prefix, header fields + extension) or None if there is no valid header."""
+        start = body.find(self.marker, 0, 128)
+        if start == -1:
+            return None
+        record = body[start + len(self.marker):]
+        if '\\|' in record:
+            fields = self._split_escaped(record)
+        else:
+            fields = record.split('|', 7)
+        if len(fields) < 8:
+            return None
+        return body[:start], fields
+
+    @staticmethod
+    def _split_escaped(record: str) -> List[str]:
+        fields, current, position = [], [], 0
+        while position < len(record) and len(fields) < 7:
+            char = record[position]
+            if char == '\\' and position + 1 < len(record):
+                current.append(record[position + 1])
+                position += 2
+                continue
+            if char == '|':
+                fields.append(''.join(current))
+                current = []
+            else:
+                current.append(char)
+            position += 1
+        fields.append(''.join(current) + record[position:])
+        return fields
+
+    @staticmethod
+    def _parse_extension(extension: str) -> Dict[str, str]:
+        """key=value pairs; values run until the next key and may contain spaces or escaped '='."""
+        keys = list(CEF_EXTENSION_KEY.finditer(extension))
+        attributes = {}
+        for i, key in enumerate(keys):
+            end = keys[i + 1].start() if i + 1 < len(keys) else len(extension)
+            value = extension[key.end():end].rstrip()
+            if '\\' in value:
+                value = value.replace('\\=', '=').replace('\\n', '\n').replace('\\\\', '\\')
+            attributes[key.group(1)] = value
+        return attributes
+
+    def _prefix_header(self, prefix: str, parser) -> Tuple[Optional[datetime], Optional[str]]:
+        """Timestamp and host from a BSD syslog header in front of the record, if any."""
+        if not prefix.strip():
+            return None, None
+        match = parser.syslog_pattern.match(prefix)
+        if not match:
+            return None, None
+        return parser.timestamp_decoder.decode(match.group('month'), match.group('day'), match.group('time')), match.group('host')
+
+    def parse(self, body: str, pri: Optional[int], parser) -> Optional[ParsedFields]:
+        split = self._split_header(body)
+        if split is None:
+            return None
+        prefix, (_, vendor, product, _, signature_id, name, severity, extension) = split
+        attributes = self._parse_extension(extension)
+        header_timestamp, header_host = self._prefix_header(prefix, parser)
+        timestamp = parse_structured_timestamp(attributes.get('rt')) or header_timestamp
+        host = attributes.get('dvchost') or header_host or attributes.get('dvc') or 'unknown_host'
+        message = attributes.get('msg') or name or signature_id
+        return parser._classify_fields(
+            timestamp, host, product or vendor, scaled_severity_level(severity), message,
+            attributes.get('src') or attributes.get('shost'),
+            attributes.get('dst') or attributes.get('dhost'),
+            extract_ips=False,
+        )
+
+
+class LeefFormat(CefFormat):
+    """IBM QRadar LEEF 1.0 (tab-separated attributes) and 2.0 (declared delimiter):
+    LEEF:Version|Vendor|Product|Version|EventID|[Delimiter|]key=value<delim>key=value..."""
+    name = 'leef'
+    marker = 'LEEF:'
+
+    def _split_header(self, body: str) -> Optional[Tuple[str, List[str]]]:
+        start = body.find(self.marker, 0, 128)
+        if start == -1:
+            return None
+        fields = body[start + len(self.marker):].split('|', 6)
+        if len(fields) < 6:
+            return None
+        if fields[0].startswith('2') and len(fields) == 7:
+            delimiter = fields[5]
+            if delimiter[:1] in ('x', 'X') and len(delimiter) > 1: # Hex form, e.g. 'x09'
+                try:
+                    delimiter = chr(int(delimiter[1:], 16))
+                except (ValueError, OverflowError): # Not hex, or beyond the Unicode range: no valid header
+                    return None
+            attributes = fields[6]
+        else:
+            delimiter = '\t'
+            attributes = '|'.join(fields[5:])
+        return body[:start], fields[:5] + [delimiter or '\t', attributes]
+
+    def parse(self, body: str, pri: Optional[int], parser) -> Optional[ParsedFields]:
+        split = self._split_header(body)
+        if split is None:
+            return None
+        prefix, (_, vendor, product, _, event_id, delimiter, attribute_text) = split
+        attributes = {}
+        for pair in attribute_text.split(delimiter):
+            key, separator, value = pair.partition('=')
+            if separator:
+                attributes[key.strip()] = value.strip()
+        header_timestamp, header_host = self._prefix_header(prefix, parser)
+        timestamp = parse_structured_timestamp(attributes.get('devTime')) or header_timestamp
+        level = scaled_severity_level(attributes['sev']) if 'sev' in attributes else normalize_level(attributes.get('severity'))
+        return parser._classify_fields(
+            timestamp, attributes.get('identHostName') or header_host or 'unknown_host', product or vendor, level,
+            attributes.get('msg') or attributes.get('cat') or event_id,
+            attributes.get('src') or attributes.get('srcHost'),
+            attributes.get('dst') or attributes.get('dstHost'),
+            extract_ips=False,
+        )
+
+
+class BsdSyslogFormat(LogFormat):
+    """RFC 3164-style 'Mmm dd hh:mm:ss host process[pid]: [LEVEL] message'. Catch-all, always last."""
+    name = 'bsd'
+
+    def detect(self, body: str, pri: Optional[int]) -> bool:
+        return True
+
+    def parse(self, body: str, pri: Optional[int], parser) -> Optional[ParsedFields]:
+        return parser._parse_bsd(body)
+
+
+def default_formats() -> List[LogFormat]:
+    """Detection order: most specific first, the BSD catch-all last."""
+    return [Rfc5424Format(), JsonFormat(), CefFormat(), LeefFormat(), BsdSyslogFormat()]
@@ -1,9 +1,57 @@
 import re
 from datetime import datetime
 from backend.database.models import LogEntry
+from backend.core.keyword_matcher import KeywordRuleSet
+from backend.core.timestamp_decoder import SyslogTimestampDecoder
+from backend.core.log_formats import default_formats
+
+# --- Declarative classification tables ---
+# Each table is a list of (keywords, result) rows; rows are tried in priority order (first row
+# wins) and a row matches when any of its keywords occurs as a substring of the lowercased text.
+# All message tables are compiled into a single matcher, so adding vendor keywords here does
+# not add per-line scans.
+
+# Process name (e.g. 'sshd' from 'sshd[123]:') -> source category.
+PROCESS_SOURCE_RULES = [
+    (('sshd', 'login', 'auth'), 'Authentication'),
+    (('firewall', 'router', 'network', 'netflow'), 'Network'),
+    (('apache', 'nginx', 'web-server'), 'Web Server'),
+    (('endpoint', 'av', 'antivirus'), 'Endpoint Security'),
+    (('postgres', 'db-server', 'database'), 'Database'),
+    (('kernel', 'system'), 'System'),
+    (('app', 'application'), 'Application'),
+    (('backup',), 'Backup System'),
+    (('cert-monitor',), 'Certificate Monitor'),
+    (('disk',), 'System Monitor'), # New category for disk alerts
+]
+
+# Message content -> source category, used when the line has no process name.
+MESSAGE_SOURCE_RULES = [
+    (('failed password', 'authenticated'), 'Authentication'),
+    (('deny', 'block', 'policy'), 'Network'), # Could be firewall
+    (('cpu usage', 'memory usage'), 'System Monitor'),
+    (('database connection',), 'Database'),
+    (('ransomware', 'virus'), 'Endpoint Security'),
+    (('data export',), 'Application'), # Or specific 'DLP'
+]
+
+# Message content -> (required current level or None, new level or None, new source or None).
+# Refinements override level/source extracted from the header.
+CONTENT_REFINEMENT_RULES = [
+    (('failed password',), ('AUTH', 'AUTH_FAILED', None)), # Custom level for failed auth
+    (('unauthorized data export',), (None, 'CRITICAL', 'Application')),
+    (('ransomware activity detected',), (None, 'CRITICAL', 'Endpoint Security')), # Elevate ransomware
+    (('suspicious high volume outbound connections',), (None, 'ALERT', 'Network')),
+    (('low disk space',), ('WARN', None, 'System Monitor')), # Assign more specific source
+]
 
 class LogParser:
-    def __init__(self):
+    def __init__(self, formats: list = None):
+        # Format registry, tried in order (RFC 5424, JSON, CEF, LEEF, BSD syslog by default).
+        # The format that worked for an origin (sending host/connection) is tried first next time.
+        self.formats = formats if formats is not None else default_formats()
+        self._format_by_origin = {}
+
         # Optimized regex to capture common syslog-like formats with optional process and brackets
         # Group 1: Timestamp (Month Day HH:MM:SS)
         # Group 2: Hostname
@@ -18,174 +66,219 @@ class LogParser:
             r'(?P<message>.*)'
         )
 
+        # Memoized header timestamp decoding (replaces a strptime call per line)
+        self.timestamp_decoder = SyslogTimestampDecoder()
+
+        # Keyword classifiers: one compiled matcher per text being classified
+        self.process_rules = KeywordRuleSet({'source': PROCESS_SOURCE_RULES})
+        self.message_rules = KeywordRuleSet({'source': MESSAGE_SOURCE_RULES, 'refine': CONTENT_REFINEMENT_RULES})
+        self._process_source_cache = {} # Process names repeat constantly; classify each one once
+
         # Regex to find IP addresses
         self.ip_pattern = re.compile(r'\b(?:\d{1,3}\.){3}\d{1,3}\b')
 
-    def parse_log_entry(self, raw_log: str) -> dict:
+        # Keyword-based IP/host extraction, compiled once instead of per call
+        self.from_to_pattern = re.compile(r'from\s+(?P<src_ip>\S+)\s+to\s+(?P<dst_ip>\S+)')
+        self.from_pattern = re.compile(r'from\s+(?P<src_ip>\S+)')
+        self.to_pattern = re.compile(r'to\s+(?P<dst_ip>\S+)')
+
+    def parse_log_entry(self, raw_log: str, origin: str = None) -> dict:
         """
         Parses a raw log string into a structured dictionary.
         """
-        parsed_data = {
-            'timestamp': datetime.now(), # Default to current time if parsing fails
-            'host': 'unknown_host',
-            'source': 'unknown_source',
-            'level': 'INFO', # Default level
-            'message': raw_log,
-            'source_ip_host': None,
-            'destination_ip_host': None,
+        timestamp, host, source, level, message, source_ip_host, destination_ip_host = self._parse_fields(raw_log, origin)
+        return {
+            'timestamp': timestamp,
+            'host': host,
+            'source': source,
+            'level': level,
+            'message': message,
+            'source_ip_host': source_ip_host,
+            'destination_ip_host': destination_ip_host,
             'raw_log': raw_log # Always store the original raw log
         }
 
-        match = self.syslog_pattern.match(raw_log)
-        if match:
-            data = match.groupdict()
-            try:
-                # Construct datetime object: Add current year for full date
-                current_year = datetime.now().year
-                timestamp_str = f"{data['month']} {data['day']} {data['time']} {current_year}"
-                parsed_data['timestamp'] = datetime.strptime(timestamp_str, "%b %d %H:%M:%S %Y")
-            except ValueError:
-                # If timestamp parsing fails, keep the default datetime.now()
-                pass
-
-            parsed_data['host'] = data['host']
-            parsed_data['message'] = data['message'].strip()
-
-            # Process source: take from 'process' group, clean it, and normalize
-            process_raw = data['process'].strip(': ').split('[')[0].strip() if data['process'] else ''
-            if process_raw:
-                parsed_data['source'] = self._normalize_source(process_raw)
-            else:
-                # If no process, try to infer from message or host
-                parsed_data['source'] = self._infer_source_from_message(parsed_data['message'], parsed_data['host'])
-
-            # Level extraction
-            parsed_data['level'] = data['level'] if data['level'] else 'INFO' # Use parsed level or default to INFO
-
-            # IP Address Extraction - more robust
-            self._extract_ips(parsed_data)
-
-            # Further refine level and source based on message content
-            self._refine_level_and_source_by_content(parsed_data)
-
-        # If no syslog pattern matches, we rely on defaults.
-        # Ensure 'message' is always the raw log if nothing else is parsed.
+    def _parse_fields(self, raw_log: str, origin: str = None) -> tuple:
+        """
+        Single-pass parse shared by every entry point.
+        Returns (timestamp, host, source, level, message, source_ip_host, destination_ip_host).
+        origin identifies the sender (e.g. peer address); the format detected for it is cached
+        so its later lines go straight to the right format parser, unless a more specific
+        format (earlier in the registry) claims the line: a sender cached as BSD syslog that
+        emits a CEF line behind a BSD header still gets it parsed as CEF.
+        """
+        # Optional '<PRI>' header added by syslog senders on the wire (RFC 3164 / RFC 5424)
+        body, pri = raw_log, None
+        if raw_log[:1] == '<':
+            end = raw_log.find('>', 1, 5)
+            if end > 1 and raw_log[1:end].isdigit():
+                body, pri = raw_log[end + 1:], int(raw_log[1:end])
+
+        fields = None
+        cached_format = self._format_by_origin.get(origin) if origin is not None else None
+        if cached_format is not None:
+            for log_format in self.formats:
+                if log_format is cached_format:
+                    fields = cached_format.parse(body, pri, self) # None if the sender switched formats
+                    break
+                if log_format.detect(body, pri):
+                    break # A more specific format claims the line; the registry loop below picks it
+        if fields is None:
+            for log_format in self.formats:
+                if log_format is not cached_format and log_format.detect(body, pri):
+                    fields = log_format.parse(body, pri, self)
+                    if fields is not None:
+                        if origin is not None:
+                            if len(self._format_by_origin) >= 10000: # Bound the cache against churning peers
+                                self._format_by_origin.clear()
+                            self._format_by_origin[origin] = log_format
+                        break
+        if fields is None:
+            # If no format matches, we rely on defaults (current time).
+            return datetime.now(), 'unknown_host', 'unknown_source', 'INFO', raw_log, None, None
+        if fields[0] is None:
+            # Timestamp missing or unparseable, default to datetime.now()
+            return (datetime.now(),) + fields[1:]
+        return fields
+
+    def _parse_bsd(self, body: str) -> tuple:
+        """
+        BSD syslog line ('Jun 17 10:00:01 host process[pid]: [LEVEL] message'), or None if the
+        header does not match. The message is lowercased once and that copy is reused by every
+        keyword check below.
+        """
+        match = self.syslog_pattern.match(body)
         if not match:
-             parsed_data['message'] = raw_log # Make sure message is not None if no match
+            return None
 
-        return parsed_data
+        month, day, time_str, host, process, level, message = match.groups()
+        # Header timestamps carry no year; the decoder infers it (including Dec -> Jan rollover)
+        timestamp = self.timestamp_decoder.decode(month, day, time_str)
 
-    def _normalize_source(self, raw_source: str) -> str:
-        """Normalizes raw source strings to predefined categories."""
-        raw_source_lower = raw_source.lower()
-        if 'sshd' in raw_source_lower or 'login' in raw_source_lower or 'auth' in raw_source_lower:
-            return 'Authentication'
-        elif 'firewall' in raw_source_lower or 'router' in raw_source_lower or 'network' in raw_source_lower or 'netflow' in raw_source_lower:
-            return 'Network'
-        elif 'apache' in raw_source_lower or 'nginx' in raw_source_lower or 'web-server' in raw_source_lower:
-            return 'Web Server'
-        elif 'endpoint' in raw_source_lower or 'av' in raw_source_lower or 'antivirus' in raw_source_lower:
-            return 'Endpoint Security'
-        elif 'postgres' in raw_source_lower or 'db-server' in raw_source_lower or 'database' in raw_source_lower:
-            return 'Database'
-        elif 'kernel' in raw_source_lower or 'system' in raw_source_lower:
-            return 'System'
-        elif 'app' in raw_source_lower or 'application' in raw_source_lower:
-            return 'Application'
-        elif 'backup' in raw_source_lower:
-            return 'Backup System'
-        elif 'cert-monitor' in raw_source_lower:
-            return 'Certificate Monitor'
-        elif 'disk' in raw_source_lower:
-            return 'System Monitor' # New category for disk alerts
-        return 'unknown_source' # Default if no match
-
-
-    def _infer_source_from_message(self, message: str, host: str) -> str:
-        """Tries to infer source from message content or host if process is missing."""
+        message = message.strip()
         message_lower = message.lower()
-        if 'failed password' in message_lower or 'authenticated' in message_lower:
-            return 'Authentication'
-        elif 'deny' in message_lower or 'block' in message_lower or 'policy' in message_lower:
-            return 'Network' # Could be firewall
-        elif 'cpu usage' in message_lower or 'memory usage' in message_lower:
-            return 'System Monitor'
-        elif 'database connection' in message_lower:
-            return 'Database'
-        elif 'ransomware' in message_lower or 'virus' in message_lower:
-            return 'Endpoint Security'
-        elif 'data export' in message_lower:
-            return 'Application' # Or specific 'DLP'
-        return 'unknown_source'
-
-
-    def _extract_ips(self, parsed_data: dict):
-        """Extracts source and destination IPs based on keywords and position."""
-        message_lower = parsed_data['message'].lower()
-        
+        # Single keyword scan of the message, shared by source inference and refinement
+        message_hits = self.message_rules.scan(message_lower)
+
+        # Process source: take from 'process' group, clean it, and normalize
+        process_raw = process.strip(': ').split('[')[0].strip() if process else ''
+        if process_raw:
+            source = self._normalize_source(process_raw)
+        else:
+            # If no process, try to infer from message or host
+            source = self._infer_source_from_message(message_hits, host)
+
+        # Level extraction
+        level = level if level else 'INFO' # Use parsed level or default to INFO
+
+        # IP Address Extraction - more robust
+        source_ip_host, destination_ip_host = self._extract_ips(message, message_lower)
+
+        # Further refine level and source based on message content
+        level, source = self._refine_level_and_source_by_content(message_hits, level, source)
+
+        return timestamp, host, source, level, message, source_ip_host, destination_ip_host
+
+    def _classify_fields(self, timestamp, host: str, source_name: str, level: str, message: str,
+                         source_ip_host: str = None, destination_ip_host: str = None, extract_ips: bool = True) -> tuple:
+        """
+        Completes fields taken from a structured format: the sender's source name is mapped onto
+        a source category (kept as-is if it matches none), then the same content refinement as
+        BSD lines is applied. IPs are only searched for in the message when extract_ips is set.
+        """
+        message_lower = message.lower()
+        message_hits = self.message_rules.scan(message_lower)
+        if source_name:
+            source = self._normalize_source(source_name)
+            if source == 'unknown_source':
+                source = source_name
+        else:
+            source = self._infer_source_from_message(message_hits, host)
+        if extract_ips and source_ip_host is None and destination_ip_host is None:
+            source_ip_host, destination_ip_host = self._extract_ips(message, message_lower)
+        level, source = self._refine_level_and_source_by_content(message_hits, level, source)
+        return timestamp, host, source, level, message, source_ip_host, destination_ip_host
+
+    def _normalize_source(self, raw_source: str) -> str:
+        """Normalizes raw source strings to predefined categories (PROCESS_SOURCE_RULES)."""
+        source = self._process_source_cache.get(raw_source)
+        if source is None:
+            source = self.process_rules.first(raw_source.lower(), 'source', 'unknown_source') # Default if no match
+            if len(self._process_source_cache) >= 10000: # Bound the cache against unbounded process names
+                self._process_source_cache.clear()
+            self._process_source_cache[raw_source] = source
+        return source
+
+
+    def _infer_source_from_message(self, message_hits: dict, host: str) -> str:
+        """Infers source from the message keyword hits (MESSAGE_SOURCE_RULES) if process is missing."""
+        sources = message_hits.get('source')
+        return sources[0] if sources else 'unknown_source'
+
+
+    def _extract_ips(self, message: str, message_lower: str) -> tuple:
+        """
+        Extracts (source, destination) IPs/hosts based on keywords and position.
+        Cheap substring checks gate each precompiled search, so lines without
+        "from"/"to" never reach the regex engine.
+        """
+        source_ip_host = None
+        destination_ip_host = None
+        has_from = 'from' in message_lower
+        has_to = 'to' in message_lower
+
         # Look for explicit "from X to Y" patterns
-        from_to_match = re.search(r'from\s+(?P<src_ip>\S+)\s+to\s+(?P<dst_ip>\S+)', message_lower)
-        if from_to_match:
-            parsed_data['source_ip_host'] = from_to_match.group('src_ip').strip('.,')
-            parsed_data['destination_ip_host'] = from_to_match.group('dst_ip').strip('.,')
-            return
+        if has_from and has_to:
+            from_to_match = self.from_to_pattern.search(message_lower)
+            if from_to_match:
+                return from_to_match.group('src_ip').strip('.,'), from_to_match.group('dst_ip').strip('.,')
 
         # Look for "from X" only
-        from_match = re.search(r'from\s+(?P<src_ip>\S+)', message_lower)
-        if from_match:
-            parsed_data['source_ip_host'] = from_match.group('src_ip').strip('.,')
-            
-        # Look for "to Y" only, or if "from" wasn't found
-        to_match = re.search(r'to\s+(?P<dst_ip>\S+)', message_lower)
-        if to_match and not parsed_data['destination_ip_host']: # Don't overwrite if found by from_to
-             parsed_data['destination_ip_host'] = to_match.group('dst_ip').strip('.,')
+        if has_from:
+            from_match = self.from_pattern.search(message_lower)
+            if from_match:
+                source_ip_host = from_match.group('src_ip').strip('.,')
+
+        # Look for "to Y" only
+        if has_to:
+            to_match = self.to_pattern.search(message_lower)
+            if to_match:
+                destination_ip_host = to_match.group('dst_ip').strip('.,')
 
         # Fallback: if no keywords, just find any IPs and assign.
         # This is less reliable but better than nothing.
-        if not parsed_data['source_ip_host'] and not parsed_data['destination_ip_host']:
-            ips = self.ip_pattern.findall(parsed_data['message'])
+        if not source_ip_host and not destination_ip_host:
+            ips = self.ip_pattern.findall(message)
             if len(ips) > 0:
-                parsed_data['source_ip_host'] = ips[0] # Assume first IP is source if no other info
+                source_ip_host = ips[0] # Assume first IP is source if no other info
                 if len(ips) > 1:
-                    parsed_data['destination_ip_host'] = ips[1]
-
-
-    def _refine_level_and_source_by_content(self, parsed_data: dict):
-        """Refines level and source based on specific keywords in the message."""
-        message_lower = parsed_data['message'].lower()
-        
-        if 'failed password' in message_lower and parsed_data['level'] == 'AUTH':
-            parsed_data['level'] = 'AUTH_FAILED' # Custom level for failed auth
-        elif 'unauthorized data export' in message_lower:
-            parsed_data['level'] = 'CRITICAL'
-            parsed_data['source'] = 'Application' # More specific if generic
-        elif 'ransomware activity detected' in message_lower:
-            parsed_data['level'] = 'CRITICAL' # Elevate to CRITICAL for ransomware
-            parsed_data['source'] = 'Endpoint Security'
-        elif 'suspicious high volume outbound connections' in message_lower:
-            parsed_data['level'] = 'ALERT'
-            parsed_data['source'] = 'Network'
-        elif 'low disk space' in message_lower and parsed_data['level'] == 'WARN':
-            parsed_data['source'] = 'System Monitor' # Assign more specific source
-
-
-    # Backward compatibility for older calls, delegates to parse_log_entry.
-    def parse_log_line(self, raw_log: str) -> dict: # Renamed from parse_log to parse_log_line
+                    destination_ip_host = ips[1]
+        return source_ip_host, destination_ip_host
+
+
+    def _refine_level_and_source_by_content(self, message_hits: dict, level: str, source: str) -> tuple:
+        """Refines (level, source) from the message keyword hits (CONTENT_REFINEMENT_RULES)."""
+        for required_level, new_level, new_source in message_hits.get('refine', ()):
+            if required_level is not None and level != required_level:
+                continue # Keyword present but level condition not met; try the next rule
+            return new_level or level, new_source or source
+        return level, source
+
+
+    # Backward compatibility for older calls, delegates to the shared single-pass parser.
+    def parse_log_line(self, raw_log: str, origin: str = None) -> LogEntry: # Renamed from parse_log to parse_log_line
         """
-        Parses a raw log string into a structured LogEntry-like dictionary.
-        This method is designed to be called by log_receiver.
+        Parses a raw log string into a LogEntry object.
+        This is the entry point used by the API, the syslog listener and log_receiver.
         """
-        # Parse into a dictionary first
-        parsed_dict = self.parse_log_entry(raw_log)
-        
-        # Convert dictionary to LogEntry object for consistency with db_client.insert_log
+        timestamp, host, source, level, message, source_ip_host, destination_ip_host = self._parse_fields(raw_log, origin)
         return LogEntry(
-            timestamp=parsed_dict.get('timestamp', datetime.now()),
-            host=parsed_dict.get('host', 'unknown_host'),
-            source=parsed_dict.get('source', 'unknown_source'),
-            level=parsed_dict.get('level', 'INFO'),
-            message=parsed_dict.get('message', raw_log),
-            source_ip_host=parsed_dict.get('source_ip_host'),
-            destination_ip_host=parsed_dict.get('destination_ip_host'),
+            timestamp=timestamp,
+            host=host,
+            source=source,
+            level=level,
+            message=message,
+            source_ip_host=source_ip_host,
+            destination_ip_host=destination_ip_host,
             raw_log=raw_log # Always include raw_log
-        )
\ No newline at end of file
+        )
@@ -0,0 +1,162 @@
+# backend/core/parallel_parser.py
+
+import os
+import threading
+from array import array
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Iterable, Iterator, List, Optional
+
+from backend.core.log_parser import LogParser
+from backend.database.models import LogEntry
+
+MIN_SHARD_LINES = 200 # Below this, shipping a shard to another process costs more than parsing it
+
+
+def pack_lines(lines: List[str]) -> bytes:
+    """
+    Packs lines into one compact blob: line count (uint32), the UTF-8 byte length of each
+    line (uint32 array), then the concatenated UTF-8 bytes. One bytes object crosses the
+    process boundary instead of a pickled list of strings.
+    """
+    encoded = [line.encode('utf-8', 'surrogatepass') for line in lines]
+    lengths = array('I', [len(data) for data in encoded])
+    return len(encoded).to_bytes(4, 'little') + lengths.tobytes() + b''.join(encoded)
+
+
+def unpack_lines(blob: bytes) -> List[str]:
+    """Inverse of pack_lines."""
+    count = int.from_bytes(blob[:4], 'little')
+    lengths = array('I')
+    header_end = 4 + count * lengths.itemsize
+    lengths.frombytes(blob[4:header_end])
+    view = memoryview(blob)
+    lines = []
+    offset = header_end
+    for length in lengths:
+        lines.append(str(view[offset:offset + length], 'utf-8', 'surrogatepass'))
+        offset += length
+    return lines
+
+
+# --- Worker process side ---
+_worker_parser: Optional[LogParser] = None
+
+def _init_worker():
+    global _worker_parser
+    _worker_parser = LogParser() # One parser (compiled regexes, caches) per worker process
+
+def _parse_shard(blob: bytes, origin: Optional[str]) -> List[tuple]:
+    """Parses one packed shard. Returns field tuples only; the parent already has the raw lines."""
+    parse_fields = _worker_parser._parse_fields
+    return [parse_fields(raw_log, origin) for raw_log in unpack_lines(blob)]
+
+
+class ParallelLogParser:
+    """
+    Shards batches of raw lines across a ProcessPoolExecutor so parse + classify uses every
+    core instead of one. Shards travel as packed byte blobs (pack_lines) and come back as
+    field tuples, which are rebuilt into LogEntry objects in input order. Batches too small
+    to be worth shipping are parsed in-process with log_parser.
+    """
+
+    def __init__(self, workers: Optional[int] = None, chunk_lines: int = 2000, log_parser: Optional[LogParser] = None):
+        self.workers = workers or os.cpu_count() or 1
+        self.chunk_lines = max(chunk_lines, MIN_SHARD_LINES)
+        self.log_parser = log_parser or LogParser()
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker)
+            return self._executor
+
+    def _reset_executor(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+    def _parse_inline(self, raw_lines: List[str], origin: Optional[str]) -> List[LogEntry]:
+        return [self.log_parser.parse_log_line(raw_log, origin) for raw_log in raw_lines]
+
+    @staticmethod
+    def _rebuild(raw_lines: List[str], field_tuples: List[tuple]) -> List[LogEntry]:
+        return [LogEntry(*fields, raw_log=raw_log) for raw_log, fields in zip(raw_lines, field_tuples)]
+
+    def parse_lines(self, raw_lines: List[str], origin: Optional[str] = None) -> List[LogEntry]:
+        """Parses a batch of raw lines into LogEntry objects, in order."""
+        if self.workers <= 1 or len(raw_lines) < 2 * MIN_SHARD_LINES:
+            return self._parse_inline(raw_lines, origin)
+        # Spread the batch over every worker, within [MIN_SHARD_LINES, chunk_lines] lines per shard
+        shard_lines = min(self.chunk_lines, max(MIN_SHARD_LINES, -(-len(raw_lines) // self.workers)))
+        try:
+            executor = self._get_executor()
+            futures = [
+                executor.submit(_parse_shard, pack_lines(raw_lines[start:start + shard_lines]), origin)
+                for start in range(0, len(raw_lines), shard_lines)
+            ]
+            field_tuples = []
+            for future in futures:
+                field_tuples.extend(future.result())
+        except BrokenProcessPool as e:
+            print(f"WARNING: Parser worker pool failed ({e}); parsing this batch in-process.")
+            self._reset_executor()
+            return self._parse_inline(raw_lines, origin)
+        return self._rebuild(raw_lines, field_tuples)
+
+    def iter_parse(self, raw_lines: Iterable[str], origin: Optional[str] = None) -> Iterator[LogEntry]:
+        """
+        Streams LogEntry objects for an arbitrarily long iterable of lines (e.g. a large file),
+        keeping two chunks per worker in flight and yielding results in input order. If the
+        worker pool breaks, the chunks still in flight and the rest of the lines are parsed
+        in-process, as parse_lines does for a batch.
+        """
+        raw_lines = iter(raw_lines)
+        if self.workers > 1:
+            in_flight = deque() # [lines, future]; a chunk stays here until its entries are yielded
+            chunk: List[str] = []
+
+            def submit(lines):
+                in_flight.append([lines, None])
+                in_flight[-1][1] = executor.submit(_parse_shard, pack_lines(lines), origin)
+
+            def oldest() -> List[LogEntry]:
+                lines, future = in_flight[0]
+                entries = self._rebuild(lines, future.result())
+                in_flight.popleft()
+                return entries
+
+            try:
+                executor = self._get_executor()
+                for raw_log in raw_lines:
+                    chunk.append(raw_log)
+                    if len(chunk) >= self.chunk_lines:
+                        submit(chunk)
+                        chunk = []
+                        while len(in_flight) >= 2 * self.workers:
+                            yield from oldest()
+                if chunk:
+                    submit(chunk)
+                    chunk = []
+                while in_flight:
+                    yield from oldest()
+                return
+            except BrokenProcessPool as e:
+                print(f"WARNING: Parser worker pool failed ({e}); parsing the rest of the stream in-process.")
+                self._reset_executor()
+            # Nothing still in flight has been yielded: parse it here, in order, then carry on with the stream
+            for lines, _ in in_flight:
+                yield from self._parse_inline(lines, origin)
+            yield from self._parse_inline(chunk, origin)
+        for raw_log in raw_lines:
+            yield self.log_parser.parse_log_line(raw_log, origin)
+
+    def close(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=True)
+                self._executor = None
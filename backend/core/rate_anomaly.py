@@ -0,0 +1,161 @@
+# backend/core/rate_anomaly.py
+
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+try:
+    import numpy as np # Only needed for rate anomaly detection
+except ImportError:
+    np = None
+
+from backend.database.models import LogEntry
+
+SeriesKey = Tuple[str, str, str] # (host, source, level), as extracted by LogParser
+
+
+class RateAnomalyDetector:
+    """
+    Learns a per-(host, source, level) baseline of logs per minute and flags minutes that
+    are far above it. observe() only bumps a Python counter for the log's series; once a
+    minute the counts of every series are moved into NumPy arrays and scored together:
+
+      - counts[series, minute % history_minutes]: ring of the last history_minutes counts
+      - mean/var[series]: exponentially weighted mean and variance (weight alpha per minute)
+      - z = (count - mean) / (sqrt(var) + 1); z above z_threshold (with at least min_count logs and
+        warmup_minutes of history for the series) is reported to on_anomalies
+
+    Series that go quiet are scored with a count of 0, so the baselines keep decaying.
+    At most max_series series are tracked; logs for further series are only counted.
+    """
+
+    def __init__(self, on_anomalies: Callable[[List[Dict[str, Any]]], None], z_threshold: float = 4.0,
+                 alpha: float = 0.1, min_count: int = 20, warmup_minutes: int = 30,
+                 history_minutes: int = 60, max_series: int = 50000, clock: Callable[[], float] = time.time):
+        if np is None:
+            raise RuntimeError("NumPy is not installed; pip install numpy to enable rate anomaly detection")
+        self.on_anomalies = on_anomalies
+        self.z_threshold = z_threshold
+        self.alpha = alpha
+        self.min_count = min_count
+        self.warmup_minutes = warmup_minutes
+        self.history_minutes = history_minutes
+        self.max_series = max_series
+        self.clock = clock
+
+        self._lock = threading.Lock()
+        self._series: Dict[SeriesKey, int] = {} # key -> row in the arrays below
+        self._keys: List[SeriesKey] = []
+        self._pending: List[int] = [] # Counts for the current minute, one per row
+        self._minute = int(clock() // 60)
+        self._capacity = 0
+        self._counts = np.zeros((0, history_minutes), dtype=np.int32)
+        self._mean = np.zeros(0)
+        self._var = np.zeros(0)
+        self._minutes_seen = np.zeros(0, dtype=np.int32)
+        self._stop = threading.Event()
+        self.stats: Dict[str, Any] = {"observed": 0, "untracked": 0, "minutes_scored": 0,
+                                      "anomalies": 0, "last_score_ms": 0.0}
+        self._thread = threading.Thread(target=self._run, name="rate-anomaly-scorer", daemon=True)
+        self._thread.start()
+
+    def _grow(self, needed: int):
+        """Doubles the arrays (up to max_series rows) so rows can be added without a copy per series."""
+        capacity = min(self.max_series, max(1024, self._capacity * 2, needed))
+        extra = capacity - self._capacity
+        self._counts = np.vstack([self._counts, np.zeros((extra, self.history_minutes), dtype=np.int32)])
+        self._mean = np.concatenate([self._mean, np.zeros(extra)])
+        self._var = np.concatenate([self._var, np.zeros(extra)])
+        self._minutes_seen = np.concatenate([self._minutes_seen, np.zeros(extra, dtype=np.int32)])
+        self._capacity = capacity
+
+    def observe(self, log_entry: LogEntry):
+        """Counts one log in the current minute for its (host, source, level) series."""
+        key = (log_entry.host, log_entry.source, log_entry.level)
+        with self._lock:
+            self.stats["observed"] += 1
+            row = self._series.get(key)
+            if row is None:
+                if len(self._keys) >= self.max_series:
+                    self.stats["untracked"] += 1
+                    return
+                row = len(self._keys)
+                self._series[key] = row
+                self._keys.append(key)
+                self._pending.append(0)
+            self._pending[row] += 1
+
+    def tick(self) -> List[Dict[str, Any]]:
+        """Scores every minute that has ended since the last call. Returns the anomalies found."""
+        minute = int(self.clock() // 60)
+        anomalies = []
+        with self._lock:
+            if minute <= self._minute:
+                return anomalies
+            start = time.perf_counter()
+            if len(self._keys) > self._capacity:
+                self._grow(len(self._keys))
+            rows = len(self._keys)
+            pending = np.zeros(rows, dtype=np.int32)
+            pending[:len(self._pending)] = self._pending
+            self._pending = [0] * rows
+            # The minute that just ended gets the pending counts; any idle minutes after it get zeros
+            for closed_minute in range(self._minute, min(minute, self._minute + self.history_minutes)):
+                anomalies.extend(self._score(closed_minute, pending, rows))
+                pending = np.zeros(rows, dtype=np.int32)
+            self._minute = minute
+            self.stats["last_score_ms"] = round((time.perf_counter() - start) * 1000, 2)
+            self.stats["anomalies"] += len(anomalies)
+        return anomalies
+
+    def _score(self, minute: int, counts: "np.ndarray", rows: int) -> List[Dict[str, Any]]:
+        """Scores one minute of counts for all series at once, then folds them into the baselines."""
+        self._counts[:rows, minute % self.history_minutes] = counts
+        mean, var, seen = self._mean[:rows], self._var[:rows], self._minutes_seen[:rows]
+        x = counts.astype(np.float64)
+        deviation = x - mean
+        std = np.sqrt(var)
+        z = deviation / (std + 1.0) # +1 keeps near-constant series from flagging on a single extra log
+        flagged = np.flatnonzero((z > self.z_threshold) & (x >= self.min_count) & (seen >= self.warmup_minutes))
+        anomalies = []
+        for row in flagged.tolist():
+            host, source, level = self._keys[row]
+            anomalies.append({"host": host, "source": source, "level": level, "minute": minute * 60,
+                              "count": int(counts[row]), "baseline_mean": round(float(mean[row]), 2),
+                              "baseline_std": round(float(std[row]), 2), "z_score": round(float(z[row]), 2)})
+
+        # EWMA update, in place on the array views: mean += a*d; var = (1-a)*(var + a*d^2).
+        # A new series starts its baseline at its first count.
+        increment = self.alpha * deviation
+        first = seen == 0
+        mean += np.where(first, deviation, increment)
+        var[:] = np.where(first, 0.0, (1 - self.alpha) * (var + deviation * increment))
+        seen += 1
+        self.stats["minutes_scored"] += 1
+        return anomalies
+
+    def recent_counts(self, key: SeriesKey) -> Optional[List[int]]:
+        """The last history_minutes per-minute counts for a series, oldest first (None if untracked)."""
+        with self._lock:
+            row = self._series.get(key)
+            if row is None or row >= self._capacity:
+                return None
+            slot = self._minute % self.history_minutes
+            return np.roll(self._counts[row], -slot).tolist()
+
+    def _run(self):
+        while not self._stop.wait(1.0):
+            try:
+                anomalies = self.tick()
+                if anomalies:
+                    self.on_anomalies(anomalies)
+            except Exception as e:
+                print(f"ERROR: Rate anomaly scoring failed: {e}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return dict(self.stats, series=len(self._keys), max_series=self.max_series)
+
+    def close(self):
+        self._stop.set()
+        self._thread.join()
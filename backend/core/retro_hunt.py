@@ -0,0 +1,210 @@
+# backend/core/retro_hunt.py
+
+import json
+import os
+import time
+import uuid
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+try:
+    import numpy as np # Only needed for retro-hunts
+except ImportError:
+    np = None
+
+from bson import ObjectId
+
+from backend.core.correlation import ThresholdCorrelator
+from backend.core.detection_rules import DetectionRules
+from backend.core.sequence_correlation import SequenceCorrelator
+from backend.database.db_client import SiemDatabase
+from backend.database.models import LogEntry
+
+
+class _ColumnBatch:
+    """
+    One batch of raw log documents as columns. level/source are object arrays compared with
+    ==, so the equality predicates run as one vectorized pass per batch; message_contains
+    substrings are then checked in Python on the surviving rows only, against lowercased
+    messages kept as a plain list (a fixed-width unicode array would be sized by the longest
+    message in the batch). LogEntry objects are only built for rows that reach a "condition"
+    callable or produce a hit.
+    """
+
+    def __init__(self, documents: List[Dict[str, Any]]):
+        self.documents = documents
+        self.size = len(documents)
+        self.levels = np.array([document.get("level") for document in documents], dtype=object)
+        self.sources = np.array([document.get("source") for document in documents], dtype=object)
+        self.messages_lower = [(document.get("message") or "").lower() for document in documents]
+        self._equality_masks: Dict[tuple, Any] = {}
+        self._entries: Dict[int, LogEntry] = {}
+
+    def equals(self, column: str, value: Any):
+        mask = self._equality_masks.get((column, value))
+        if mask is None:
+            mask = getattr(self, column) == value
+            self._equality_masks[(column, value)] = mask
+        return mask
+
+    def entry(self, row: int) -> LogEntry:
+        log_entry = self._entries.get(row)
+        if log_entry is None:
+            log_entry = LogEntry.from_dict(dict(self.documents[row]))
+            self._entries[row] = log_entry
+        return log_entry
+
+    def matching_rows(self, matcher: Dict[str, Any]):
+        """Row numbers (ascending, i.e. time order) matched by a rule or sequence step."""
+        match = matcher.get("match", {})
+        mask = np.ones(self.size, dtype=bool)
+        if match.get("level") is not None:
+            mask &= self.equals("levels", match["level"])
+        if match.get("source") is not None:
+            mask &= self.equals("sources", match["source"])
+        rows = np.flatnonzero(mask)
+        for substring in matcher.get("message_contains", ()):
+            if not rows.size:
+                break
+            substring = substring.lower()
+            messages_lower = self.messages_lower
+            rows = np.array([row for row in rows.tolist() if substring in messages_lower[row]], dtype=np.int64)
+        condition = matcher.get("condition")
+        if condition is not None and rows.size:
+            rows = np.array([row for row in rows.tolist() if condition(self.entry(row))], dtype=np.int64)
+        return rows
+
+
+class RetroHunt:
+    """
+    Replays detection rules over stored logs: "would this rule have fired over the last N
+    days?". Logs are streamed from SiemDatabase.iter_log_batches in time order; each batch
+    is turned into columns and every rule's simple predicates are evaluated on the whole
+    batch at once. Rules use the same definitions as DetectionRules (immediate, threshold
+    and sequence rules), but threshold and sequence state lives in correlators private to
+    the hunt, and hits go to the hunt results collection, never to alerts.
+
+    Progress is checkpointed after every batch (last (timestamp, _id) and counters), so an
+    interrupted hunt resumes where it stopped, over its original window. Threshold/sequence
+    windows still open at the checkpoint are not carried over a restart.
+    """
+
+    def __init__(self, db_client: SiemDatabase, rules_engine: DetectionRules, rule_names: Optional[List[str]] = None,
+                 batch_size: int = 5000, checkpoint_path: Optional[str] = None):
+        if np is None:
+            raise RuntimeError("NumPy is not installed; pip install numpy to run retro-hunts")
+        self.db_client = db_client
+        self.rules_engine = rules_engine
+        self.rules = [rule for rule in rules_engine.rules if not rule_names or rule["name"] in rule_names]
+        self.batch_size = batch_size
+        self.checkpoint_path = checkpoint_path
+        self.correlator = ThresholdCorrelator()
+        self.sequences = SequenceCorrelator()
+        self.stats: Dict[str, Any] = {"scanned": 0, "hits": 0, "batches": 0, "hits_by_rule": {}}
+        self.hunt_id: Optional[str] = None
+        self.last_seen: Optional[tuple] = None # (timestamp, _id) of the last log processed
+
+    def _load_checkpoint(self) -> Optional[Dict[str, Any]]:
+        if not self.checkpoint_path or not os.path.exists(self.checkpoint_path):
+            return None
+        with open(self.checkpoint_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def _save_checkpoint(self, start: datetime, end: datetime, complete: bool = False):
+        if not self.checkpoint_path:
+            return
+        checkpoint = {
+            "hunt_id": self.hunt_id,
+            "start": start.isoformat(),
+            "end": end.isoformat(),
+            "rules": [rule["name"] for rule in self.rules],
+            "last_timestamp": self.last_seen[0].isoformat() if self.last_seen else None,
+            "last_id": str(self.last_seen[1]) if self.last_seen else None,
+            "stats": self.stats,
+            "complete": complete,
+        }
+        temp_path = self.checkpoint_path + ".tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(checkpoint, f)
+        os.replace(temp_path, self.checkpoint_path) # Atomic: a crash never leaves a torn checkpoint
+
+    def _result(self, rule: Dict[str, Any], log_entry: LogEntry, log_ids: List[str]) -> Dict[str, Any]:
+        self.stats["hits"] += 1
+        self.stats["hits_by_rule"][rule["name"]] = self.stats["hits_by_rule"].get(rule["name"], 0) + 1
+        return {
+            "hunt_id": self.hunt_id,
+            "rule_name": rule["name"],
+            "severity": rule["severity"],
+            "description": self.rules_engine._format_description(rule["description_template"], log_entry),
+            "timestamp": log_entry.timestamp, # Of the log that would have raised the alert
+            "host": log_entry.host,
+            "source_ip_host": log_entry.source_ip_host,
+            "log_ids": log_ids,
+            "created_at": datetime.now(),
+        }
+
+    def _evaluate(self, batch: _ColumnBatch) -> List[Dict[str, Any]]:
+        results = []
+        for rule in self.rules:
+            if "sequence" in rule:
+                steps_by_row: Dict[int, List[int]] = {}
+                for index, step in enumerate(rule["sequence"]["steps"]):
+                    for row in batch.matching_rows(step).tolist():
+                        steps_by_row.setdefault(row, []).append(index)
+                for row in sorted(steps_by_row):
+                    log_entry = batch.entry(row)
+                    log_ids = self.sequences.observe(rule, steps_by_row[row], log_entry)
+                    if log_ids:
+                        results.append(self._result(rule, log_entry, log_ids))
+                continue
+            for row in batch.matching_rows(rule).tolist():
+                log_entry = batch.entry(row)
+                if rule.get("alert_immediately"):
+                    results.append(self._result(rule, log_entry, [str(log_entry._id)]))
+                else:
+                    log_ids = self.correlator.observe(rule, log_entry)
+                    if log_ids:
+                        results.append(self._result(rule, log_entry, log_ids))
+        return results
+
+    def run(self, start: datetime, end: datetime, resume: bool = True, progress_interval_seconds: float = 5.0) -> Dict[str, Any]:
+        """
+        Hunts over logs with start <= timestamp < end and returns the final stats (including
+        docs_per_sec). With resume, a checkpoint for the same window and rules continues
+        under its hunt id and window.
+        """
+        checkpoint = self._load_checkpoint() if resume else None
+        if checkpoint and not checkpoint.get("complete") and checkpoint["rules"] == [rule["name"] for rule in self.rules]:
+            # The interrupted hunt's own window, so "last 30 days" does not shift between runs
+            start, end = datetime.fromisoformat(checkpoint["start"]), datetime.fromisoformat(checkpoint["end"])
+            self.hunt_id = checkpoint["hunt_id"]
+            self.stats = checkpoint["stats"]
+            if checkpoint["last_id"]:
+                self.last_seen = (datetime.fromisoformat(checkpoint["last_timestamp"]), ObjectId(checkpoint["last_id"]))
+            print(f"Retro-hunt {self.hunt_id}: resuming after {self.stats['scanned']} logs.")
+        else:
+            self.hunt_id = uuid.uuid4().hex
+            print(f"Retro-hunt {self.hunt_id}: {len(self.rules)} rules over logs from {start.isoformat()} to {end.isoformat()}.")
+
+        started = time.perf_counter()
+        scanned_at_start = self.stats["scanned"]
+        next_progress = started + progress_interval_seconds
+        for documents in self.db_client.iter_log_batches(start, end, self.batch_size, self.last_seen):
+            results = self._evaluate(_ColumnBatch(documents))
+            self.db_client.insert_hunt_results(results)
+            self.stats["scanned"] += len(documents)
+            self.stats["batches"] += 1
+            self.last_seen = (documents[-1]["timestamp"], documents[-1]["_id"])
+            self._save_checkpoint(start, end) # Only after the batch's results are written
+            now = time.perf_counter()
+            if now >= next_progress:
+                scanned = self.stats["scanned"] - scanned_at_start
+                print(f"Retro-hunt {self.hunt_id}: {self.stats['scanned']} logs scanned, {self.stats['hits']} hits "
+                      f"({scanned / (now - started):,.0f} docs/sec)")
+                next_progress = now + progress_interval_seconds
+
+        self._save_checkpoint(start, end, complete=True)
+        elapsed = time.perf_counter() - started
+        scanned = self.stats["scanned"] - scanned_at_start
+        return dict(self.stats, hunt_id=self.hunt_id, elapsed_seconds=round(elapsed, 3),
+                    docs_per_sec=round(scanned / elapsed) if elapsed else 0)
@@ -0,0 +1,266 @@
+# backend/core/rule_loader.py
+
+import glob
+import json
+import os
+import re
+import threading
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+try:
+    import yaml # PyYAML, only needed for .yml/.yaml rule files
+except ImportError:
+    yaml = None
+
+from backend.database.models import LogEntry
+
+RULE_FILE_EXTENSIONS = ('.yml', '.yaml', '.json')
+LOG_FIELDS = ('timestamp', 'host', 'source', 'level', 'message', 'source_ip_host', 'destination_ip_host', 'raw_log')
+# Placeholders available to description templates (see DetectionRules._format_description)
+DESCRIPTION_FIELDS = ('timestamp', 'host', 'source', 'level', 'message', 'source_ip_host',
+                      'destination_ip_host', 'raw_log_short', 'message_snippet')
+
+
+class RuleFileError(ValueError):
+    """A rule file could not be read or one of its rules is invalid."""
+
+
+# --- Predicate compilation ---
+# Each "where" entry becomes one closure over precompiled values, e.g.
+#   {field: host, in: [db-1, db-2]}          -> lambda log: log.host in frozenset(...)
+#   {field: message, regex: "user \\w+ locked"} -> lambda log: pattern.search(log.message)
+
+def _field_getter(field: str) -> Callable[[LogEntry], Any]:
+    if field not in LOG_FIELDS:
+        raise RuleFileError(f"Unknown log field '{field}' (expected one of {', '.join(LOG_FIELDS)})")
+    return lambda log: getattr(log, field)
+
+def _compile_predicate(spec: Dict[str, Any]) -> Callable[[LogEntry], bool]:
+    get = _field_getter(spec.get('field', 'message'))
+    ignore_case = spec.get('ignore_case', True)
+    if 'equals' in spec:
+        expected = spec['equals']
+        return lambda log: get(log) == expected
+    if 'not_equals' in spec:
+        unexpected = spec['not_equals']
+        return lambda log: get(log) != unexpected
+    if 'in' in spec:
+        allowed = frozenset(spec['in'])
+        return lambda log: get(log) in allowed
+    if 'contains' in spec:
+        needle = spec['contains'].lower() if ignore_case else spec['contains']
+        if ignore_case:
+            return lambda log: needle in (get(log) or '').lower()
+        return lambda log: needle in (get(log) or '')
+    if 'startswith' in spec:
+        prefix = spec['startswith']
+        return lambda log: (get(log) or '').startswith(prefix)
+    if 'regex' in spec:
+        try:
+            pattern = re.compile(spec['regex'], re.IGNORECASE if ignore_case else 0)
+        except re.error as e:
+            raise RuleFileError(f"Invalid regex {spec['regex']!r}: {e}")
+        search = pattern.search
+        return lambda log: search(get(log) or '') is not None
+    raise RuleFileError(f"Predicate needs one of equals/not_equals/in/contains/startswith/regex: {spec}")
+
+def _all_of(predicates: List[Callable[[LogEntry], bool]]) -> Optional[Callable[[LogEntry], bool]]:
+    if not predicates:
+        return None
+    if len(predicates) == 1:
+        return predicates[0]
+    def condition(log: LogEntry) -> bool:
+        for predicate in predicates:
+            if not predicate(log):
+                return False
+        return True
+    return condition
+
+
+def _compile_matcher(spec: Dict[str, Any]) -> Dict[str, Any]:
+    """The match/message_contains/condition fields of a rule or sequence step."""
+    match = dict(spec.get('match') or {})
+    unknown_match_fields = set(match) - {'level', 'source'}
+    if unknown_match_fields:
+        raise RuleFileError(f"'match' only supports level and source, use 'where' for {sorted(unknown_match_fields)}")
+    substrings = spec.get('message_contains') or []
+    if isinstance(substrings, str):
+        substrings = [substrings]
+
+    predicates = [_compile_predicate(where) for where in spec.get('where') or []]
+    if spec.get('message_regex'):
+        predicates.append(_compile_predicate({'field': 'message', 'regex': spec['message_regex']}))
+    return {"match": match, "message_contains": list(substrings), "condition": _all_of(predicates)}
+
+def _compile_sequence(spec: Dict[str, Any]) -> Dict[str, Any]:
+    """{within_minutes, steps: [{match..., key, count}, ...]} -> the form SequenceCorrelator walks."""
+    steps = spec.get('steps') or []
+    if len(steps) < 2:
+        raise RuleFileError("a sequence needs at least two steps")
+    compiled_steps = []
+    for position, step in enumerate(steps, 1):
+        if not isinstance(step, dict):
+            raise RuleFileError(f"sequence step {position} must be a mapping")
+        if not step.get('key'):
+            raise RuleFileError(f"sequence step {position} is missing 'key' (the log field its events are grouped on)")
+        _field_getter(step['key'])
+        compiled = _compile_matcher(step)
+        compiled["key"] = step['key']
+        compiled["count"] = int(step.get('count', 1))
+        compiled_steps.append(compiled)
+    return {"within_minutes": float(spec.get('within_minutes', 5)), "steps": compiled_steps}
+
+
+def compile_rule(spec: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Compiles one rule from a rule file into the dict form DetectionRules indexes:
+      name, severity, description         (required)
+      match: {level: ..., source: ...}    equality on level/source (drives the dispatch index)
+      message_contains: [...]             case-insensitive substrings, all required
+      message_regex: "..."                regex searched in the message (case-insensitive)
+      where: [{field, equals|not_equals|in|contains|startswith|regex}, ...]
+      threshold: {count, window_minutes, group_by: [...]}   omitted = alert on every match
+      sequence: {within_minutes, steps: [{match..., key, count}, ...]}   ordered events instead;
+                each step takes the matching fields above, "key" is the log field it is grouped on
+    Regexes are compiled here, once; the resulting "condition" is a plain closure.
+    """
+    if not isinstance(spec, dict):
+        raise RuleFileError(f"Rule must be a mapping, got {type(spec).__name__}")
+    for required in ('name', 'severity', 'description'):
+        if not spec.get(required):
+            raise RuleFileError(f"Rule {spec.get('name', '<unnamed>')!r} is missing '{required}'")
+    name = spec['name']
+    try:
+        rule = {
+            "name": name,
+            **_compile_matcher(spec),
+            "severity": spec['severity'],
+            "description_template": spec['description'],
+        }
+        threshold = spec.get('threshold')
+        sequence = spec.get('sequence')
+        if sequence:
+            if threshold:
+                raise RuleFileError("a rule cannot have both 'threshold' and 'sequence'")
+            rule["sequence"] = _compile_sequence(sequence)
+        elif threshold:
+            rule["threshold_count"] = int(threshold.get('count', 1))
+            rule["threshold_time_window_minutes"] = float(threshold.get('window_minutes', 5))
+            rule["group_by"] = list(threshold.get('group_by') or [])
+            for field in rule["group_by"]:
+                _field_getter(field)
+        else:
+            rule["alert_immediately"] = True
+        rule["description_template"].format(**{field: '' for field in DESCRIPTION_FIELDS}) # Fail on unknown placeholders now
+    except RuleFileError as e:
+        raise RuleFileError(f"Rule {name!r}: {e}")
+    except (KeyError, IndexError, TypeError, ValueError) as e:
+        raise RuleFileError(f"Rule {name!r}: invalid value ({e})")
+    return rule
+
+# --- Files ---
+
+def rule_files(path: str) -> List[str]:
+    """The rule files at path: the file itself, or every rule file in the directory (sorted)."""
+    if os.path.isdir(path):
+        return sorted(file_path for file_path in glob.glob(os.path.join(path, '*'))
+                      if file_path.endswith(RULE_FILE_EXTENSIONS))
+    return [path]
+
+def load_rule_file(file_path: str) -> List[Dict[str, Any]]:
+    """Parses one YAML or JSON file holding a list of rules (or {"rules": [...]}) and compiles them."""
+    try:
+        with open(file_path, encoding='utf-8') as f:
+            if file_path.endswith('.json'):
+                document = json.load(f)
+            elif yaml is None:
+                raise RuleFileError("PyYAML is not installed; use a .json rule file or pip install PyYAML")
+            else:
+                document = yaml.safe_load(f)
+    except (OSError, ValueError) as e: # yaml.YAMLError is not a ValueError, handled below
+        raise RuleFileError(f"{file_path}: {e}")
+    except Exception as e:
+        if yaml is not None and isinstance(e, yaml.YAMLError):
+            raise RuleFileError(f"{file_path}: {e}")
+        raise
+    specs = document.get('rules') if isinstance(document, dict) else document
+    if not isinstance(specs, list):
+        raise RuleFileError(f"{file_path}: expected a list of rules or a mapping with a 'rules' list")
+    try:
+        return [compile_rule(spec) for spec in specs]
+    except RuleFileError as e:
+        raise RuleFileError(f"{file_path}: {e}")
+
+def load_rules(path: str) -> List[Dict[str, Any]]:
+    """Loads and compiles every rule under path. Raises RuleFileError without partial results."""
+    files = rule_files(path)
+    if not files:
+        raise RuleFileError(f"No rule files found at {path}")
+    rules = []
+    names = set()
+    for file_path in files:
+        for rule in load_rule_file(file_path):
+            if rule["name"] in names:
+                raise RuleFileError(f"{file_path}: duplicate rule name {rule['name']!r}")
+            names.add(rule["name"])
+            rules.append(rule)
+    return rules
+
+
+class RuleFileWatcher:
+    """
+    Polls the rule files' mtimes/sizes and, when anything changes, recompiles the whole set
+    off the ingest path and hands it to on_reload (DetectionRules.set_rules, a single atomic
+    swap). A file that fails to compile keeps the previous rules in place.
+    """
+
+    def __init__(self, path: str, on_reload: Callable[[List[Dict[str, Any]]], None], interval_seconds: float = 2.0):
+        self.path = path
+        self.on_reload = on_reload
+        self.interval = interval_seconds
+        self._signature = self._current_signature()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.reloads = 0
+
+    def _current_signature(self) -> Tuple:
+        signature = []
+        for file_path in rule_files(self.path):
+            try:
+                stat = os.stat(file_path)
+                signature.append((file_path, stat.st_mtime_ns, stat.st_size))
+            except OSError:
+                signature.append((file_path, None, None))
+        return tuple(signature)
+
+    def check(self) -> bool:
+        """Reloads if the files changed. Returns True if a new rule set was swapped in."""
+        signature = self._current_signature()
+        if signature == self._signature:
+            return False
+        self._signature = signature
+        try:
+            rules = load_rules(self.path)
+        except RuleFileError as e:
+            print(f"ERROR: Rule reload failed, keeping the current rules: {e}")
+            return False
+        self.on_reload(rules)
+        self.reloads += 1
+        print(f"Detection rules reloaded from {self.path}: {len(rules)} rules.")
+        return True
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="rule-file-watcher", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.check()
+            except Exception as e:
+                print(f"ERROR: Rule file watcher failed: {e}")
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
@@ -0,0 +1,157 @@
+# backend/core/rule_profiler.py
+
+import threading
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+SUB_BUCKET_BITS = 2 # 4 histogram buckets per power of two: p99 is exact to within ~19%
+HISTOGRAM_BUCKETS = 64 << SUB_BUCKET_BITS
+
+
+def _bucket(duration_ns: int) -> int:
+    bits = duration_ns.bit_length()
+    if bits <= SUB_BUCKET_BITS:
+        return duration_ns
+    return (bits << SUB_BUCKET_BITS) | ((duration_ns >> (bits - 1 - SUB_BUCKET_BITS)) & ((1 << SUB_BUCKET_BITS) - 1))
+
+
+def _bucket_upper_ns(bucket: int) -> int:
+    bits, sub = bucket >> SUB_BUCKET_BITS, bucket & ((1 << SUB_BUCKET_BITS) - 1)
+    if bits <= SUB_BUCKET_BITS:
+        return bucket
+    return ((1 << SUB_BUCKET_BITS) + sub + 1) << (bits - 1 - SUB_BUCKET_BITS)
+
+
+class RuleProfiler:
+    """
+    Per-rule counters for DetectionRules: evaluations, matches, alerts created/suppressed,
+    and evaluation time (total and p99) from time.perf_counter_ns.
+
+    Keeping it cheap on the hot path:
+      - evaluations are not counted per rule: DetectionRules counts logs on its per-(level,
+        source) candidate cache entries, and hands those counts over (fold_evaluations) as
+        (candidate rule names, logs) when stats are read, rules change or the cache is cleared
+      - timing is taken on 1 in sample_every logs (0 = never), picked per batch; the time totals
+        are scaled back up by sample_every, and the p99 comes from a log-linear histogram
+      - log, match and alert counts are plain increments without the lock, so concurrent
+        detection workers can very rarely lose one; they are profiling figures, not an audit trail
+    """
+
+    def __init__(self, sample_every: int = 100, summary_interval_seconds: float = 0, summary_top: int = 10):
+        self.sample_every = sample_every
+        self.summary_interval = summary_interval_seconds
+        self.summary_top = summary_top
+        self._lock = threading.Lock()
+        self._logs_seen = 0
+        self._match_counts: Dict[str, int] = {}
+        self._alert_counts: Dict[tuple, int] = {} # (name, suppressed) -> count
+        self._rules: Dict[str, list] = {} # name -> [evaluations, matches, alerts, suppressed, timed, total ns, histogram]
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._summary_source: Optional[Callable[[], List[Dict[str, Any]]]] = None
+
+    def _rule(self, name: str) -> list:
+        counters = self._rules.get(name)
+        if counters is None:
+            counters = [0, 0, 0, 0, 0, 0, [0] * HISTOGRAM_BUCKETS]
+            self._rules[name] = counters
+        return counters
+
+    def sample_positions(self, batch_size: int) -> range:
+        """Positions in the next batch of logs whose rule evaluations should be timed."""
+        if not self.sample_every:
+            return range(0)
+        with self._lock:
+            first = -self._logs_seen % self.sample_every
+            self._logs_seen += batch_size
+        return range(first, batch_size, self.sample_every)
+
+    def fold_evaluations(self, evaluated: Iterable[Tuple[List[str], int]]):
+        """
+        Adds (candidate rule names, logs dispatched to them) counts to per-rule evaluations, and
+        moves the pending match and alert counts into the per-rule counters.
+        """
+        with self._lock:
+            match_counts, self._match_counts = self._match_counts, {}
+            alert_counts, self._alert_counts = self._alert_counts, {}
+            for names, count in evaluated:
+                for name in names:
+                    self._rule(name)[0] += count
+            for name, count in match_counts.items():
+                self._rule(name)[1] += count
+            for (name, suppressed), count in alert_counts.items():
+                self._rule(name)[3 if suppressed else 2] += count
+
+    def record_matches(self, names: List[str]):
+        """Counts the rules one log matched."""
+        match_counts = self._match_counts
+        for name in names:
+            match_counts[name] = match_counts.get(name, 0) + 1
+
+    def record_alert(self, name: str, suppressed: bool = False):
+        alert_counts = self._alert_counts
+        alert_counts[(name, suppressed)] = alert_counts.get((name, suppressed), 0) + 1
+
+    def record_timings(self, timings: List[Tuple[str, int]]):
+        """Records the (rule name, duration ns) evaluation times of one sampled log."""
+        with self._lock:
+            for name, duration_ns in timings:
+                counters = self._rule(name)
+                counters[4] += 1
+                counters[5] += duration_ns
+                counters[6][min(_bucket(duration_ns), HISTOGRAM_BUCKETS - 1)] += 1
+
+    def get_stats(self) -> List[Dict[str, Any]]:
+        """One entry per rule, most expensive (estimated total evaluation time) first."""
+        scale = self.sample_every or 0
+        with self._lock:
+            rows = []
+            for name, (evaluations, matches, alerts, suppressed, timed, total_ns, histogram) in self._rules.items():
+                p99_ns = 0
+                if timed:
+                    threshold, cumulative = timed * 0.99, 0
+                    for bucket, count in enumerate(histogram):
+                        cumulative += count
+                        if cumulative >= threshold:
+                            p99_ns = _bucket_upper_ns(bucket)
+                            break
+                rows.append({
+                    "rule_name": name,
+                    "evaluations": evaluations,
+                    "matches": matches,
+                    "alerts_created": alerts,
+                    "alerts_suppressed": suppressed,
+                    "timed_evaluations": timed,
+                    "est_total_ms": round(total_ns * scale / 1e6, 3),
+                    "mean_us": round(total_ns / timed / 1e3, 3) if timed else None,
+                    "p99_us": round(p99_ns / 1e3, 3) if timed else None,
+                })
+        rows.sort(key=lambda row: (row["est_total_ms"], row["evaluations"]), reverse=True)
+        return rows
+
+    def start_summary(self, stats_source: Callable[[], List[Dict[str, Any]]]):
+        """Prints the top rules every summary_interval_seconds (no-op when the interval is 0)."""
+        if not self.summary_interval:
+            return
+        self._summary_source = stats_source
+        self._thread = threading.Thread(target=self._run, name="rule-profile-summary", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while not self._stop.wait(self.summary_interval):
+            try:
+                rows = self._summary_source()[:self.summary_top]
+            except Exception as e:
+                print(f"ERROR: Rule profile summary failed: {e}")
+                continue
+            if not rows:
+                continue
+            print(f"Rule profile (top {len(rows)} by est. evaluation time, timing 1 in {self.sample_every} logs):")
+            for row in rows:
+                print(f"  {row['rule_name'][:40]:<40} evals={row['evaluations']:<10} matches={row['matches']:<8} "
+                      f"alerts={row['alerts_created']:<6} est_total={row['est_total_ms']}ms "
+                      f"p99={'-' if row['p99_us'] is None else row['p99_us']}us")
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
@@ -0,0 +1,167 @@
+# backend/core/sequence_correlation.py
+
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Any, Dict, Iterable, List, Optional
+
+from backend.database.models import LogEntry
+
+
+class SequenceCorrelator:
+    """
+    Partial-match state for sequence rules ("A, then B, then C within N minutes").
+
+    A sequence rule is a linear NFA: step i is waiting for its i-th event. Each step names
+    the log field its events are keyed on ("key"), and the value for step i+1 is read from
+    the log that completed step i. So in
+        3 x AUTH_FAILED (key source_ip_host) -> login (key source_ip_host) -> data export (key host)
+    the login must come from the failing IP, and the export must happen on the host that IP
+    logged into. A step with "count" > 1 needs that many matching events for its key.
+
+    Partial matches are indexed by (rule name, step, key value), so an event only touches
+    the states waiting for its own key; each entry is a small list
+    [sequence start (event time), log ids of earlier steps, this step's hits, last touched
+    (monotonic), event time of the previous step (on the first step: of its latest hit)]. A step's hits are a ring buffer (deque with
+    maxlen = count) of (event time, log id), as in ThresholdCorrelator: on the first step, hits
+    older than within_minutes are dropped from the front, so the window slides; on later steps
+    the sequence start is fixed, and the match expires once an event arrives more than
+    within_minutes after it. A later step only takes events no older than the previous step's
+    (event time, not arrival order). Logs without a value for a step's key (None, "" or "N/A",
+    e.g. no IP in the line) are ignored for that step, so unrelated keyless events never share
+    one partial match.
+    Keys untouched for longer than their window are swept out, and beyond max_keys the least
+    recently touched entry is evicted, like ThresholdCorrelator.
+    """
+
+    def __init__(self, max_keys: int = 100000, sweep_interval_seconds: float = 10.0):
+        self.max_keys = max_keys
+        self.sweep_interval = sweep_interval_seconds
+        self._states: "OrderedDict[tuple, list]" = OrderedDict()
+        self._windows: Dict[str, float] = {} # rule name -> window seconds (for the idle sweep)
+        self._lock = threading.Lock()
+        self._next_sweep = time.monotonic() + sweep_interval_seconds
+        self.stats: Dict[str, int] = {"observed": 0, "advanced": 0, "fired": 0, "expired": 0,
+                                      "evicted_idle": 0, "evicted_overflow": 0, "keyless": 0}
+
+    def observe(self, rule: Dict[str, Any], step_indexes: Iterable[int], log_entry: LogEntry) -> Optional[List[str]]:
+        """
+        Feeds one log that matched the given steps of a sequence rule. Returns the ids of every
+        log in the sequence when this log completes it, otherwise None.
+        """
+        sequence = rule["sequence"]
+        steps = sequence["steps"]
+        window_seconds = sequence["within_minutes"] * 60
+        name = rule["name"]
+        event_time = log_entry.timestamp.timestamp()
+        log_id = str(log_entry._id)
+        now = time.monotonic()
+        fired = None
+
+        with self._lock:
+            self.stats["observed"] += 1
+            self._windows[name] = window_seconds
+            # Later steps first, so one log never advances a match through two steps at once
+            for index in sorted(step_indexes, reverse=True):
+                step = steps[index]
+                value = _key_value(log_entry, step["key"])
+                if value is None:
+                    self.stats["keyless"] += 1
+                    continue
+                key = (name, index, value)
+                count = step.get("count", 1)
+                state = self._states.get(key)
+                if index == 0:
+                    if state is None:
+                        state = [event_time, [], deque(maxlen=count), now, event_time]
+                        self._put(key, state)
+                    else:
+                        state[3] = now
+                        self._states.move_to_end(key)
+                    hits = state[2]
+                    hits.append((event_time, log_id))
+                    state[4] = max(state[4], event_time)
+                    while hits and state[4] - hits[0][0] > window_seconds: # Slide: only these hits expired
+                        hits.popleft()
+                        self.stats["expired"] += 1
+                    if not hits:
+                        continue
+                    state[0] = min(hit_time for hit_time, _ in hits)
+                else:
+                    if state is None:
+                        continue # Nothing is waiting at this step for this key
+                    if event_time - state[0] > window_seconds:
+                        del self._states[key]
+                        self.stats["expired"] += 1
+                        continue
+                    if event_time < state[4]:
+                        continue # Happened before the previous step's event: out of order, not a continuation
+                    state[3] = now
+                    self._states.move_to_end(key)
+                    hits = state[2]
+                    hits.append((event_time, log_id))
+                if len(hits) < count:
+                    continue
+
+                del self._states[key]
+                log_ids = state[1] + [hit_id for _, hit_id in hits]
+                if index == len(steps) - 1:
+                    fired = log_ids
+                    self.stats["fired"] += 1
+                    continue
+                next_value = _key_value(log_entry, steps[index + 1]["key"])
+                if next_value is None:
+                    self.stats["keyless"] += 1
+                    continue # Nothing to key the next step on: the partial match ends here
+                self._advance((name, index + 1, next_value), state[0], log_ids,
+                              max(state[4], max(hit_time for hit_time, _ in hits)),
+                              steps[index + 1].get("count", 1), now)
+                self.stats["advanced"] += 1
+
+            if now >= self._next_sweep:
+                self._sweep_idle(now)
+        return fired
+
+    def _advance(self, key: tuple, start: float, log_ids: List[str], previous_time: float, count: int, now: float):
+        """
+        Moves a completed step's match to the next step. A match already waiting there keeps
+        its hits: it takes over the later sequence start (which stays valid longer) only when
+        none of those hits happened before the new match's previous step.
+        """
+        waiting = self._states.get(key)
+        if waiting is None:
+            self._put(key, [start, log_ids, deque(maxlen=count), now, previous_time])
+            return
+        if waiting[0] <= start and all(hit_time >= previous_time for hit_time, _ in waiting[2]):
+            waiting[0], waiting[1], waiting[4] = start, log_ids, previous_time
+        waiting[3] = now
+        self._states.move_to_end(key)
+
+    def _put(self, key: tuple, state: list):
+        self._states[key] = state
+        self._states.move_to_end(key)
+        if len(self._states) > self.max_keys:
+            self._states.popitem(last=False) # Least recently touched partial match
+            self.stats["evicted_overflow"] += 1
+
+    def _sweep_idle(self, now: float):
+        """Drops partial matches untouched for longer than their rule's window (oldest first, so this stops early)."""
+        while self._states:
+            key, state = next(iter(self._states.items()))
+            if now - state[3] <= self._windows.get(key[0], 0):
+                break
+            del self._states[key]
+            self.stats["evicted_idle"] += 1
+        self._next_sweep = now + self.sweep_interval
+
+    def get_stats(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self.stats, partial_matches=len(self._states), max_keys=self.max_keys)
+
+
+def _key_value(log_entry: LogEntry, field: str) -> Optional[Any]:
+    """The log's value for a step key, or None when the parser had nothing for it (None, "" or "N/A")."""
+    value = getattr(log_entry, field, None)
+    if value is None or value == "" or value == "N/A":
+        return None
+    return value
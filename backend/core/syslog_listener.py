@@ -0,0 +1,278 @@
+# backend/core/syslog_listener.py
+
+import asyncio
+import socket
+from typing import Optional, List, Dict, Any
+
+from backend.config import Config
+from backend.database.db_client import SiemDatabase, open_database
+from backend.core.log_parser import LogParser
+from backend.core.detection_rules import DetectionRules
+from backend.core.detection_queue import DetectionStage
+
+class _SyslogUdpProtocol(asyncio.DatagramProtocol):
+    """One datagram is one message; some senders pack several newline-separated lines."""
+
+    def __init__(self, listener: 'SyslogListener'):
+        self.listener = listener
+
+    def datagram_received(self, data: bytes, addr):
+        origin = addr[0] # Each sending host keeps its own cached log format
+        for line in data.split(b'\n'):
+            if line.strip():
+                self.listener.enqueue(line, origin=origin)
+
+
+class _SyslogTcpProtocol(asyncio.Protocol):
+    """
+    Handles both RFC 6587 framings on a single connection:
+      - octet counting: "<length> <message>" (frame starts with a digit)
+      - non-transparent framing: messages terminated by LF (or NUL)
+    The framing is detected per frame, so mixed senders behind a relay still work.
+    """
+
+    def __init__(self, listener: 'SyslogListener'):
+        self.listener = listener
+        self.transport = None
+        self.origin = None # "host:port" of the peer; each connection keeps its own cached log format
+        self.buffer = bytearray()
+        self.backlog: List[bytes] = [] # Frames waiting for queue space while reading is paused
+
+    def connection_made(self, transport):
+        self.transport = transport
+        peer = transport.get_extra_info('peername')
+        self.origin = f"{peer[0]}:{peer[1]}" if peer else None
+        self.listener.stats["tcp_connections"] += 1
+
+    def connection_lost(self, exc):
+        # Whatever is left without a terminator is still a complete message once the peer closes.
+        if self.buffer.strip():
+            self._push(bytes(self.buffer))
+        self.buffer.clear()
+        if not self.backlog: # Keep a backlogged connection registered so its frames still get queued
+            self.listener._paused_protocols.discard(self)
+
+    def data_received(self, data: bytes):
+        self.buffer.extend(data)
+        for frame in self._extract_frames():
+            self._push(frame)
+
+    def _extract_frames(self) -> List[bytes]:
+        frames = []
+        buffer = self.buffer
+        position = 0
+        max_frame = self.listener.max_frame_bytes
+        while position < len(buffer):
+            newline = self._find_terminator(position)
+            if 48 <= buffer[position] <= 57: # Starts with a digit: possibly "<length> <message>"
+                space = buffer.find(b' ', position, position + 11)
+                length_field = buffer[position:space] if space != -1 else b''
+                if length_field.isdigit() and (newline == -1 or space < newline):
+                    length = int(length_field)
+                    if length > max_frame:
+                        self._reject_oversized()
+                        break
+                    end = space + 1 + length
+                    if end > len(buffer):
+                        break # Wait for the rest of the frame
+                    frames.append(bytes(buffer[space + 1:end]))
+                    position = end
+                    continue
+                if space == -1 and newline == -1 and len(buffer) - position < 11:
+                    break # Not enough bytes yet to tell the framings apart
+            if newline == -1:
+                if len(buffer) - position > max_frame:
+                    self._reject_oversized()
+                break
+            frames.append(bytes(buffer[position:newline]))
+            position = newline + 1
+        del buffer[:position]
+        return [frame for frame in frames if frame.strip()]
+
+    def _find_terminator(self, position: int) -> int:
+        """Index of the next LF or NUL frame terminator, or -1."""
+        newline = self.buffer.find(b'\n', position)
+        nul = self.buffer.find(b'\x00', position)
+        if nul != -1 and (newline == -1 or nul < newline):
+            return nul
+        return newline
+
+    def _reject_oversized(self):
+        self.listener.stats["oversized_frames"] += 1
+        self.buffer.clear()
+        self.transport.close()
+
+    def _push(self, frame: bytes):
+        if self.backlog or not self.listener.enqueue(frame, drop_when_full=False, origin=self.origin):
+            # TCP can push back instead of dropping: stop reading until the drain catches up.
+            self.backlog.append(frame)
+            if self.transport is not None and not self.transport.is_closing():
+                self.transport.pause_reading()
+            self.listener._paused_protocols.add(self)
+
+    def resume(self) -> bool:
+        """Moves backlogged frames into the queue. Returns True once the backlog is empty."""
+        while self.backlog:
+            if not self.listener.enqueue(self.backlog[0], drop_when_full=False, origin=self.origin):
+                return False
+            self.backlog.pop(0)
+        if self.transport is not None and not self.transport.is_closing():
+            self.transport.resume_reading()
+        return True
+
+
+class SyslogListener:
+    """
+    Native syslog receiver on Config.SYSLOG_LISTENER_PORT (UDP and TCP).
+    Received lines go into a bounded queue; a single drain task pulls them off in batches,
+    parses them with LogParser, bulk-inserts them via SiemDatabase.insert_logs and submits
+    the batch to a DetectionStage, so slow rules or alert writes never hold up the drain.
+    Parsing and DB writes run in a worker thread so the event loop keeps accepting packets
+    while a batch is being written.
+    """
+
+    def __init__(self, db_client: SiemDatabase, log_parser: LogParser, detection_stage: Optional[DetectionStage], config: Config,
+                 host: Optional[str] = None, port: Optional[int] = None):
+        self.db_client = db_client
+        self.log_parser = log_parser
+        self.detection_stage = detection_stage
+        self.config = config
+        self.host = host if host is not None else config.SYSLOG_LISTENER_HOST
+        self.port = port if port is not None else config.SYSLOG_LISTENER_PORT
+        self.batch_size = config.SYSLOG_BATCH_SIZE
+        self.flush_interval = config.SYSLOG_FLUSH_INTERVAL_MS / 1000.0
+        self.max_frame_bytes = config.SYSLOG_MAX_FRAME_BYTES
+        self.queue: Optional[asyncio.Queue] = None
+        self.udp_transport = None
+        self.tcp_server = None
+        self._drain_task = None
+        self._paused_protocols = set()
+        self.stats: Dict[str, Any] = {
+            "received": 0,
+            "dropped": 0,
+            "ingested": 0,
+            "failed": 0,
+            "batches": 0,
+            "tcp_connections": 0,
+            "oversized_frames": 0,
+        }
+
+    def enqueue(self, frame: bytes, drop_when_full: bool = True, origin: Optional[str] = None) -> bool:
+        """Puts one raw frame on the queue. UDP drops when full; TCP asks to be paused instead."""
+        try:
+            self.queue.put_nowait((origin, frame))
+        except asyncio.QueueFull:
+            if drop_when_full:
+                self.stats["dropped"] += 1
+            return False
+        self.stats["received"] += 1
+        return True
+
+    async def start(self):
+        """Binds the UDP endpoint and TCP server and starts the drain task."""
+        loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(maxsize=self.config.SYSLOG_QUEUE_SIZE)
+        self.udp_transport, _ = await loop.create_datagram_endpoint(
+            lambda: _SyslogUdpProtocol(self), local_addr=(self.host, self.port)
+        )
+        # A large kernel receive buffer absorbs UDP bursts while a batch is being written.
+        udp_socket = self.udp_transport.get_extra_info('socket')
+        try:
+            udp_socket.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, self.config.SYSLOG_UDP_RCVBUF_BYTES)
+        except OSError as e:
+            print(f"WARNING: Could not set UDP receive buffer size: {e}")
+        # Port 0 asks the OS for a free port; reuse whatever UDP got so both share one number.
+        if self.port == 0:
+            self.port = self.udp_transport.get_extra_info('sockname')[1]
+        self.tcp_server = await loop.create_server(lambda: _SyslogTcpProtocol(self), self.host, self.port)
+        self._drain_task = asyncio.create_task(self._drain())
+        print(f"Syslog listener: accepting UDP and TCP on {self.host}:{self.port}")
+
+    async def stop(self):
+        """Stops accepting new data and flushes everything already queued."""
+        if self.udp_transport is not None:
+            self.udp_transport.close()
+        if self.tcp_server is not None:
+            self.tcp_server.close()
+            await self.tcp_server.wait_closed()
+        if self._drain_task is not None:
+            await self.queue.join()
+            self._drain_task.cancel()
+            try:
+                await self._drain_task
+            except asyncio.CancelledError:
+                pass
+        print(f"Syslog listener stopped. Stats: {self.stats}")
+
+    async def serve_forever(self):
+        await self.start()
+        try:
+            await asyncio.Event().wait()
+        finally:
+            await self.stop()
+
+    async def _drain(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self.queue.get()]
+            deadline = loop.time() + self.flush_interval
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except asyncio.QueueEmpty:
+                    remaining = deadline - loop.time()
+                    if remaining <= 0:
+                        break
+                    try:
+                        batch.append(await asyncio.wait_for(self.queue.get(), remaining))
+                    except asyncio.TimeoutError:
+                        break
+            try:
+                await loop.run_in_executor(None, self._process_batch, batch)
+            except Exception as e:
+                self.stats["failed"] += len(batch)
+                print(f"ERROR: Syslog listener failed to process a batch of {len(batch)} lines: {e}")
+            finally:
+                for _ in batch:
+                    self.queue.task_done()
+            self._resume_paused_protocols()
+
+    def _resume_paused_protocols(self):
+        for protocol in list(self._paused_protocols):
+            if protocol.resume():
+                self._paused_protocols.discard(protocol)
+
+    def _process_batch(self, frames: List[tuple]):
+        """Parses, stores and runs detection over one batch of (origin, frame) pairs (called in a worker thread)."""
+        log_entries = []
+        for origin, frame in frames:
+            # The parser handles the "<PRI>" header itself: RFC 5424 needs it for the severity.
+            raw_log = frame.rstrip(b'\r\n').decode('utf-8', errors='replace')
+            log_entries.append(self.log_parser.parse_log_line(raw_log, origin=origin))
+        inserted_ids = self.db_client.insert_logs(log_entries)
+        ingested = sum(1 for inserted_id in inserted_ids if inserted_id)
+        self.stats["ingested"] += ingested
+        self.stats["failed"] += len(log_entries) - ingested
+        self.stats["batches"] += 1
+        if self.detection_stage is not None:
+            self.detection_stage.submit_many(log_entries) # Queue full: detection is skipped and counted there
+
+
+def main():
+    config = Config()
+    db_client = open_database(config)
+    log_parser = LogParser()
+    rules_engine = DetectionRules(db_client, config)
+    detection_stage = DetectionStage(rules_engine, config.DETECTION_WORKERS, config.DETECTION_QUEUE_SIZE, config.DETECTION_BATCH_SIZE)
+    listener = SyslogListener(db_client, log_parser, detection_stage, config)
+    try:
+        asyncio.run(listener.serve_forever())
+    except KeyboardInterrupt:
+        print("Syslog listener interrupted.")
+    finally:
+        detection_stage.close()
+        db_client.close()
+
+
+if __name__ == '__main__':
+    main()
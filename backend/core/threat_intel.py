@@ -0,0 +1,329 @@
+# backend/core/threat_intel.py
+
+import glob
+import ipaddress
+import math
+import os
+import re
+import socket
+import threading
+from array import array
+from typing import Any, Dict, List, Optional, Tuple
+
+from backend.database.models import LogEntry
+
+FEED_FILE_EXTENSIONS = ('.txt', '.csv', '.list')
+IOC_FIELDS = ('source_ip_host', 'destination_ip_host')
+DOMAIN_PATTERN = re.compile(r'^(?=.{1,253}$)[a-z0-9_](?:[a-z0-9_-]{0,62}[a-z0-9_])?(?:\.[a-z0-9_](?:[a-z0-9_-]{0,62}[a-z0-9_])?)*$')
+
+# Bloom filter keys are the /24 (IPv4) or /48 (IPv6) networks the indicators cover. A CIDR
+# shorter than that is expanded into those networks, up to MAX_BLOOM_EXPANSION of them;
+# anything wider turns the prefilter off for its address family (the trie is always walked).
+BLOOM_PREFIX = {4: 24, 6: 48}
+ADDRESS_BITS = {4: 32, 6: 128}
+MAX_BLOOM_EXPANSION = 65536
+
+
+def feed_files(path: str) -> List[str]:
+    """Indicator files under path: the file itself, or every .txt/.csv/.list file in the directory (sorted)."""
+    if os.path.isdir(path):
+        return sorted(file_path for file_path in glob.glob(os.path.join(path, '*'))
+                      if file_path.endswith(FEED_FILE_EXTENSIONS) and os.path.isfile(file_path))
+    return [path] if os.path.isfile(path) else []
+
+
+class BloomFilter:
+    """Bit-array Bloom filter over integer keys, sized for a target false-positive rate."""
+
+    def __init__(self, expected_items: int, error_rate: float = 0.01):
+        expected_items = max(1, expected_items)
+        self.size = max(64, int(-expected_items * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hash_count = max(1, round(self.size / expected_items * math.log(2)))
+        self._bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, key: int):
+        # One 64-bit multiplicative hash, split into two halves for double hashing
+        h = (key * 0x9E3779B97F4A7C15 + 0x7F4A7C15) & 0xFFFFFFFFFFFFFFFF
+        h ^= h >> 29
+        h1, h2 = h & 0xFFFFFFFF, (h >> 32) | 1
+        size = self.size
+        return [(h1 + i * h2) % size for i in range(self.hash_count)]
+
+    def add(self, key: int):
+        for position in self._positions(key):
+            self._bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, key: int) -> bool:
+        bits = self._bits
+        for position in self._positions(key):
+            if not bits[position >> 3] & (1 << (position & 7)):
+                return False
+        return True
+
+
+class CidrTrie:
+    """
+    Binary radix trie over addresses packed into ints. Nodes live in two parallel int arrays
+    (left/right child, 0 = none; node 0 is the root) plus a list of the values stored at
+    prefix ends, so several hundred thousand prefixes take a few flat arrays instead of
+    one object per node. longest_match() walks at most as deep as the longest prefix stored.
+    """
+
+    def __init__(self, bits: int):
+        self.bits = bits
+        self.max_length = 0
+        self.count = 0
+        self._children = (array('l', [0]), array('l', [0]))
+        self._values: List[Any] = [None]
+
+    def insert(self, network: int, length: int, value: Any) -> bool:
+        """Stores value for network/length. Returns False if that exact prefix is already present."""
+        node = 0
+        for depth in range(length):
+            branch = self._children[(network >> (self.bits - 1 - depth)) & 1]
+            child = branch[node]
+            if not child:
+                child = len(self._values)
+                self._children[0].append(0)
+                self._children[1].append(0)
+                self._values.append(None)
+                branch[node] = child
+            node = child
+        if self._values[node] is not None:
+            return False
+        self._values[node] = value
+        self.max_length = max(self.max_length, length)
+        self.count += 1
+        return True
+
+    def longest_match(self, address: int) -> Any:
+        """Value of the most specific stored prefix containing address, or None."""
+        children, values, shift = self._children, self._values, self.bits - 1
+        node, best = 0, self._values[0]
+        for depth in range(self.max_length):
+            node = children[(address >> (shift - depth)) & 1][node]
+            if not node:
+                break
+            if values[node] is not None:
+                best = values[node]
+        return best
+
+    def __len__(self) -> int:
+        return self.count
+
+
+def parse_address(text: str) -> Optional[Tuple[int, int]]:
+    """(version, packed int) for an IPv4/IPv6 address string, or None if it is not one."""
+    try:
+        return 4, int.from_bytes(socket.inet_pton(socket.AF_INET, text), 'big')
+    except OSError:
+        pass
+    if ':' in text:
+        try:
+            return 6, int.from_bytes(socket.inet_pton(socket.AF_INET6, text), 'big')
+        except OSError:
+            pass
+    return None
+
+
+class IndicatorIndex:
+    """
+    Immutable lookup structure for one load of the feeds: a CidrTrie and BloomFilter per
+    address family (single IPs are /32 or /128 prefixes) and a dict of domains. A domain
+    indicator also matches its subdomains. Values are (indicator, feed, description) tuples.
+    """
+
+    def __init__(self, bloom_error_rate: float = 0.01):
+        self.bloom_error_rate = bloom_error_rate
+        self.tries = {4: CidrTrie(32), 6: CidrTrie(128)}
+        self.blooms: Dict[int, Optional[BloomFilter]] = {4: None, 6: None}
+        self.domains: Dict[str, tuple] = {}
+        self.invalid = 0
+        self._bloom_keys: Dict[int, Optional[set]] = {4: set(), 6: set()} # None = prefilter off
+
+    def add(self, indicator: str, feed: str, description: str = "") -> bool:
+        """Adds one IP, CIDR or domain. Returns False if it is not valid (or already present)."""
+        indicator = indicator.strip().lower().rstrip('.')
+        value = (indicator, feed, description)
+        address = parse_address(indicator) if '/' not in indicator else None
+        if address is not None: # Single IP: skip the (much slower) ipaddress parse
+            version, network_int = address
+            length = ADDRESS_BITS[version]
+        else:
+            try:
+                if '.' not in indicator and ':' not in indicator:
+                    raise ValueError(indicator) # ip_network would read a bare integer as an IPv4 address
+                network = ipaddress.ip_network(indicator, strict=False)
+            except ValueError:
+                if not DOMAIN_PATTERN.match(indicator):
+                    self.invalid += 1
+                    return False
+                return self.domains.setdefault(indicator, value) is value
+            version, length = network.version, network.prefixlen
+            network_int = int(network.network_address)
+        if not self.tries[version].insert(network_int, length, value):
+            return False
+        keys = self._bloom_keys[version]
+        if keys is not None:
+            shift = ADDRESS_BITS[version] - BLOOM_PREFIX[version]
+            if length >= BLOOM_PREFIX[version]:
+                keys.add(network_int >> shift)
+            elif BLOOM_PREFIX[version] - length <= int(math.log2(MAX_BLOOM_EXPANSION)):
+                first = network_int >> shift
+                keys.update(range(first, first + (1 << (BLOOM_PREFIX[version] - length))))
+            else:
+                self._bloom_keys[version] = None # Too wide to expand: always walk the trie
+        return True
+
+    def freeze(self) -> "IndicatorIndex":
+        """Builds the Bloom filters once every indicator has been added."""
+        for version, keys in self._bloom_keys.items():
+            if keys:
+                bloom = BloomFilter(len(keys), self.bloom_error_rate)
+                for key in keys:
+                    bloom.add(key)
+                self.blooms[version] = bloom
+        self._bloom_keys = {}
+        return self
+
+    def lookup_address(self, version: int, address: int, stats: Optional[Dict[str, int]] = None) -> Optional[tuple]:
+        trie = self.tries[version]
+        if not trie.count:
+            return None # No indicators for this family
+        bloom = self.blooms[version]
+        if bloom is not None and (address >> (ADDRESS_BITS[version] - BLOOM_PREFIX[version])) not in bloom:
+            if stats is not None:
+                stats["bloom_rejected"] += 1
+            return None
+        match = trie.longest_match(address)
+        if match is None and bloom is not None and stats is not None:
+            stats["bloom_false_positives"] += 1
+        return match
+
+    def lookup_domain(self, domain: str) -> Optional[tuple]:
+        """Exact domain or its closest listed parent (evil.example matches a.b.evil.example)."""
+        domains = self.domains
+        if not domains:
+            return None
+        domain = domain.lower().rstrip('.')
+        while True:
+            match = domains.get(domain)
+            if match is not None:
+                return match
+            dot = domain.find('.')
+            if dot < 0:
+                return None
+            domain = domain[dot + 1:]
+
+    def counts(self) -> Dict[str, int]:
+        return {"ipv4_prefixes": len(self.tries[4]), "ipv6_prefixes": len(self.tries[6]),
+                "domains": len(self.domains), "invalid": self.invalid}
+
+
+def load_indicators(path: str, bloom_error_rate: float = 0.01) -> IndicatorIndex:
+    """
+    Reads every feed file under path into a new IndicatorIndex. One indicator per line,
+    optionally followed by ",description"; blank lines and lines starting with '#' are
+    skipped. The feed name is the file name without its extension.
+    """
+    index = IndicatorIndex(bloom_error_rate)
+    for file_path in feed_files(path):
+        feed = os.path.splitext(os.path.basename(file_path))[0]
+        with open(file_path, 'r', encoding='utf-8', errors='replace') as feed_file:
+            for line in feed_file:
+                line = line.strip()
+                if not line or line.startswith('#'):
+                    continue
+                indicator, _, description = line.partition(',')
+                index.add(indicator, feed, description.strip())
+    return index.freeze()
+
+
+class ThreatIntel:
+    """
+    Matches a log's source_ip_host/destination_ip_host against the loaded indicator feeds.
+    IP values go through the Bloom prefilter and then the CIDR trie; anything that is not an
+    address is looked up as a domain. The feeds are re-read whenever their files change,
+    by a background poller that builds a fresh IndicatorIndex and swaps it in with one
+    assignment, so lookups always see either the old or the new feeds in full.
+    """
+
+    def __init__(self, path: str, reload_interval_seconds: float = 30.0, bloom_error_rate: float = 0.01):
+        self.path = path
+        self.interval = reload_interval_seconds
+        self.bloom_error_rate = bloom_error_rate
+        self.stats: Dict[str, int] = {"lookups": 0, "hits": 0, "bloom_rejected": 0,
+                                      "bloom_false_positives": 0, "reloads": 0}
+        self._signature = self._current_signature()
+        self.index = load_indicators(path, bloom_error_rate)
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        print(f"Threat intel loaded from {path}: {self.index.counts()}")
+
+    def _current_signature(self) -> Tuple:
+        signature = []
+        for file_path in feed_files(self.path):
+            try:
+                stat = os.stat(file_path)
+                signature.append((file_path, stat.st_mtime_ns, stat.st_size))
+            except OSError:
+                signature.append((file_path, None, None))
+        return tuple(signature)
+
+    def lookup(self, value: Optional[str]) -> Optional[tuple]:
+        """(indicator, feed, description) for an IP or domain value, or None."""
+        if not value or value == "N/A":
+            return None
+        index = self.index
+        self.stats["lookups"] += 1
+        address = parse_address(value)
+        if address is not None:
+            match = index.lookup_address(address[0], address[1], self.stats)
+        else:
+            match = index.lookup_domain(value)
+        if match is not None:
+            self.stats["hits"] += 1
+        return match
+
+    def match_log(self, log_entry: LogEntry) -> List[Dict[str, str]]:
+        """One hit per IoC field of the log whose value is listed in a feed."""
+        hits = []
+        for field in IOC_FIELDS:
+            value = getattr(log_entry, field)
+            match = self.lookup(value)
+            if match is not None:
+                indicator, feed, description = match
+                hits.append({"field": field, "value": value, "indicator": indicator,
+                             "feed": feed, "description": description})
+        return hits
+
+    def check(self) -> bool:
+        """Reloads if the feed files changed. Returns True if a new index was swapped in."""
+        signature = self._current_signature()
+        if signature == self._signature:
+            return False
+        self._signature = signature
+        index = load_indicators(self.path, self.bloom_error_rate)
+        self.index = index
+        self.stats["reloads"] += 1
+        print(f"Threat intel reloaded from {self.path}: {index.counts()}")
+        return True
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="threat-intel-watcher", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.check()
+            except Exception as e:
+                print(f"ERROR: Threat intel reload failed, keeping the current feeds: {e}")
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def get_stats(self) -> Dict[str, Any]:
+        return dict(self.stats, **self.index.counts())
@@ -0,0 +1,76 @@
+# backend/core/timestamp_decoder.py
+
+import time
+from datetime import datetime, timedelta
+from typing import Dict, Optional, Tuple
+
+# Precomputed month table (syslog/BSD timestamps always use English abbreviations).
+MONTHS = {name: number for number, name in enumerate(
+    ('jan', 'feb', 'mar', 'apr', 'may', 'jun', 'jul', 'aug', 'sep', 'oct', 'nov', 'dec'), start=1)}
+
+
+class SyslogTimestampDecoder:
+    """
+    Decodes BSD syslog timestamps ('Jun 17 10:00:01') into datetimes without strptime.
+
+    Syslog timestamps carry no year, so the current year is cached and refreshed every
+    refresh_interval seconds. A timestamp that would land more than a day in the future is
+    assumed to belong to the previous year, so a 'Dec 31 23:59:59' line received just after
+    New Year is dated December of last year, not of the year that just started.
+
+    Consecutive lines overwhelmingly share the same second, so decoded (month, day, time)
+    prefixes are memoized. The memo is cleared whenever the year context changes.
+    """
+
+    def __init__(self, refresh_interval: float = 60.0, cache_size: int = 4096):
+        self.refresh_interval = refresh_interval
+        self.cache_size = cache_size
+        self._cache: Dict[Tuple[str, str, str], Optional[datetime]] = {}
+        self._refresh_at = 0.0 # monotonic deadline of the next year refresh
+        self._year = 0
+        self._rollover_after = (12, 31)
+        self._refresh()
+
+    def _refresh(self):
+        """Recomputes the cached year and the (month, day) after which dates fall in the future."""
+        now = datetime.now()
+        tomorrow = now + timedelta(days=1)
+        # Dates after tomorrow are "in the future" and belong to last year. On Dec 31 tomorrow
+        # is already next year, so nothing in the current year is treated as future.
+        rollover_after = (tomorrow.month, tomorrow.day) if tomorrow.year == now.year else (12, 31)
+        if (now.year, rollover_after) != (self._year, self._rollover_after):
+            self._year = now.year
+            self._rollover_after = rollover_after
+            self._cache.clear() # Cached datetimes embed the old year context
+        self._refresh_at = time.monotonic() + self.refresh_interval
+
+    def decode(self, month: str, day: str, time_str: str) -> Optional[datetime]:
+        """
+        Decodes the parts captured by the syslog header regex ('Jun', '17', '10:00:01').
+        Returns None if they do not form a valid date (unknown month, Feb 30, 24:00:00, ...),
+        which is the case where strptime would have raised ValueError.
+        """
+        if time.monotonic() >= self._refresh_at:
+            self._refresh()
+        key = (month, day, time_str)
+        try:
+            return self._cache[key]
+        except KeyError:
+            pass
+        timestamp = self._decode_uncached(month, day, time_str)
+        if len(self._cache) >= self.cache_size: # Bound the memo; a fresh one refills within a few lines
+            self._cache.clear()
+        self._cache[key] = timestamp
+        return timestamp
+
+    def _decode_uncached(self, month: str, day: str, time_str: str) -> Optional[datetime]:
+        month_number = MONTHS.get(month.lower())
+        if month_number is None:
+            return None
+        try:
+            day_number = int(day)
+            hour, minute, second = int(time_str[0:2]), int(time_str[3:5]), int(time_str[6:8])
+            year = self._year - 1 if (month_number, day_number) > self._rollover_after else self._year
+            return datetime(year, month_number, day_number, hour, minute, second)
+        except ValueError:
+            return None
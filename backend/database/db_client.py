@@ -1,29 +1,68 @@
 # backend/database/db_client.py
 
-from pymongo import MongoClient, ASCENDING, DESCENDING
-from pymongo.errors import ConnectionFailure, OperationFailure
+from pymongo import MongoClient, ASCENDING, DESCENDING, UpdateOne
+from pymongo.errors import ConnectionFailure, OperationFailure, BulkWriteError
+from pymongo.write_concern import WriteConcern
 from backend.database.models import LogEntry, Alert, NetworkFlowEntry
+from backend.database.indexes import NETWORK_FLOWS_COLLECTION_NAME, IndexVerificationError, ensure_indexes, index_models, verify_query_shapes
+from backend.database.partitions import PartitionedCollection
+from backend.database.memory_store import MemoryCollection
+from backend.database.write_buffer import WriteBehindBuffer
+from backend.database.spill_queue import SegmentSpillQueue
 from backend.config import Config
 from datetime import datetime, timedelta
 from bson.objectid import ObjectId
+import atexit
 import re
-from typing import Optional, List, Dict, Any
+import threading
+import time
+from typing import Optional, List, Dict, Any, Iterator, Tuple
+
+
+def open_database(config: Config):
+    """
+    Opens the storage backend selected by Config.DATABASE_BACKEND: SiemDatabase (MongoDB) or
+    SqliteDatabase. Both expose the same methods.
+    """
+    if config.DATABASE_BACKEND == "sqlite":
+        from backend.database.sqlite_client import SqliteDatabase
+        return SqliteDatabase(config)
+    if config.DATABASE_BACKEND != "mongodb":
+        raise ValueError(f"Unknown DATABASE_BACKEND '{config.DATABASE_BACKEND}' (expected 'mongodb' or 'sqlite').")
+    return SiemDatabase(config)
+
 
 class SiemDatabase:
     def __init__(self, config: Config):
         self.config = config
         self.client = None
         self.db = None
+        self.log_buffer = None # Write-behind buffers, only used with a real MongoDB connection
+        self.network_flow_buffer = None
+        self.spill_queue = None # On-disk queue that absorbs inserts while MongoDB is unreachable
+        self._spilling = False
         self._connect()
+        if self.db is not None:
+            self._after_connect()
+
+        if self.config.SPILL_QUEUE_DIR:
+            self._start_spill_queue()
 
         # Initialize mock storage if real DB connection fails
         # CORRECTED: Changed 'if not self.db:' to 'if self.db is None:'
         if self.db is None:
-             print("WARNING: Using mock database storage. Please ensure MongoDB is running for persistence.")
-             self._mock_logs_storage = []
-             self._mock_alerts_storage = []
-             self._mock_network_flows_storage = [] # NEW MOCK STORAGE
-             self._mock_id_counter = 1 # Unified ID counter for mock data
+             if self.spill_queue is not None:
+                 print("WARNING: MongoDB unreachable. Inserts are spilled to disk until it comes back; reads use mock storage.")
+             else:
+                 print("WARNING: Using mock database storage. Please ensure MongoDB is running for persistence.")
+             # Time-ordered, indexed in-memory collections (see MemoryCollection)
+             capacity = self.config.MEMORY_STORE_CAPACITY
+             self._mock_logs_storage = MemoryCollection("logs", ("source", "level", "host"), capacity)
+             self._mock_alerts_storage = MemoryCollection("alerts", ("status", "severity"), capacity)
+             self._mock_network_flows_storage = MemoryCollection(NETWORK_FLOWS_COLLECTION_NAME, ("source_ip", "protocol"), capacity)
+             self._mock_hunt_results_storage = [] # Write-only
+        elif self.config.WRITE_BEHIND_ENABLED:
+            self._start_write_behind()
 
     def _connect(self):
         """Establishes connection to MongoDB Atlas."""
@@ -36,7 +75,18 @@ class SiemDatabase:
             # Assign collections after successful connection
             self.logs_collection = self.db[self.config.LOGS_COLLECTION_NAME]
             self.alerts_collection = self.db[self.config.ALERTS_COLLECTION_NAME]
-            self.network_flows_collection = self.db["network_flows"]
+            self.network_flows_collection = self.db[NETWORK_FLOWS_COLLECTION_NAME]
+            self.hunt_results_collection = self.db[self.config.HUNT_RESULTS_COLLECTION_NAME]
+            if self.config.PARTITIONING_ENABLED: # One collection per day (see PartitionedCollection)
+                models = index_models(self.config)
+                self.logs_collection = PartitionedCollection(
+                    self.db, self.config.LOGS_COLLECTION_NAME, models[self.config.LOGS_COLLECTION_NAME],
+                    self.config.LOGS_HOT_DAYS, self.config.LOGS_RETENTION_DAYS, self.config.PARTITION_ARCHIVE_DIR
+                )
+                self.network_flows_collection = PartitionedCollection(
+                    self.db, NETWORK_FLOWS_COLLECTION_NAME, models[NETWORK_FLOWS_COLLECTION_NAME],
+                    self.config.NETWORK_FLOWS_HOT_DAYS, self.config.NETWORK_FLOWS_RETENTION_DAYS, self.config.PARTITION_ARCHIVE_DIR
+                )
 
             print("Successfully connected to MongoDB Atlas.")
         except ConnectionFailure as e:
@@ -48,6 +98,194 @@ class SiemDatabase:
             self.client = None
             self.db = None
 
+    def _after_connect(self):
+        """Setup that needs a live connection: indexes and, when partitioned, partition maintenance."""
+        self._provision_indexes()
+        if self.config.PARTITIONING_ENABLED and self.config.PARTITION_MAINTENANCE_INTERVAL_SECONDS > 0:
+            threading.Thread(target=self._partition_maintenance_loop, name="partition-maintenance", daemon=True).start()
+
+    def _provision_indexes(self):
+        """
+        Creates the indexes the query methods rely on (DB_ENSURE_INDEXES), then explains each
+        query shape and raises IndexVerificationError if any still scans a whole collection
+        (DB_VERIFY_QUERY_PLANS), so a missing index fails the startup instead of every request.
+        """
+        # Partitioned collections are provisioned and checked through today's partition
+        collections = {
+            collection.name: collection.current_partition()
+            for collection in self._partitioned_collections()
+        }
+        try:
+            if self.config.DB_ENSURE_INDEXES:
+                ensure_indexes(self.db, self.config, collections)
+            if self.config.DB_VERIFY_QUERY_PLANS:
+                plans = verify_query_shapes(self.db, self.config, collections)
+                print(f"Verified {len(plans)} query shapes: all use indexes.")
+        except IndexVerificationError:
+            raise
+        except Exception as e:
+            print(f"WARNING: Could not provision or verify MongoDB indexes: {e}")
+
+    def _partitioned_collections(self) -> List[PartitionedCollection]:
+        if self.db is None:
+            return []
+        return [collection for collection in (self.logs_collection, self.network_flows_collection)
+                if isinstance(collection, PartitionedCollection)]
+
+    def maintain_partitions(self) -> Dict[str, Dict[str, int]]:
+        """Archives and expires partitions past their hot period / retention. Returns counts per collection."""
+        return {collection.name: collection.maintain() for collection in self._partitioned_collections()}
+
+    def migrate_unpartitioned(self) -> Dict[str, int]:
+        """Copies logs / network flows stored before partitioning was enabled into daily partitions."""
+        return {collection.name: collection.migrate_unpartitioned() for collection in self._partitioned_collections()}
+
+    def _partition_maintenance_loop(self):
+        while True:
+            try:
+                for collection_name, counts in self.maintain_partitions().items():
+                    if any(counts.values()):
+                        print(f"Partition maintenance on '{collection_name}': {counts}")
+            except Exception as e:
+                print(f"ERROR: Partition maintenance failed: {e}")
+            time.sleep(self.config.PARTITION_MAINTENANCE_INTERVAL_SECONDS)
+
+    def _start_spill_queue(self):
+        """
+        Opens the on-disk spill queue and starts the background recovery thread.
+        While spilling, every insert is appended to the queue instead of MongoDB (or mock storage),
+        so memory stays flat during an outage. The recovery thread reconnects and replays the
+        queue in order with insert_many; replays are idempotent because IDs are assigned client-side.
+        """
+        self.spill_queue = SegmentSpillQueue(
+            self.config.SPILL_QUEUE_DIR,
+            segment_max_bytes=self.config.SPILL_SEGMENT_MAX_MB * 1024 * 1024,
+            fsync_interval_ms=self.config.SPILL_FSYNC_INTERVAL_MS,
+        )
+        self._spilling = self.db is None or not self.spill_queue.is_empty()
+        atexit.register(self.spill_queue.close)
+        threading.Thread(target=self._spill_recovery_loop, name="spill-recovery", daemon=True).start()
+
+    def _enter_spill_mode(self, error: Exception):
+        if not self._spilling:
+            print(f"WARNING: Lost connection to MongoDB ({error}). Spilling inserts to {self.config.SPILL_QUEUE_DIR}.")
+        self._spilling = True
+
+    def _spill(self, collection_name: str, documents: List[Dict[str, Any]]):
+        """Appends documents (which must already carry their _id) to the spill queue."""
+        self.spill_queue.append(collection_name, documents)
+
+    def _spill_entries(self, collection_name: str, entries: list) -> List[ObjectId]:
+        documents = self._documents_with_ids(entries)
+        self._spill(collection_name, documents)
+        return [entry._id for entry in entries]
+
+    def _spill_recovery_loop(self):
+        while True:
+            time.sleep(self.config.SPILL_RECONNECT_INTERVAL_SECONDS)
+            if not self._spilling and self.spill_queue.is_empty():
+                continue
+            if self.db is None:
+                self._connect()
+                if self.db is None:
+                    continue
+                try:
+                    self._after_connect() # Skipped in __init__, which started without a database
+                except Exception as e:
+                    print(f"ERROR: MongoDB setup after reconnecting failed: {e}")
+            try:
+                replayed = self.spill_queue.drain(self._write_spilled_batch, self.config.SPILL_DRAIN_BATCH_SIZE)
+            except ConnectionFailure as e:
+                print(f"Spill queue drain interrupted, will retry: {e}")
+                continue
+            self._spilling = False
+            # Anything appended by an insert that raced with the switch is drained on the next pass.
+            print(f"MongoDB reachable again. Replayed {replayed} spilled documents; inserts go to MongoDB.")
+            if self.config.WRITE_BEHIND_ENABLED and self.log_buffer is None:
+                self._start_write_behind()
+
+    def _write_spilled_batch(self, collection_name: str, documents: List[Dict[str, Any]]):
+        """Replays one spilled batch. Duplicate-key errors mean the document was already written."""
+        partitioned = {collection.name: collection for collection in self._partitioned_collections()}
+        try:
+            partitioned.get(collection_name, self.db[collection_name]).insert_many(documents, ordered=False)
+        except BulkWriteError as e:
+            unexpected = [error for error in e.details.get("writeErrors", []) if error.get("code") != 11000]
+            if unexpected:
+                print(f"WARNING: {len(unexpected)} spilled documents for '{collection_name}' were rejected on replay.")
+
+    def _documents_with_ids(self, entries: list) -> List[Dict[str, Any]]:
+        """Assigns client-side ObjectIds (if missing) and returns storage documents for the entries."""
+        documents = []
+        for entry in entries:
+            if entry._id is None:
+                entry._id = ObjectId()
+            document = entry.to_dict()
+            document["_id"] = entry._id # to_dict() stringifies _id; keep the real ObjectId for storage
+            documents.append(document)
+        return documents
+
+    def _start_write_behind(self):
+        """
+        Routes log and network flow inserts through background write-behind buffers.
+        Logs (and flows) are written with LOGS_WRITE_CONCERN; alerts always stay synchronous.
+        """
+        write_concern = WriteConcern(w=self.config.LOGS_WRITE_CONCERN)
+        buffered_logs_collection = self.logs_collection.with_options(write_concern=write_concern)
+        buffered_flows_collection = self.network_flows_collection.with_options(write_concern=write_concern)
+        buffer_options = {
+            "capacity": self.config.WRITE_BEHIND_CAPACITY,
+            "batch_size": self.config.WRITE_BEHIND_BATCH_SIZE,
+            "max_age_ms": self.config.WRITE_BEHIND_MAX_AGE_MS,
+            "block_timeout_ms": self.config.WRITE_BEHIND_BLOCK_TIMEOUT_MS,
+        }
+        self.log_buffer = WriteBehindBuffer(
+            "logs", lambda documents: self._insert_documents(buffered_logs_collection, documents), **buffer_options
+        )
+        self.network_flow_buffer = WriteBehindBuffer(
+            "network_flows", lambda documents: self._insert_documents(buffered_flows_collection, documents), **buffer_options
+        )
+        atexit.register(self.flush)
+        print(f"Write-behind mode enabled (batch size {self.config.WRITE_BEHIND_BATCH_SIZE}, "
+              f"max age {self.config.WRITE_BEHIND_MAX_AGE_MS}ms, log write concern w={self.config.LOGS_WRITE_CONCERN}).")
+
+    def _insert_documents(self, collection, documents: List[Dict[str, Any]]) -> int:
+        """Unordered insert_many used by the write-behind flushers. Returns the number of documents written."""
+        try:
+            collection.insert_many(documents, ordered=False)
+            return len(documents)
+        except BulkWriteError as e:
+            failed = len(e.details.get("writeErrors", []))
+            print(f"Write-behind insert into '{collection.name}' partially failed: {failed} of {len(documents)} documents rejected.")
+            return len(documents) - failed
+        except ConnectionFailure as e:
+            if self.spill_queue is None:
+                print(f"Write-behind insert into '{collection.name}' failed: {e}")
+                return 0
+            self._enter_spill_mode(e)
+            self._spill(collection.name, documents)
+            return len(documents)
+        except Exception as e:
+            print(f"Write-behind insert into '{collection.name}' failed: {e}")
+            return 0
+
+    def _buffer_entries(self, write_buffer: WriteBehindBuffer, entries: list) -> List[Optional[ObjectId]]:
+        """
+        Assigns client-side ObjectIds and queues the documents, so callers get IDs back
+        without waiting for the database. Entries dropped under backpressure get None.
+        """
+        documents = self._documents_with_ids(entries)
+        accepted = write_buffer.put_many(documents)
+        inserted_ids = []
+        for entry, was_accepted in zip(entries, accepted):
+            if not was_accepted:
+                entry._id = None
+            inserted_ids.append(entry._id)
+        dropped = len(entries) - sum(accepted)
+        if dropped:
+            print(f"WARNING: Write-behind buffer '{write_buffer.name}' dropped {dropped} documents (buffer full).")
+        return inserted_ids
+
     def insert_log(self, log_entry: LogEntry) -> Optional[ObjectId]:
         """
         Inserts a LogEntry object into the logs collection.
@@ -57,20 +295,83 @@ class SiemDatabase:
         if not isinstance(log_entry, LogEntry):
             raise TypeError("Expected a LogEntry object for insertion.")
 
+        if self._spilling: # MongoDB unreachable: append to the on-disk spill queue
+            return self._spill_entries(self.config.LOGS_COLLECTION_NAME, [log_entry])[0]
+
+        if self.log_buffer is not None: # Write-behind mode
+            return self._buffer_entries(self.log_buffer, [log_entry])[0]
+
         # CORRECTED: Changed 'if self.db:' to 'if self.db is not None:'
         if self.db is not None: # Using real MongoDB
             try:
                 result = self.logs_collection.insert_one(log_entry.to_dict())
                 return result.inserted_id
+            except ConnectionFailure as e:
+                if self.spill_queue is None:
+                    raise
+                self._enter_spill_mode(e)
+                return self._spill_entries(self.config.LOGS_COLLECTION_NAME, [log_entry])[0]
             except OperationFailure as e:
                 print(f"Failed to insert log into MongoDB: {e}")
                 return None
         else: # Using mock storage
             mock_id = ObjectId() # Simulate ObjectId for consistency
             log_entry._id = mock_id # Assign mock ID to object
-            self._mock_logs_storage.append(log_entry)
+            self._mock_logs_storage.insert(log_entry)
             return mock_id
 
+    def insert_logs(self, log_entries: List[LogEntry]) -> List[Optional[ObjectId]]:
+        """
+        Inserts a batch of LogEntry objects into the logs collection in one round trip.
+        Uses an unordered insert_many, so one bad document does not abort the rest of the batch.
+        :param log_entries: A list of LogEntry instances.
+        :return: A list of inserted IDs in the same order as log_entries (None where the insert failed).
+        """
+        if not log_entries:
+            return []
+        for log_entry in log_entries:
+            if not isinstance(log_entry, LogEntry):
+                raise TypeError("Expected a list of LogEntry objects for insertion.")
+
+        if self._spilling: # MongoDB unreachable: append to the on-disk spill queue
+            return self._spill_entries(self.config.LOGS_COLLECTION_NAME, log_entries)
+
+        if self.log_buffer is not None: # Write-behind mode
+            return self._buffer_entries(self.log_buffer, log_entries)
+
+        if self.db is not None: # Using real MongoDB
+            documents = [log_entry.to_dict() for log_entry in log_entries]
+            try:
+                result = self.logs_collection.insert_many(documents, ordered=False)
+                inserted_ids = list(result.inserted_ids)
+            except BulkWriteError as e:
+                # insert_many assigns an _id to every document before sending, so the
+                # successful ones can still be reported; only the failed indexes get None.
+                failed_indexes = {error["index"] for error in e.details.get("writeErrors", [])}
+                print(f"Bulk log insert partially failed: {len(failed_indexes)} of {len(documents)} documents rejected.")
+                inserted_ids = [None if i in failed_indexes else doc.get("_id") for i, doc in enumerate(documents)]
+            except ConnectionFailure as e:
+                if self.spill_queue is None:
+                    raise
+                # Some documents may already be written; replaying them is harmless since
+                # insert_many has assigned every _id and duplicates are skipped on drain.
+                self._enter_spill_mode(e)
+                self._spill(self.config.LOGS_COLLECTION_NAME, documents)
+                inserted_ids = [doc["_id"] for doc in documents]
+            except OperationFailure as e:
+                print(f"Failed to bulk insert logs into MongoDB: {e}")
+                return [None] * len(log_entries)
+            for log_entry, inserted_id in zip(log_entries, inserted_ids):
+                log_entry._id = inserted_id
+            return inserted_ids
+        else: # Using mock storage
+            inserted_ids = []
+            for log_entry in log_entries:
+                log_entry._id = ObjectId() # Simulate ObjectId for consistency
+                inserted_ids.append(log_entry._id)
+            self._mock_logs_storage.insert_many(log_entries)
+            return inserted_ids
+
     def insert_alert(self, alert_entry: Alert) -> Optional[ObjectId]:
         """
         Inserts an Alert object into the alerts collection.
@@ -80,18 +381,26 @@ class SiemDatabase:
         if not isinstance(alert_entry, Alert):
             raise TypeError("Expected an Alert object for insertion.")
 
+        if self._spilling: # MongoDB unreachable: append to the on-disk spill queue
+            return self._spill_entries(self.config.ALERTS_COLLECTION_NAME, [alert_entry])[0]
+
         # CORRECTED: Changed 'if self.db:' to 'if self.db is not None:'
         if self.db is not None: # Using real MongoDB
             try:
                 result = self.alerts_collection.insert_one(alert_entry.to_dict())
                 return result.inserted_id
+            except ConnectionFailure as e:
+                if self.spill_queue is None:
+                    raise
+                self._enter_spill_mode(e)
+                return self._spill_entries(self.config.ALERTS_COLLECTION_NAME, [alert_entry])[0]
             except OperationFailure as e:
                 print(f"Failed to insert alert into MongoDB: {e}")
                 return None
         else: # Using mock storage
             mock_id = ObjectId() # Simulate ObjectId for consistency
             alert_entry._id = mock_id # Assign mock ID to object
-            self._mock_alerts_storage.append(alert_entry)
+            self._mock_alerts_storage.insert(alert_entry)
             return mock_id
 
     def insert_network_flow(self, flow_entry: NetworkFlowEntry) -> Optional[ObjectId]:
@@ -103,18 +412,29 @@ class SiemDatabase:
         if not isinstance(flow_entry, NetworkFlowEntry):
             raise TypeError("Expected a NetworkFlowEntry object for insertion.")
 
+        if self._spilling: # MongoDB unreachable: append to the on-disk spill queue
+            return self._spill_entries(NETWORK_FLOWS_COLLECTION_NAME, [flow_entry])[0]
+
+        if self.network_flow_buffer is not None: # Write-behind mode
+            return self._buffer_entries(self.network_flow_buffer, [flow_entry])[0]
+
         # CORRECTED: Changed 'if self.db:' to 'if self.db is not None:'
         if self.db is not None: # Using real MongoDB
             try:
                 result = self.network_flows_collection.insert_one(flow_entry.to_dict())
                 return result.inserted_id
+            except ConnectionFailure as e:
+                if self.spill_queue is None:
+                    raise
+                self._enter_spill_mode(e)
+                return self._spill_entries(NETWORK_FLOWS_COLLECTION_NAME, [flow_entry])[0]
             except OperationFailure as e:
                 print(f"Failed to insert network flow into MongoDB: {e}")
                 return None
         else: # Using mock storage
             mock_id = ObjectId() # Simulate ObjectId for consistency
             flow_entry._id = mock_id # Assign mock ID to object
-            self._mock_network_flows_storage.append(flow_entry)
+            self._mock_network_flows_storage.insert(flow_entry)
             return mock_id
 
     def get_logs_by_criteria(self, query: Dict[str, Any], limit: int = 100) -> List[LogEntry]:
@@ -130,28 +450,72 @@ class SiemDatabase:
             except Exception as e:
                 print(f"Error querying logs by criteria: {e}")
                 return []
-        else: # Using mock storage (basic filtering)
-            results = []
-            for log_entry in self._mock_logs_storage:
-                match = True
-                for key, value in query.items():
-                    if key == "timestamp":
-                        # For timestamp, expect {"$gte": datetime_object}
-                        if "$gte" in value and log_entry.timestamp < value["$gte"]:
-                            match = False
-                            break
-                    elif key == "message":
-                        if "$regex" in value:
-                            if not re.search(value["$regex"], log_entry.message, re.IGNORECASE if "$options" in value and "i" in value["$options"] else 0):
-                                match = False
-                                break
-                    elif hasattr(log_entry, key) and getattr(log_entry, key) != value:
-                        match = False
-                        break
-                if match:
-                    results.append(log_entry)
-            results.sort(key=lambda x: x.timestamp, reverse=True)
-            return results[:limit]
+        else: # Using mock storage: indexed equality, timestamp range and regex, newest first
+            equals = {key: value for key, value in query.items() if key not in ("timestamp", "message")}
+            start = query.get("timestamp", {}).get("$gte")
+            predicate = None
+            if "$regex" in query.get("message", {}):
+                flags = re.IGNORECASE if "i" in query["message"].get("$options", "") else 0
+                pattern = re.compile(query["message"]["$regex"], flags)
+                predicate = lambda log_entry: pattern.search(log_entry.message) is not None
+            return self._mock_logs_storage.find(equals, start=start, predicate=predicate, limit=limit)
+
+    def iter_log_batches(self, start: datetime, end: datetime, batch_size: int = 5000,
+                         resume_after: Optional[Tuple[datetime, ObjectId]] = None) -> Iterator[List[Dict[str, Any]]]:
+        """
+        Streams raw log documents with start <= timestamp < end in (timestamp, _id) order,
+        batch_size at a time, from one server-side cursor (nothing beyond the current batch is
+        held in memory). resume_after=(timestamp, _id) of the last log already processed
+        continues right after it.
+        """
+        query: Dict[str, Any] = {"timestamp": {"$gte": start, "$lt": end}}
+        if resume_after is not None:
+            last_timestamp, last_id = resume_after
+            query = {"$and": [query, {"$or": [{"timestamp": {"$gt": last_timestamp}},
+                                              {"timestamp": last_timestamp, "_id": {"$gt": last_id}}]}]}
+
+        if self.db is not None:
+            if isinstance(self.logs_collection, PartitionedCollection): # Hot partitions and archived days
+                cursor = self.logs_collection.iter_time_range(query, start, end, resume_after, batch_size)
+            else:
+                cursor = self.logs_collection.find(query, batch_size=batch_size).sort([("timestamp", ASCENDING), ("_id", ASCENDING)])
+            try:
+                batch = []
+                for document in cursor:
+                    batch.append(document)
+                    if len(batch) >= batch_size:
+                        yield batch
+                        batch = []
+                if batch:
+                    yield batch
+            finally:
+                cursor.close()
+        else: # Mock storage: same ordering and resume semantics over the in-memory list
+            entries = sorted(
+                (log_entry for log_entry in self._mock_logs_storage.scan(start, end) if log_entry._id is not None),
+                key=lambda log_entry: (log_entry.timestamp, log_entry._id)
+            )
+            if resume_after is not None:
+                entries = [log_entry for log_entry in entries if (log_entry.timestamp, log_entry._id) > resume_after]
+            for offset in range(0, len(entries), batch_size):
+                yield [dict(log_entry.to_dict(), _id=log_entry._id) for log_entry in entries[offset:offset + batch_size]]
+
+    def insert_hunt_results(self, documents: List[Dict[str, Any]]) -> int:
+        """Writes retro-hunt hits to the hunt results collection (never to alerts). Returns the number written."""
+        if not documents:
+            return 0
+        if self.db is not None:
+            try:
+                return len(self.hunt_results_collection.insert_many(documents, ordered=False).inserted_ids)
+            except BulkWriteError as e:
+                print(f"Hunt results insert partially failed: {len(e.details.get('writeErrors', []))} of {len(documents)} rejected.")
+                return e.details.get("nInserted", 0)
+            except Exception as e:
+                print(f"Error inserting hunt results: {e}")
+                return 0
+        else:
+            self._mock_hunt_results_storage.extend(documents)
+            return len(documents)
 
     def get_recent_logs(self, limit: int = 20) -> List[LogEntry]:
         """Retrieves the most recent logs."""
@@ -164,7 +528,7 @@ class SiemDatabase:
                 print(f"Error getting recent logs: {e}")
                 return []
         else:
-            return sorted(self._mock_logs_storage, key=lambda x: x.timestamp, reverse=True)[:limit]
+            return self._mock_logs_storage.find(limit=limit)
 
     def get_open_alerts(self, severity: Optional[str] = None) -> List[Alert]:
         """Retrieves open alerts, optionally filtered by severity."""
@@ -181,10 +545,7 @@ class SiemDatabase:
                 print(f"Error getting open alerts: {e}")
                 return []
         else:
-            results = [alert for alert in self._mock_alerts_storage if alert.status == "Open"]
-            if severity:
-                results = [alert for alert in results if alert.severity == severity]
-            return sorted(results, key=lambda x: x.timestamp, reverse=True)
+            return self._mock_alerts_storage.find(query)
 
     def get_all_alerts(self) -> List[Alert]:
         """Retrieves all alerts."""
@@ -197,7 +558,7 @@ class SiemDatabase:
                 print(f"Error getting all alerts: {e}")
                 return []
         else:
-            return sorted(self._mock_alerts_storage, key=lambda x: x.timestamp, reverse=True)
+            return self._mock_alerts_storage.find()
 
     def get_recent_network_flows(self, limit: int = 20) -> List[NetworkFlowEntry]:
         """Retrieves recent network flow entries."""
@@ -210,7 +571,7 @@ class SiemDatabase:
                 print(f"Error getting recent network flows: {e}")
                 return []
         else:
-            return sorted(self._mock_network_flows_storage, key=lambda x: x.timestamp, reverse=True)[:limit]
+            return self._mock_network_flows_storage.find(limit=limit)
 
     def filter_logs(self, filter_text: str = '', source: str = 'All Sources', level: str = 'All Levels', limit: int = 100) -> List[LogEntry]:
         """Filters logs based on text, source, and level."""
@@ -239,17 +600,95 @@ class SiemDatabase:
             except Exception as e:
                 print(f"Error updating alert status: {e}")
                 return False
+        else: # Mock update: _id index lookup; the alert is re-indexed under its new status/timestamp
+            return self._mock_alerts_storage.update(alert_id, {"status": new_status, "timestamp": datetime.now()}) is not None
+
+    def update_alert_occurrences(self, updates: List[tuple], last_seen: datetime, max_log_ids: int) -> int:
+        """
+        Folds repeat hits into existing alerts: one update per (alert_id, count, log_ids), sent
+        as a single unordered bulk write ($inc occurrence_count, $push log_ids keeping only the
+        newest max_log_ids, $set last_seen). Returns the number of alerts updated.
+        """
+        if self._spilling: # The spill queue only replays inserts
+            print(f"WARNING: MongoDB unreachable; {len(updates)} deduplicated alert updates were not written.")
+            return 0
+
+        if self.db is not None:
+            operations = [
+                UpdateOne(
+                    {"_id": ObjectId(alert_id)},
+                    {"$inc": {"occurrence_count": count},
+                     "$push": {"log_ids": {"$each": log_ids, "$slice": -max_log_ids}},
+                     "$set": {"last_seen": last_seen}}
+                )
+                for alert_id, count, log_ids in updates
+            ]
+            try:
+                return self.alerts_collection.bulk_write(operations, ordered=False).matched_count
+            except BulkWriteError as e:
+                print(f"Deduplicated alert updates partially failed: {len(e.details.get('writeErrors', []))} of {len(updates)} rejected.")
+                return e.details.get("nMatched", 0)
+            except Exception as e:
+                print(f"Error updating deduplicated alerts: {e}")
+                return 0
         else: # Mock update
-            for alert in self._mock_alerts_storage:
-                # Compare string representation of ObjectId (from mock ID or real _id converted to str)
-                if str(alert._id) == alert_id:
-                    alert.status = new_status
-                    alert.timestamp = datetime.now() # Update mock timestamp
-                    return True
-            return False
+            updated = 0
+            for alert_id, count, log_ids in updates:
+                alert = self._mock_alerts_storage.get(alert_id)
+                if alert is not None:
+                    alert.occurrence_count += count
+                    alert.log_ids = (alert.log_ids + log_ids)[-max_log_ids:]
+                    alert.last_seen = last_seen
+                    updated += 1
+            return updated
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Blocks until all buffered (write-behind) inserts have been written. No-op otherwise."""
+        flushed = True
+        for write_buffer in (self.log_buffer, self.network_flow_buffer):
+            if write_buffer is not None:
+                flushed = write_buffer.flush(timeout) and flushed
+        return flushed
+
+    def get_spill_queue_stats(self) -> Optional[Dict[str, Any]]:
+        """Returns spill queue counters, or None when no spill directory is configured."""
+        if self.spill_queue is None:
+            return None
+        stats = dict(self.spill_queue.stats)
+        stats["spilling"] = self._spilling
+        return stats
+
+    def get_memory_store_stats(self) -> Optional[Dict[str, Any]]:
+        """Returns record, eviction and index counters per in-memory collection, or None with MongoDB."""
+        if self.db is not None:
+            return None
+        return {
+            collection.name: collection.get_stats()
+            for collection in (self._mock_logs_storage, self._mock_alerts_storage, self._mock_network_flows_storage)
+        }
+
+    def get_partition_stats(self) -> Optional[Dict[str, Any]]:
+        """Returns hot partition and archive counters per partitioned collection, or None when not partitioned."""
+        collections = self._partitioned_collections()
+        if not collections:
+            return None
+        return {collection.name: collection.get_stats() for collection in collections}
+
+    def get_write_buffer_stats(self) -> Dict[str, Any]:
+        """Returns depth and backpressure counters for each write-behind buffer (empty when disabled)."""
+        return {
+            write_buffer.name: write_buffer.get_stats()
+            for write_buffer in (self.log_buffer, self.network_flow_buffer)
+            if write_buffer is not None
+        }
 
     def close(self):
-        """Closes the MongoDB connection."""
+        """Flushes any write-behind buffers and closes the MongoDB connection."""
+        for write_buffer in (self.log_buffer, self.network_flow_buffer):
+            if write_buffer is not None:
+                write_buffer.close()
+        if self.spill_queue is not None:
+            self.spill_queue.close()
         if self.client: # This check is fine for the client object
             self.client.close()
             print("MongoDB connection closed.")
\ No newline at end of file
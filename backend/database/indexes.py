@@ -0,0 +1,117 @@
+# backend/database/indexes.py
+
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from bson.objectid import ObjectId
+from pymongo import ASCENDING, DESCENDING, IndexModel
+from pymongo.errors import OperationFailure
+
+from backend.config import Config
+
+NETWORK_FLOWS_COLLECTION_NAME = "network_flows"
+
+
+class IndexVerificationError(RuntimeError):
+    """A query shape used by SiemDatabase would scan the whole collection."""
+
+
+def index_models(config: Config) -> Dict[str, List[IndexModel]]:
+    """
+    Compound indexes per collection, equality fields first and the sort field (timestamp)
+    last, matching the queries SiemDatabase sends (see query_shapes).
+    """
+    return {
+        config.LOGS_COLLECTION_NAME: [
+            # get_recent_logs, timestamp ranges, and iter_log_batches' (timestamp, _id) order
+            IndexModel([("timestamp", ASCENDING), ("_id", ASCENDING)], name="timestamp_id"),
+            IndexModel([("source", ASCENDING), ("timestamp", DESCENDING)], name="source_timestamp"),
+            IndexModel([("level", ASCENDING), ("timestamp", DESCENDING)], name="level_timestamp"),
+            IndexModel([("source", ASCENDING), ("level", ASCENDING), ("timestamp", DESCENDING)], name="source_level_timestamp"),
+        ],
+        config.ALERTS_COLLECTION_NAME: [
+            IndexModel([("timestamp", DESCENDING)], name="timestamp"),
+            IndexModel([("status", ASCENDING), ("timestamp", DESCENDING)], name="status_timestamp"),
+            IndexModel([("status", ASCENDING), ("severity", ASCENDING), ("timestamp", DESCENDING)], name="status_severity_timestamp"),
+        ],
+        NETWORK_FLOWS_COLLECTION_NAME: [
+            IndexModel([("timestamp", DESCENDING)], name="timestamp"),
+        ],
+        config.HUNT_RESULTS_COLLECTION_NAME: [
+            IndexModel([("hunt_id", ASCENDING), ("rule_name", ASCENDING)], name="hunt_id_rule_name"),
+        ],
+    }
+
+
+def query_shapes(config: Config) -> List[Tuple[str, str, Dict[str, Any], List[Tuple[str, int]]]]:
+    """
+    (name, collection, filter, sort) for each query SiemDatabase issues. Values are placeholders:
+    only the shape matters to the planner.
+    """
+    logs, alerts = config.LOGS_COLLECTION_NAME, config.ALERTS_COLLECTION_NAME
+    by_time = [("timestamp", DESCENDING)]
+    moment = datetime(2000, 1, 1)
+    window = {"timestamp": {"$gte": moment, "$lt": moment}}
+    return [
+        ("get_recent_logs", logs, {}, by_time),
+        ("filter_logs(source)", logs, {"source": "Authentication"}, by_time),
+        ("filter_logs(level)", logs, {"level": "WARN"}, by_time),
+        ("filter_logs(source, level)", logs, {"source": "Authentication", "level": "WARN"}, by_time),
+        ("filter_logs(text)", logs, {"message": {"$regex": "failed", "$options": "i"}}, by_time),
+        ("get_logs_by_criteria(since)", logs, {"timestamp": {"$gte": moment}}, by_time),
+        ("iter_log_batches", logs, window, [("timestamp", ASCENDING), ("_id", ASCENDING)]),
+        ("iter_log_batches(resume)", logs, {"$and": [window, {"$or": [{"timestamp": {"$gt": moment}},
+                                                                      {"timestamp": moment, "_id": {"$gt": ObjectId()}}]}]},
+         [("timestamp", ASCENDING), ("_id", ASCENDING)]),
+        ("get_open_alerts", alerts, {"status": "Open"}, by_time),
+        ("get_open_alerts(severity)", alerts, {"status": "Open", "severity": "High"}, by_time),
+        ("get_all_alerts", alerts, {}, by_time),
+        ("get_recent_network_flows", NETWORK_FLOWS_COLLECTION_NAME, {}, by_time),
+    ]
+
+
+def ensure_indexes(db, config: Config, collections: Optional[Dict[str, Any]] = None) -> Dict[str, List[str]]:
+    """
+    Creates any missing indexes (existing ones are left alone). Returns the index names per
+    collection. `collections` maps a collection name to the collection to use instead of
+    db[name] (e.g. today's partition of a partitioned collection).
+    """
+    collections = collections or {}
+    created = {}
+    for collection_name, models in index_models(config).items():
+        try:
+            created[collection_name] = collections.get(collection_name, db[collection_name]).create_indexes(models)
+        except OperationFailure as e:
+            # e.g. an index with the same keys but another name; verification reports what is still missing
+            print(f"WARNING: Could not create indexes on '{collection_name}': {e}")
+    return created
+
+
+def _stages(plan: Any) -> List[str]:
+    """Every "stage" in an explain() plan tree (classic and SBE explain formats)."""
+    if isinstance(plan, dict):
+        stages = [plan["stage"]] if isinstance(plan.get("stage"), str) else []
+        for value in plan.values():
+            stages += _stages(value)
+        return stages
+    if isinstance(plan, list):
+        return [stage for item in plan for stage in _stages(item)]
+    return []
+
+
+def verify_query_shapes(db, config: Config, collections: Optional[Dict[str, Any]] = None) -> Dict[str, List[str]]:
+    """
+    Explains each query shape and returns its winning plan stages. Raises IndexVerificationError
+    listing every shape whose winning plan contains a COLLSCAN. `collections` as for ensure_indexes.
+    """
+    collections = collections or {}
+    plans, scans = {}, []
+    for name, collection_name, query, sort in query_shapes(config):
+        explain = collections.get(collection_name, db[collection_name]).find(query).sort(sort).limit(100).explain()
+        stages = _stages(explain.get("queryPlanner", {}).get("winningPlan", {}))
+        plans[name] = stages
+        if "COLLSCAN" in stages:
+            scans.append(f"{name} on '{collection_name}' ({' <- '.join(stages)})")
+    if scans:
+        raise IndexVerificationError("Query shapes still doing collection scans: " + "; ".join(scans))
+    return plans
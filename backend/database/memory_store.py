@@ -0,0 +1,169 @@
+# backend/database/memory_store.py
+
+import threading
+from bisect import bisect_left, bisect_right, insort
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+
+class MemoryCollection:
+    """
+    Embedded in-memory collection used by SiemDatabase when MongoDB is unavailable.
+
+    Records (LogEntry / Alert / NetworkFlowEntry objects) are kept in timestamp order under a
+    (timestamp, insert sequence) key: in-order inserts are appends, late ones are placed with
+    bisect. Each indexed field has a hash index value -> sorted list of keys, and "_id" maps
+    str(_id) -> key. A query walks the shortest matching key list backwards from the bisected
+    end of its time range and stops at the limit, so "newest N where level = X" costs
+    O(log n + k) instead of a scan and sort of the whole collection.
+
+    With a capacity, the oldest records are evicted once it is exceeded: 10% at a time, so
+    the list shifts are amortized over many inserts and the collection never exceeds capacity.
+    """
+
+    def __init__(self, name: str, indexed_fields: Iterable[str] = (), capacity: int = 0):
+        self.name = name
+        self.capacity = capacity
+        self._indexes: Dict[str, Dict[Any, list]] = {field: {} for field in indexed_fields}
+        self._keys: List[Tuple] = [] # (timestamp, seq), ascending
+        self._records: Dict[Tuple, Any] = {}
+        self._ids: Dict[str, Tuple] = {} # str(_id) -> key
+        self._seq = 0
+        self._lock = threading.RLock()
+        self.stats: Dict[str, int] = {"inserted": 0, "out_of_order": 0, "updated": 0, "evicted": 0}
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def _add(self, record: Any) -> Tuple:
+        self._seq += 1
+        key = (record.timestamp, self._seq)
+        if not self._keys or key > self._keys[-1]:
+            self._keys.append(key)
+        else:
+            insort(self._keys, key)
+            self.stats["out_of_order"] += 1
+        self._records[key] = record
+        if record._id is not None:
+            self._ids[str(record._id)] = key
+        for field, index in self._indexes.items():
+            value = getattr(record, field, None)
+            postings = index.get(value)
+            if postings is None:
+                index[value] = [key]
+            elif key > postings[-1]:
+                postings.append(key)
+            else:
+                insort(postings, key)
+        return key
+
+    def _remove(self, key: Tuple) -> Any:
+        record = self._records.pop(key)
+        del self._keys[bisect_left(self._keys, key)]
+        if record._id is not None:
+            self._ids.pop(str(record._id), None)
+        for field, index in self._indexes.items():
+            value = getattr(record, field, None)
+            postings = index[value]
+            del postings[bisect_left(postings, key)]
+            if not postings:
+                del index[value]
+        return record
+
+    def insert(self, record: Any):
+        self.insert_many([record])
+
+    def insert_many(self, records: List[Any]):
+        with self._lock:
+            for record in records:
+                self._add(record)
+            self.stats["inserted"] += len(records)
+            if self.capacity and len(self._keys) > self.capacity:
+                self._evict(len(self._keys) - self.capacity + self.capacity // 10)
+
+    def _evict(self, count: int):
+        """Drops the count oldest records: one prefix delete per touched key list."""
+        evicted_keys = self._keys[:count]
+        del self._keys[:count]
+        cutoff = evicted_keys[-1]
+        touched = set()
+        for key in evicted_keys:
+            record = self._records.pop(key)
+            if record._id is not None:
+                self._ids.pop(str(record._id), None)
+            for field in self._indexes:
+                touched.add((field, getattr(record, field, None)))
+        for field, value in touched:
+            index = self._indexes[field]
+            postings = index[value]
+            del postings[:bisect_right(postings, cutoff)] # The oldest keys overall are the oldest of each list
+            if not postings:
+                del index[value]
+        self.stats["evicted"] += count
+
+    def get(self, record_id: Any) -> Optional[Any]:
+        with self._lock:
+            key = self._ids.get(str(record_id))
+            return self._records[key] if key is not None else None
+
+    def update(self, record_id: Any, changes: Dict[str, Any]) -> Optional[Any]:
+        """
+        Applies attribute changes to one record and re-indexes it (its position too, if the
+        timestamp changes). Returns the record, or None if no record has that _id.
+        """
+        with self._lock:
+            key = self._ids.get(str(record_id))
+            if key is None:
+                return None
+            record = self._remove(key)
+            for field, value in changes.items():
+                setattr(record, field, value)
+            self._add(record)
+            self.stats["updated"] += 1
+            return record
+
+    def find(self, equals: Optional[Dict[str, Any]] = None, start: Any = None, end: Any = None,
+             predicate: Optional[Callable[[Any], bool]] = None, limit: Optional[int] = None) -> List[Any]:
+        """
+        Records with start <= timestamp < end (either bound optional) whose fields equal
+        `equals` and that pass `predicate`, newest first, at most `limit` of them.
+        """
+        equals = equals or {}
+        results = []
+        if limit is not None and limit <= 0:
+            return results
+        with self._lock:
+            keys = self._keys
+            for field, value in equals.items():
+                if field in self._indexes:
+                    postings = self._indexes[field].get(value)
+                    if postings is None:
+                        return results
+                    if len(postings) < len(keys):
+                        keys = postings
+            lo = bisect_left(keys, (start,)) if start is not None else 0
+            hi = bisect_left(keys, (end,)) if end is not None else len(keys)
+            checks = list(equals.items())
+            records = self._records
+            for i in range(hi - 1, lo - 1, -1):
+                record = records[keys[i]]
+                if checks and any(getattr(record, field, None) != value for field, value in checks):
+                    continue
+                if predicate is not None and not predicate(record):
+                    continue
+                results.append(record)
+                if limit is not None and len(results) >= limit:
+                    break
+        return results
+
+    def scan(self, start: Any = None, end: Any = None) -> Iterator[Any]:
+        """Records with start <= timestamp < end, oldest first (a snapshot of the range)."""
+        with self._lock:
+            lo = bisect_left(self._keys, (start,)) if start is not None else 0
+            hi = bisect_left(self._keys, (end,)) if end is not None else len(self._keys)
+            records = [self._records[key] for key in self._keys[lo:hi]]
+        return iter(records)
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return dict(self.stats, records=len(self._keys), capacity=self.capacity,
+                        index_values={field: len(index) for field, index in self._indexes.items()})
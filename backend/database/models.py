@@ -85,6 +85,8 @@ class Alert:
     comments: List[str] = field(default_factory=list)
     rule_name: Optional[str] = None
     log_ids: List[str] = field(default_factory=list) # List of string _id from related logs
+    occurrence_count: int = 1 # Matching hits folded into this alert by suppression (see AlertSuppressor)
+    last_seen: Optional[datetime] = None # Time of the latest folded-in hit
     _id: Optional[ObjectId] = None # Add _id for MongoDB compatibility
 
     def to_dict(self) -> Dict[str, Any]:
@@ -101,7 +103,9 @@ class Alert:
             "assigned_to": self.assigned_to,
             "comments": self.comments,
             "rule_name": self.rule_name,
-            "log_ids": self.log_ids
+            "log_ids": self.log_ids,
+            "occurrence_count": self.occurrence_count,
+            "last_seen": self.last_seen
         }
         # CRITICAL FIX: Convert ObjectId to string for JSON serialization
         if self._id:
@@ -139,6 +143,8 @@ class Alert:
             comments=data.get('comments', []),
             rule_name=data.get('rule_name'),
             log_ids=data.get('log_ids', []),
+            occurrence_count=data.get('occurrence_count', 1),
+            last_seen=data.get('last_seen'),
             _id=_id # Pass _id directly to constructor
         )
         return alert
@@ -0,0 +1,387 @@
+# backend/database/partitions.py
+
+import copy
+import gzip
+import heapq
+import os
+import re
+import threading
+import time
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import bson
+from bson.objectid import ObjectId
+from pymongo import ASCENDING, DESCENDING
+from pymongo.errors import BulkWriteError, OperationFailure
+from pymongo.results import InsertManyResult
+
+PARTITION_DATE_FORMAT = "%Y%m%d"
+ARCHIVE_SUFFIX = ".bson.gz"
+ARCHIVING_SUFFIX = "_archiving" # A partition is renamed to <partition>_archiving while it is archived
+PARTITION_LIST_TTL_SECONDS = 30 # How long the list of existing partitions is cached
+
+
+def query_time_bounds(query: Dict[str, Any]) -> Tuple[Optional[datetime], Optional[datetime]]:
+    """
+    (lowest, highest) timestamp a document matching the query can have, from "timestamp"
+    conditions at the top level or inside $and (either bound None when unconstrained).
+    """
+    start = end = None
+    clauses = [query]
+    while clauses:
+        clause = clauses.pop()
+        clauses.extend(clause.get("$and", []))
+        condition = clause.get("timestamp")
+        if isinstance(condition, dict):
+            lower = [condition[op] for op in ("$gte", "$gt") if isinstance(condition.get(op), datetime)]
+            upper = [condition[op] for op in ("$lt", "$lte") if isinstance(condition.get(op), datetime)]
+        elif isinstance(condition, datetime):
+            lower = upper = [condition]
+        else:
+            continue
+        for value in lower:
+            start = value if start is None else max(start, value)
+        for value in upper:
+            end = value if end is None else min(end, value)
+    return start, end
+
+
+def _timestamp(document: Dict[str, Any]) -> datetime:
+    timestamp = document.get("timestamp")
+    return timestamp if isinstance(timestamp, datetime) else datetime.now()
+
+
+def _read_segment(path: str) -> Iterator[Dict[str, Any]]:
+    with gzip.open(path, "rb") as f:
+        yield from bson.decode_file_iter(f)
+
+
+class _PartitionCursor:
+    """find() result over the partitions overlapping the query's time range, walked in sort order."""
+
+    def __init__(self, partitions: "PartitionedCollection", query: Dict[str, Any], batch_size: int):
+        self._partitions = partitions
+        self._query = query
+        self._batch_size = batch_size
+        self._sort: List[Tuple[str, int]] = []
+        self._limit = 0
+        self._documents: Optional[Iterator[Dict[str, Any]]] = None
+
+    def sort(self, key_or_list, direction: int = ASCENDING) -> "_PartitionCursor":
+        self._sort = [(key_or_list, direction)] if isinstance(key_or_list, str) else list(key_or_list)
+        if self._sort[0][0] != "timestamp":
+            raise ValueError("Partitioned collections can only be sorted by timestamp first.")
+        return self
+
+    def limit(self, limit: int) -> "_PartitionCursor":
+        self._limit = limit
+        return self
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        self._documents = self._iterate()
+        return self._documents
+
+    def _iterate(self) -> Iterator[Dict[str, Any]]:
+        start, end = query_time_bounds(self._query)
+        newest_first = bool(self._sort) and self._sort[0][1] == DESCENDING
+        returned = 0
+        for name in self._partitions.partition_names(start, end, newest_first):
+            cursor = self._partitions.db[name].find(self._query, batch_size=self._batch_size)
+            if self._sort:
+                cursor = cursor.sort(self._sort)
+            if self._limit:
+                cursor = cursor.limit(self._limit - returned)
+            try:
+                for document in cursor:
+                    returned += 1
+                    yield document
+            finally:
+                cursor.close()
+            if self._limit and returned >= self._limit:
+                return
+
+    def close(self):
+        if self._documents is not None:
+            self._documents.close()
+
+
+class PartitionedCollection:
+    """
+    A time-ordered collection (logs, network_flows) stored as one MongoDB collection per day,
+    <name>_YYYYMMDD, behind the part of the Collection interface SiemDatabase uses: insert_one,
+    insert_many, with_options and find(...).sort("timestamp", ...).limit(...).
+
+    Inserts are routed by document timestamp, and each partition gets the collection's indexes
+    the first time this process writes to it. find() only visits partitions overlapping the
+    query's timestamp bounds, in sort order, and stops once the limit is filled, so "newest
+    100" reads today's partition and every index stays the size of one day.
+
+    maintain() ages partitions out: after hot_days a partition is written to a gzip'd archive
+    segment of concatenated BSON documents in (timestamp, _id) order
+    (archive_dir/<name>/<name>_YYYYMMDD-NNNN.bson.gz) and dropped; after retention_days
+    partitions and archive segments are deleted. A partition is renamed out of the way before
+    it is archived, so a late write recreates the partition instead of landing in a collection
+    that is about to be dropped. Run it from one process only.
+    """
+
+    def __init__(self, db, name: str, index_models: list, hot_days: int = 0, retention_days: int = 0,
+                 archive_dir: str = ""):
+        self.db = db
+        self.name = name
+        self.index_models = index_models
+        self.hot_days = hot_days
+        self.retention_days = retention_days
+        self.archive_dir = os.path.join(archive_dir, name) if archive_dir else ""
+        self.write_concern = None
+        self._pattern = re.compile(rf"^{re.escape(name)}_(\d{{8}})$")
+        self._segment_pattern = re.compile(rf"^{re.escape(name)}_(\d{{8}})-(\d{{4}}){re.escape(ARCHIVE_SUFFIX)}$")
+        self._archiving_pattern = re.compile(rf"^{re.escape(name)}_(\d{{8}}){re.escape(ARCHIVING_SUFFIX)}$")
+        self._lock = threading.Lock()
+        self._indexed = set() # Partitions this process has created indexes on
+        self._listed: List[str] = []
+        self._listed_at = float("-inf")
+        self.stats: Dict[str, int] = {"archived_partitions": 0, "archived_documents": 0,
+                                      "dropped_partitions": 0, "deleted_segments": 0}
+
+    def with_options(self, write_concern=None) -> "PartitionedCollection":
+        """A view whose partitions are written with this write concern (shares indexes and stats)."""
+        view = copy.copy(self)
+        view.write_concern = write_concern
+        return view
+
+    # --- Partition bookkeeping ---
+
+    def partition_name(self, day: date) -> str:
+        return f"{self.name}_{day.strftime(PARTITION_DATE_FORMAT)}"
+
+    def _day(self, partition_name: str) -> date:
+        return datetime.strptime(self._pattern.match(partition_name).group(1), PARTITION_DATE_FORMAT).date()
+
+    def current_partition(self):
+        """Today's partition collection (for index provisioning and plan verification)."""
+        return self.db[self.partition_name(date.today())]
+
+    def _partition_for_write(self, partition_name: str):
+        if partition_name not in self._indexed:
+            with self._lock:
+                if partition_name not in self._indexed:
+                    if self.index_models:
+                        self.db[partition_name].create_indexes(self.index_models)
+                    self._indexed.add(partition_name)
+        collection = self.db[partition_name]
+        if self.write_concern is not None:
+            collection = collection.with_options(write_concern=self.write_concern)
+        return collection
+
+    def partition_names(self, start: Optional[datetime] = None, end: Optional[datetime] = None,
+                        newest_first: bool = True, refresh: bool = False) -> List[str]:
+        """Existing partitions whose day overlaps start..end (inclusive), in time order."""
+        if refresh or time.monotonic() - self._listed_at > PARTITION_LIST_TTL_SECONDS:
+            self._listed = self.db.list_collection_names(filter={"name": {"$regex": self._pattern.pattern}})
+            self._listed_at = time.monotonic()
+        # Plus the ones this process created since, and today's, which another process may have just started
+        names = set(self._listed) | self._indexed | {self.partition_name(date.today())}
+        selected = sorted(
+            name for name in names
+            if (start is None or self._day(name) >= start.date()) and (end is None or self._day(name) <= end.date())
+        )
+        return selected[::-1] if newest_first else selected
+
+    # --- Collection interface ---
+
+    def insert_one(self, document: Dict[str, Any]):
+        return self._partition_for_write(self.partition_name(_timestamp(document).date())).insert_one(document)
+
+    def insert_many(self, documents: List[Dict[str, Any]], ordered: bool = False) -> InsertManyResult:
+        """
+        One insert_many per partition touched. IDs are assigned up front so every document has
+        one even if a later partition's write fails. Per-partition BulkWriteErrors are combined
+        into one, with indexes relative to `documents`.
+        """
+        positions_by_partition: Dict[str, List[int]] = {}
+        for position, document in enumerate(documents):
+            document.setdefault("_id", ObjectId())
+            positions_by_partition.setdefault(self.partition_name(_timestamp(document).date()), []).append(position)
+        inserted, write_errors = 0, []
+        for partition_name, positions in sorted(positions_by_partition.items()):
+            collection = self._partition_for_write(partition_name)
+            try:
+                inserted += len(collection.insert_many([documents[position] for position in positions], ordered=ordered).inserted_ids)
+            except BulkWriteError as e:
+                inserted += e.details.get("nInserted", 0)
+                write_errors += [dict(error, index=positions[error["index"]]) for error in e.details.get("writeErrors", [])]
+        if write_errors:
+            raise BulkWriteError({"writeErrors": write_errors, "writeConcernErrors": [], "nInserted": inserted,
+                                  "nUpserted": 0, "nMatched": 0, "nModified": 0, "nRemoved": 0, "upserted": []})
+        return InsertManyResult([document["_id"] for document in documents], True)
+
+    def find(self, filter: Optional[Dict[str, Any]] = None, batch_size: int = 0) -> _PartitionCursor:
+        return _PartitionCursor(self, filter or {}, batch_size)
+
+    # --- Archive segments ---
+
+    def _segments(self) -> Dict[date, List[str]]:
+        """Archive segment paths per day, oldest segment first."""
+        segments: Dict[date, List[str]] = {}
+        if not self.archive_dir or not os.path.isdir(self.archive_dir):
+            return segments
+        for file_name in sorted(os.listdir(self.archive_dir)):
+            match = self._segment_pattern.match(file_name)
+            if match:
+                day = datetime.strptime(match.group(1), PARTITION_DATE_FORMAT).date()
+                segments.setdefault(day, []).append(os.path.join(self.archive_dir, file_name))
+        return segments
+
+    def _archive(self, partition_name: str, day: date) -> int:
+        """
+        Renames the partition to <partition>_archiving, writes it to a new archive segment and
+        drops it. Documents written after the rename go to a fresh partition for the same day,
+        which a later run archives into a further segment; readers merge a day's segments.
+        """
+        archiving_name = partition_name + ARCHIVING_SUFFIX
+        try:
+            self.db[partition_name].rename(archiving_name)
+        except OperationFailure as e:
+            if e.code == 26: # NamespaceNotFound: nothing was ever written to this partition
+                return 0
+            raise
+        return self._archive_renamed(archiving_name, partition_name, day)
+
+    def _archive_renamed(self, archiving_name: str, partition_name: str, day: date) -> int:
+        """Writes an already renamed partition to a new archive segment and drops it."""
+        os.makedirs(self.archive_dir, exist_ok=True)
+        sequence = len(self._segments().get(day, [])) + 1
+        path = os.path.join(self.archive_dir, f"{partition_name}-{sequence:04d}{ARCHIVE_SUFFIX}")
+        temp_path = path + ".tmp"
+        count = 0
+        cursor = self.db[archiving_name].find().sort([("timestamp", ASCENDING), ("_id", ASCENDING)])
+        try:
+            with open(temp_path, "wb") as raw, gzip.GzipFile(fileobj=raw, mode="wb") as f:
+                for document in cursor:
+                    f.write(bson.encode(document))
+                    count += 1
+                f.close()
+                raw.flush()
+                os.fsync(raw.fileno())
+        finally:
+            cursor.close()
+        if count:
+            os.replace(temp_path, path) # Atomic: the segment is complete before the partition is dropped
+        else:
+            os.remove(temp_path)
+        self.db.drop_collection(archiving_name)
+        return count
+
+    def iter_time_range(self, query: Dict[str, Any], start: datetime, end: datetime,
+                        resume_after: Optional[Tuple[datetime, ObjectId]] = None,
+                        batch_size: int = 0) -> Iterator[Dict[str, Any]]:
+        """
+        Documents with start <= timestamp < end in (timestamp, _id) order, from hot partitions
+        (filtered by `query`) and archive segments (filtered by the range and resume_after),
+        merged day by day.
+        """
+        if resume_after is not None: # Days before the resume position are already done
+            start = max(start, resume_after[0])
+        partitions = {self._day(name): name for name in self.partition_names(start, end, newest_first=False)}
+        segments = {day: paths for day, paths in self._segments().items() if start.date() <= day <= end.date()}
+        order = lambda document: (document["timestamp"], document["_id"])
+        for day in sorted(set(partitions) | set(segments)):
+            sources = [
+                (document for document in _read_segment(path)
+                 if start <= document["timestamp"] < end and (resume_after is None or order(document) > resume_after))
+                for path in segments.get(day, [])
+            ]
+            if day in partitions:
+                sources.append(self._find_ordered(partitions[day], query, batch_size))
+            yield from sources[0] if len(sources) == 1 else heapq.merge(*sources, key=order)
+
+    def _find_ordered(self, partition_name: str, query: Dict[str, Any], batch_size: int) -> Iterator[Dict[str, Any]]:
+        cursor = self.db[partition_name].find(query, batch_size=batch_size).sort([("timestamp", ASCENDING), ("_id", ASCENDING)])
+        try:
+            yield from cursor
+        finally:
+            cursor.close()
+
+    # --- Ageing ---
+
+    def maintain(self, today: Optional[date] = None) -> Dict[str, int]:
+        """
+        Archives partitions past hot_days (when an archive directory is set) and deletes
+        partitions and archive segments past retention_days (0 disables either step).
+        """
+        today = today or date.today()
+        archived = dropped = deleted = 0
+        if self.archive_dir: # Finish archives an earlier run was interrupted in
+            for archiving_name in self.db.list_collection_names(filter={"name": {"$regex": self._archiving_pattern.pattern}}):
+                partition_name = archiving_name[:-len(ARCHIVING_SUFFIX)]
+                try:
+                    self.stats["archived_documents"] += self._archive_renamed(archiving_name, partition_name, self._day(partition_name))
+                    archived += 1
+                except Exception as e:
+                    print(f"ERROR: Partition maintenance failed for '{archiving_name}': {e}")
+        for partition_name in self.partition_names(newest_first=False, refresh=True):
+            age_days = (today - self._day(partition_name)).days
+            try:
+                if self.retention_days and age_days >= self.retention_days:
+                    self.db.drop_collection(partition_name)
+                    dropped += 1
+                elif self.hot_days and self.archive_dir and age_days >= self.hot_days:
+                    self.stats["archived_documents"] += self._archive(partition_name, self._day(partition_name))
+                    archived += 1
+                else:
+                    continue
+            except Exception as e:
+                print(f"ERROR: Partition maintenance failed for '{partition_name}': {e}")
+                continue
+            self._indexed.discard(partition_name)
+        if self.retention_days:
+            cutoff = today - timedelta(days=self.retention_days)
+            for day, paths in self._segments().items():
+                if day <= cutoff:
+                    for path in paths:
+                        os.remove(path)
+                        deleted += 1
+        self._listed_at = float("-inf")
+        self.stats["archived_partitions"] += archived
+        self.stats["dropped_partitions"] += dropped
+        self.stats["deleted_segments"] += deleted
+        return {"archived": archived, "dropped": dropped, "deleted_segments": deleted}
+
+    def migrate_unpartitioned(self, batch_size: int = 5000) -> int:
+        """
+        Copies documents from the unpartitioned collection of the same name into daily
+        partitions (duplicates from an earlier run are skipped). Returns the number copied;
+        dropping the old collection is left to the operator.
+        """
+        copied, batch = 0, []
+        for document in self.db[self.name].find(batch_size=batch_size).sort("_id", ASCENDING):
+            batch.append(document)
+            if len(batch) >= batch_size:
+                copied += self._copy(batch)
+                batch = []
+        if batch:
+            copied += self._copy(batch)
+        return copied
+
+    def _copy(self, documents: List[Dict[str, Any]]) -> int:
+        try:
+            return len(self.insert_many(documents).inserted_ids)
+        except BulkWriteError as e:
+            unexpected = [error for error in e.details.get("writeErrors", []) if error.get("code") != 11000]
+            if unexpected:
+                print(f"WARNING: {len(unexpected)} documents from '{self.name}' could not be copied into partitions.")
+            return e.details.get("nInserted", 0)
+
+    def get_stats(self) -> Dict[str, Any]:
+        names = self.partition_names(newest_first=False)
+        segments = self._segments()
+        return dict(
+            self.stats,
+            hot_partitions=len(names),
+            oldest_hot_partition=names[0] if names else None,
+            archived_days=len(segments),
+            archive_bytes=sum(os.path.getsize(path) for paths in segments.values() for path in paths),
+            hot_days=self.hot_days,
+            retention_days=self.retention_days,
+        )
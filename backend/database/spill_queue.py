@@ -0,0 +1,194 @@
+# backend/database/spill_queue.py
+
+import json
+import mmap
+import os
+import threading
+import time
+from typing import Callable, Dict, Any, List, Optional, Tuple
+
+import bson
+
+SEGMENT_PREFIX = "segment-"
+SEGMENT_SUFFIX = ".log"
+CHECKPOINT_FILE = "checkpoint.json"
+
+
+class SegmentSpillQueue:
+    """
+    Append-only, on-disk write-ahead queue used while MongoDB is unreachable.
+    Each record is one BSON document {"c": collection_name, "d": document}; BSON documents
+    carry their own int32 length prefix, so segments are simply concatenated records.
+    Appends go to the active segment and are fsync'd in batches (every fsync_batch records
+    or fsync_interval_ms, whichever comes first); a background thread also fsyncs records left
+    unsynced for fsync_interval_ms, so the last records of a burst do not wait for the next
+    append. Segments are rotated at segment_max_bytes.
+    drain() seals the active segment and replays sealed segments oldest-first through
+    memory maps, checkpointing the replay position so a crash mid-drain resumes in place.
+    """
+
+    def __init__(self, directory: str, segment_max_bytes: int = 64 * 1024 * 1024,
+                 fsync_interval_ms: int = 200, fsync_batch: int = 1000):
+        self.directory = directory
+        self.segment_max_bytes = segment_max_bytes
+        self.fsync_interval = fsync_interval_ms / 1000.0
+        self.fsync_batch = fsync_batch
+        os.makedirs(directory, exist_ok=True)
+
+        self._lock = threading.Lock() # Guards the active segment
+        self._drain_lock = threading.Lock() # Only one drain at a time
+        self._active_file = None
+        existing_segments = self._segment_sequences()
+        self._active_seq = existing_segments[-1] if existing_segments else 0
+        self._active_bytes = 0
+        self._unsynced_records = 0
+        self._last_sync = time.monotonic()
+        self.stats: Dict[str, int] = {"spilled_records": 0, "spilled_bytes": 0, "drained_records": 0, "fsyncs": 0}
+        self._stop = threading.Event()
+        self._thread = None
+        if self.fsync_interval > 0: # Otherwise every append already fsyncs
+            self._thread = threading.Thread(target=self._run, name="spill-queue-fsync", daemon=True)
+            self._thread.start()
+
+    # --- Segment bookkeeping ---
+
+    def _segment_path(self, seq: int) -> str:
+        return os.path.join(self.directory, f"{SEGMENT_PREFIX}{seq:010d}{SEGMENT_SUFFIX}")
+
+    def _segment_sequences(self) -> List[int]:
+        sequences = []
+        for name in os.listdir(self.directory):
+            if name.startswith(SEGMENT_PREFIX) and name.endswith(SEGMENT_SUFFIX):
+                sequences.append(int(name[len(SEGMENT_PREFIX):-len(SEGMENT_SUFFIX)]))
+        return sorted(sequences)
+
+    def _open_new_segment(self):
+        # Never append to a segment left over from a previous process: its tail may be torn.
+        self._active_seq += 1
+        self._active_file = open(self._segment_path(self._active_seq), 'ab')
+        self._active_bytes = 0
+
+    def _seal_active_segment(self):
+        if self._active_file is not None:
+            self._sync()
+            self._active_file.close()
+            self._active_file = None
+
+    def _sync(self):
+        if self._active_file is not None and self._unsynced_records:
+            self._active_file.flush()
+            os.fsync(self._active_file.fileno())
+            self.stats["fsyncs"] += 1
+        self._unsynced_records = 0
+        self._last_sync = time.monotonic()
+
+    def _run(self):
+        while not self._stop.wait(self.fsync_interval):
+            with self._lock:
+                if self._unsynced_records and time.monotonic() - self._last_sync >= self.fsync_interval:
+                    self._sync()
+
+    def _read_checkpoint(self) -> Tuple[int, int]:
+        try:
+            with open(os.path.join(self.directory, CHECKPOINT_FILE)) as f:
+                checkpoint = json.load(f)
+            return checkpoint["segment"], checkpoint["offset"]
+        except (OSError, ValueError, KeyError):
+            return 0, 0
+
+    def _write_checkpoint(self, seq: int, offset: int):
+        path = os.path.join(self.directory, CHECKPOINT_FILE)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump({"segment": seq, "offset": offset}, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path) # Atomic: a crash leaves either the old or the new checkpoint
+
+    # --- Public API ---
+
+    def append(self, collection_name: str, documents: List[Dict[str, Any]]):
+        """Appends documents for a collection. Durable after the next batched or timed fsync."""
+        records = [bson.encode({"c": collection_name, "d": document}) for document in documents]
+        with self._lock:
+            for record in records:
+                if self._active_file is None or self._active_bytes >= self.segment_max_bytes:
+                    self._seal_active_segment()
+                    self._open_new_segment()
+                self._active_file.write(record)
+                self._active_bytes += len(record)
+                self._unsynced_records += 1
+                self.stats["spilled_records"] += 1
+                self.stats["spilled_bytes"] += len(record)
+            if self._unsynced_records >= self.fsync_batch or time.monotonic() - self._last_sync >= self.fsync_interval:
+                self._sync()
+
+    def sync(self):
+        """Forces an fsync of the active segment."""
+        with self._lock:
+            self._sync()
+
+    def is_empty(self) -> bool:
+        with self._lock:
+            if self._active_file is not None and self._active_bytes:
+                return False # Possibly still in the userspace write buffer
+            return all(os.path.getsize(self._segment_path(seq)) == 0 for seq in self._segment_sequences())
+
+    def drain(self, write_batch: Callable[[str, List[Dict[str, Any]]], None], batch_size: int = 1000) -> int:
+        """
+        Replays all spilled records oldest-first. write_batch(collection_name, documents) must
+        raise if the batch could not be written; the drain then stops and resumes from the last
+        checkpoint next time. Returns the number of records replayed.
+        """
+        replayed = 0
+        with self._drain_lock:
+            with self._lock:
+                self._seal_active_segment() # New appends go to a fresh segment from here on
+            checkpoint_seq, checkpoint_offset = self._read_checkpoint()
+            for seq in self._segment_sequences():
+                with self._lock:
+                    if seq == self._active_seq and self._active_file is not None:
+                        break # Opened by an append during this drain; picked up next time
+                start = checkpoint_offset if seq == checkpoint_seq else 0
+                replayed += self._drain_segment(seq, start, write_batch, batch_size)
+                os.remove(self._segment_path(seq))
+            self.stats["drained_records"] += replayed
+        return replayed
+
+    def _drain_segment(self, seq: int, start: int, write_batch, batch_size: int) -> int:
+        path = self._segment_path(seq)
+        size = os.path.getsize(path)
+        if size <= start:
+            return 0
+        replayed = 0
+        with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as segment:
+            offset = start
+            batch: List[Dict[str, Any]] = []
+            batch_collection: Optional[str] = None
+            while offset + 4 <= size:
+                length = int.from_bytes(segment[offset:offset + 4], 'little')
+                if length < 5 or offset + length > size:
+                    print(f"WARNING: Spill segment {path} has a torn record at offset {offset}; skipping the tail.")
+                    break
+                record = bson.decode(segment[offset:offset + length])
+                # Flush on collection change so each insert_many targets one collection, in order.
+                if batch and (record["c"] != batch_collection or len(batch) >= batch_size):
+                    write_batch(batch_collection, batch)
+                    replayed += len(batch)
+                    self._write_checkpoint(seq, offset)
+                    batch = []
+                batch_collection = record["c"]
+                batch.append(record["d"])
+                offset += length
+            if batch:
+                write_batch(batch_collection, batch)
+                replayed += len(batch)
+            self._write_checkpoint(seq + 1, 0)
+        return replayed
+
+    def close(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        with self._lock:
+            self._seal_active_segment()
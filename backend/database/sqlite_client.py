@@ -0,0 +1,469 @@
+# backend/database/sqlite_client.py
+
+import atexit
+import json
+import queue
+import re
+import sqlite3
+import threading
+from datetime import datetime, timedelta, timezone
+from typing import Optional, List, Dict, Any, Iterator, Tuple
+
+from bson.objectid import ObjectId
+
+from backend.config import Config
+from backend.database.models import LogEntry, Alert, NetworkFlowEntry
+from backend.database.write_buffer import WriteBehindBuffer
+
+_EPOCH = datetime(1970, 1, 1)
+_MICROSECOND = timedelta(microseconds=1)
+_REGEX_SPECIAL = set(".^$*+?{}[]\\|()")
+
+LOG_COLUMNS = ("id", "ts", "host", "source", "level", "message", "source_ip_host", "destination_ip_host", "raw_log")
+ALERT_COLUMNS = ("id", "ts", "severity", "description", "status", "source_ip_host", "assigned_to", "comments",
+                 "rule_name", "log_ids", "occurrence_count", "last_seen")
+FLOW_COLUMNS = ("id", "ts", "protocol", "source_ip", "destination_ip", "source_port", "destination_port", "packet_count",
+                "byte_count", "flags", "flow_duration_ms", "application_layer_protocol")
+
+# Indexes follow the query shapes below: equality columns first, then ts for the ORDER BY.
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS logs (
+    seq INTEGER PRIMARY KEY, id TEXT NOT NULL UNIQUE, ts INTEGER NOT NULL, host TEXT, source TEXT, level TEXT,
+    message TEXT, source_ip_host TEXT, destination_ip_host TEXT, raw_log TEXT
+);
+CREATE INDEX IF NOT EXISTS logs_ts ON logs (ts, id);
+CREATE INDEX IF NOT EXISTS logs_source_ts ON logs (source, ts);
+CREATE INDEX IF NOT EXISTS logs_source_level_ts ON logs (source, level, ts);
+CREATE INDEX IF NOT EXISTS logs_level_ts ON logs (level, ts);
+
+CREATE TABLE IF NOT EXISTS alerts (
+    seq INTEGER PRIMARY KEY, id TEXT NOT NULL UNIQUE, ts INTEGER NOT NULL, severity TEXT, description TEXT,
+    status TEXT, source_ip_host TEXT, assigned_to TEXT, comments TEXT, rule_name TEXT, log_ids TEXT,
+    occurrence_count INTEGER, last_seen INTEGER
+);
+CREATE INDEX IF NOT EXISTS alerts_ts ON alerts (ts);
+CREATE INDEX IF NOT EXISTS alerts_status_ts ON alerts (status, ts);
+CREATE INDEX IF NOT EXISTS alerts_status_severity_ts ON alerts (status, severity, ts);
+
+CREATE TABLE IF NOT EXISTS network_flows (
+    seq INTEGER PRIMARY KEY, id TEXT NOT NULL UNIQUE, ts INTEGER NOT NULL, protocol TEXT, source_ip TEXT,
+    destination_ip TEXT, source_port INTEGER, destination_port INTEGER, packet_count INTEGER, byte_count INTEGER,
+    flags TEXT, flow_duration_ms INTEGER, application_layer_protocol TEXT
+);
+CREATE INDEX IF NOT EXISTS network_flows_ts ON network_flows (ts);
+
+CREATE TABLE IF NOT EXISTS hunt_results (
+    seq INTEGER PRIMARY KEY, hunt_id TEXT, rule_name TEXT, ts INTEGER, document TEXT
+);
+CREATE INDEX IF NOT EXISTS hunt_results_hunt_id ON hunt_results (hunt_id, rule_name);
+"""
+
+# Trigram full-text index over log messages, kept in sync by triggers (external content: the
+# text itself is only stored in logs).
+FTS_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS logs_fts USING fts5(message, content='logs', content_rowid='seq', tokenize='trigram');
+CREATE TRIGGER IF NOT EXISTS logs_fts_insert AFTER INSERT ON logs BEGIN
+    INSERT INTO logs_fts (rowid, message) VALUES (new.seq, new.message);
+END;
+CREATE TRIGGER IF NOT EXISTS logs_fts_delete AFTER DELETE ON logs BEGIN
+    INSERT INTO logs_fts (logs_fts, rowid, message) VALUES ('delete', old.seq, old.message);
+END;
+"""
+DROP_FTS = """
+DROP TRIGGER IF EXISTS logs_fts_insert;
+DROP TRIGGER IF EXISTS logs_fts_delete;
+DROP TABLE IF EXISTS logs_fts;
+"""
+
+# Fixed SQL strings, so sqlite3's per-connection statement cache prepares each one once.
+INSERT_LOG = f"INSERT OR IGNORE INTO logs ({', '.join(LOG_COLUMNS)}) VALUES ({', '.join('?' * len(LOG_COLUMNS))})"
+INSERT_ALERT = f"INSERT INTO alerts ({', '.join(ALERT_COLUMNS)}) VALUES ({', '.join('?' * len(ALERT_COLUMNS))})"
+INSERT_FLOW = f"INSERT OR IGNORE INTO network_flows ({', '.join(FLOW_COLUMNS)}) VALUES ({', '.join('?' * len(FLOW_COLUMNS))})"
+INSERT_HUNT_RESULT = "INSERT INTO hunt_results (hunt_id, rule_name, ts, document) VALUES (?, ?, ?, ?)"
+SELECT_LOGS = f"SELECT {', '.join(LOG_COLUMNS)} FROM logs"
+SELECT_ALERTS = f"SELECT {', '.join(ALERT_COLUMNS)} FROM alerts"
+SELECT_FLOWS = f"SELECT {', '.join(FLOW_COLUMNS)} FROM network_flows"
+LOG_BATCH_AFTER = SELECT_LOGS + " WHERE ts >= ? AND ts < ? AND (ts, id) > (?, ?) ORDER BY ts, id LIMIT ?"
+UPDATE_ALERT_STATUS = "UPDATE alerts SET status = ?, ts = ? WHERE id = ?"
+SELECT_ALERT_OCCURRENCES = "SELECT occurrence_count, log_ids FROM alerts WHERE id = ?"
+UPDATE_ALERT_OCCURRENCES = "UPDATE alerts SET occurrence_count = ?, log_ids = ?, last_seen = ? WHERE id = ?"
+
+
+def _to_us(value: Optional[datetime]) -> Optional[int]:
+    """Datetime -> integer microseconds since the epoch (aware datetimes are stored as UTC)."""
+    if value is None:
+        return None
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return (value - _EPOCH) // _MICROSECOND
+
+
+def _from_us(value: Optional[int]) -> Optional[datetime]:
+    return _EPOCH + timedelta(microseconds=value) if value is not None else None
+
+
+def _regexp(pattern: str, value: Optional[str]) -> bool:
+    return value is not None and re.search(pattern, value) is not None
+
+
+def _log_row(log_entry: LogEntry) -> tuple:
+    return (str(log_entry._id), _to_us(log_entry.timestamp), log_entry.host, log_entry.source, log_entry.level,
+            log_entry.message, log_entry.source_ip_host, log_entry.destination_ip_host, log_entry.raw_log)
+
+
+def _log_document(row: tuple) -> Dict[str, Any]:
+    document = dict(zip(LOG_COLUMNS, row))
+    document["_id"] = ObjectId(document.pop("id"))
+    document["timestamp"] = _from_us(document.pop("ts"))
+    return document
+
+
+def _alert_row(alert: Alert) -> tuple:
+    return (str(alert._id), _to_us(alert.timestamp), alert.severity, alert.description, alert.status,
+            alert.source_ip_host, alert.assigned_to, json.dumps(alert.comments), alert.rule_name,
+            json.dumps(alert.log_ids), alert.occurrence_count, _to_us(alert.last_seen))
+
+
+def _alert_from_row(row: tuple) -> Alert:
+    document = dict(zip(ALERT_COLUMNS, row))
+    document["_id"] = ObjectId(document.pop("id"))
+    document["timestamp"] = _from_us(document.pop("ts"))
+    document["comments"] = json.loads(document["comments"] or "[]")
+    document["log_ids"] = json.loads(document["log_ids"] or "[]")
+    document["last_seen"] = _from_us(document["last_seen"])
+    return Alert.from_dict(document)
+
+
+def _flow_row(flow_entry: NetworkFlowEntry) -> tuple:
+    return (str(flow_entry._id), _to_us(flow_entry.timestamp), flow_entry.protocol, flow_entry.source_ip,
+            flow_entry.destination_ip, flow_entry.source_port, flow_entry.destination_port, flow_entry.packet_count,
+            flow_entry.byte_count, json.dumps(flow_entry.flags), flow_entry.flow_duration_ms,
+            flow_entry.application_layer_protocol)
+
+
+def _flow_from_row(row: tuple) -> NetworkFlowEntry:
+    document = dict(zip(FLOW_COLUMNS, row))
+    document["_id"] = ObjectId(document.pop("id"))
+    document["timestamp"] = _from_us(document.pop("ts"))
+    document["flags"] = json.loads(document["flags"] or "[]")
+    return NetworkFlowEntry.from_dict(document)
+
+
+class SqliteDatabase:
+    """
+    Embedded, persistent alternative to SiemDatabase (DATABASE_BACKEND=sqlite) with the same
+    public methods, for edge deployments and CI where MongoDB is not available.
+
+      - WAL journal (synchronous=NORMAL): readers never block the writer and vice versa. All
+        writes go through one connection under a lock; reads borrow a connection from a
+        shared pool of at most SQLITE_READ_POOL_SIZE.
+      - Batch inserts (insert_logs, write-behind flushes) are one transaction with executemany.
+      - Indexes match the query shapes: logs (ts, id) / (source, ts) / (source, level, ts) / (level, ts),
+        alerts (status, ts) / (status, severity, ts); "newest N" reads walk an index backwards.
+      - Message search uses an FTS5 trigram index (substring match, case-insensitive) for
+        literal filters of 3+ characters; other regexes fall back to a REGEXP function. The
+        index costs most of the insert time, so SQLITE_FTS_ENABLED=false drops it (and
+        turning it back on rebuilds it from the logs table).
+      - SQL strings are fixed per query shape, so sqlite3's statement cache prepares each once.
+    IDs are client-side ObjectIds (stored as hex text), as in the MongoDB backend.
+    """
+
+    def __init__(self, config: Config):
+        self.config = config
+        self.path = config.SQLITE_PATH
+        self.log_buffer = None
+        self.network_flow_buffer = None
+        self._write_lock = threading.Lock()
+        # Reader connections: a bounded pool shared by all threads, so thread-per-request
+        # servers do not open (and keep) one connection per thread
+        self._readers: "queue.LifoQueue[sqlite3.Connection]" = queue.LifoQueue()
+        self._reader_count = 0
+        self._readers_lock = threading.Lock()
+        self._closed = False
+        self._writer = self._open_connection()
+        self._writer.executescript(SCHEMA)
+        self.fts_enabled = config.SQLITE_FTS_ENABLED
+        self._setup_fts()
+        print(f"Using SQLite storage at {self.path} (WAL mode).")
+        if config.WRITE_BEHIND_ENABLED:
+            self._start_write_behind()
+
+    def _open_connection(self) -> sqlite3.Connection:
+        connection = sqlite3.connect(self.path, timeout=30, check_same_thread=False, cached_statements=256)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL") # Durable at checkpoints; a crash loses at most the last commits
+        connection.execute("PRAGMA temp_store=MEMORY")
+        connection.execute(f"PRAGMA cache_size=-{self.config.SQLITE_CACHE_MB * 1024}")
+        connection.create_function("REGEXP", 2, _regexp, deterministic=True)
+        return connection
+
+    def _setup_fts(self):
+        if not self.fts_enabled:
+            self._writer.executescript(DROP_FTS)
+            return
+        had_index = self._writer.execute("SELECT 1 FROM sqlite_master WHERE name = 'logs_fts_insert'").fetchone()
+        self._writer.executescript(FTS_SCHEMA)
+        if not had_index: # New database, or logs were inserted while the index was off
+            with self._writer:
+                self._writer.execute("INSERT INTO logs_fts (logs_fts) VALUES ('rebuild')")
+
+    def _acquire_reader(self) -> sqlite3.Connection:
+        """An idle pooled reader; opens one while under SQLITE_READ_POOL_SIZE, else waits for one."""
+        try:
+            return self._readers.get_nowait()
+        except queue.Empty:
+            pass
+        with self._readers_lock:
+            if self._reader_count < self.config.SQLITE_READ_POOL_SIZE:
+                self._reader_count += 1
+                return self._open_connection()
+        return self._readers.get()
+
+    def _release_reader(self, connection: sqlite3.Connection):
+        if self._closed:
+            connection.close()
+        else:
+            self._readers.put(connection)
+
+    def _start_write_behind(self):
+        """Routes log and network flow inserts through the write-behind buffers, as in SiemDatabase."""
+        buffer_options = {
+            "capacity": self.config.WRITE_BEHIND_CAPACITY,
+            "batch_size": self.config.WRITE_BEHIND_BATCH_SIZE,
+            "max_age_ms": self.config.WRITE_BEHIND_MAX_AGE_MS,
+            "block_timeout_ms": self.config.WRITE_BEHIND_BLOCK_TIMEOUT_MS,
+        }
+        self.log_buffer = WriteBehindBuffer("logs", lambda entries: self._write_rows(INSERT_LOG, map(_log_row, entries)), **buffer_options)
+        self.network_flow_buffer = WriteBehindBuffer(
+            "network_flows", lambda entries: self._write_rows(INSERT_FLOW, map(_flow_row, entries)), **buffer_options
+        )
+        atexit.register(self.flush)
+
+    def _write_rows(self, sql: str, rows) -> int:
+        """executemany in one transaction. Returns the number of rows written (0 on error)."""
+        rows = list(rows)
+        try:
+            with self._write_lock, self._writer:
+                self._writer.executemany(sql, rows)
+            return len(rows)
+        except sqlite3.Error as e:
+            print(f"SQLite insert failed ({len(rows)} rows): {e}")
+            return 0
+
+    def _insert_entries(self, sql: str, row_of, entries: list, write_buffer: Optional[WriteBehindBuffer]) -> List[Optional[ObjectId]]:
+        for entry in entries:
+            if entry._id is None:
+                entry._id = ObjectId()
+        if write_buffer is not None:
+            accepted = write_buffer.put_many(entries)
+            for entry, was_accepted in zip(entries, accepted):
+                if not was_accepted:
+                    entry._id = None
+            return [entry._id for entry in entries]
+        if not self._write_rows(sql, map(row_of, entries)):
+            for entry in entries:
+                entry._id = None
+        return [entry._id for entry in entries]
+
+    def insert_log(self, log_entry: LogEntry) -> Optional[ObjectId]:
+        """Inserts a LogEntry. Returns its ID (None if the insert failed)."""
+        if not isinstance(log_entry, LogEntry):
+            raise TypeError("Expected a LogEntry object for insertion.")
+        return self._insert_entries(INSERT_LOG, _log_row, [log_entry], self.log_buffer)[0]
+
+    def insert_logs(self, log_entries: List[LogEntry]) -> List[Optional[ObjectId]]:
+        """Inserts a batch of LogEntry objects in one transaction. Returns their IDs in order."""
+        if not log_entries:
+            return []
+        for log_entry in log_entries:
+            if not isinstance(log_entry, LogEntry):
+                raise TypeError("Expected a list of LogEntry objects for insertion.")
+        return self._insert_entries(INSERT_LOG, _log_row, log_entries, self.log_buffer)
+
+    def insert_alert(self, alert_entry: Alert) -> Optional[ObjectId]:
+        """Inserts an Alert (always synchronously). Returns its ID (None if the insert failed)."""
+        if not isinstance(alert_entry, Alert):
+            raise TypeError("Expected an Alert object for insertion.")
+        return self._insert_entries(INSERT_ALERT, _alert_row, [alert_entry], None)[0]
+
+    def insert_network_flow(self, flow_entry: NetworkFlowEntry) -> Optional[ObjectId]:
+        """Inserts a NetworkFlowEntry. Returns its ID (None if the insert failed)."""
+        if not isinstance(flow_entry, NetworkFlowEntry):
+            raise TypeError("Expected a NetworkFlowEntry object for insertion.")
+        return self._insert_entries(INSERT_FLOW, _flow_row, [flow_entry], self.network_flow_buffer)[0]
+
+    def _select(self, sql: str, params: list) -> List[tuple]:
+        connection = self._acquire_reader()
+        try:
+            return connection.execute(sql, params).fetchall()
+        except sqlite3.Error as e:
+            print(f"SQLite query failed: {e}")
+            return []
+        finally:
+            self._release_reader(connection)
+
+    def get_logs_by_criteria(self, query: Dict[str, Any], limit: int = 100) -> List[LogEntry]:
+        """
+        Retrieves logs matching a MongoDB-style query (field equality, timestamp $gte/$gt/$lt/$lte,
+        message $regex with $options "i"), newest first.
+        """
+        clauses, params = [], []
+        for key, value in query.items():
+            if key == "timestamp":
+                for operator, sql in (("$gte", ">="), ("$gt", ">"), ("$lt", "<"), ("$lte", "<=")):
+                    if operator in value:
+                        clauses.append(f"ts {sql} ?")
+                        params.append(_to_us(value[operator]))
+            elif key == "message" and "$regex" in value:
+                pattern = value["$regex"]
+                ignore_case = "i" in value.get("$options", "")
+                if self.fts_enabled and len(pattern) >= 3 and not _REGEX_SPECIAL.intersection(pattern):
+                    # Literal substring: trigram FTS lookup (case-insensitive)
+                    clauses.append("seq IN (SELECT rowid FROM logs_fts WHERE logs_fts MATCH ?)")
+                    params.append('"' + pattern.replace('"', '""') + '"')
+                    if ignore_case:
+                        continue
+                clauses.append("message REGEXP ?")
+                params.append(("(?i)" if ignore_case else "") + pattern)
+            elif key in LOG_COLUMNS and key not in ("id", "ts"):
+                clauses.append(f"{key} IS ?")
+                params.append(value)
+            elif key == "_id":
+                clauses.append("id = ?")
+                params.append(str(value))
+            else:
+                return [] # No such field: nothing can equal the value
+        where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+        rows = self._select(f"{SELECT_LOGS}{where} ORDER BY ts DESC LIMIT ?", params + [limit])
+        return [LogEntry.from_dict(_log_document(row)) for row in rows]
+
+    def iter_log_batches(self, start: datetime, end: datetime, batch_size: int = 5000,
+                         resume_after: Optional[Tuple[datetime, ObjectId]] = None) -> Iterator[List[Dict[str, Any]]]:
+        """
+        Streams raw log documents with start <= timestamp < end in (timestamp, _id) order,
+        batch_size at a time, by keyset pagination on the (ts, id) index.
+        """
+        last_ts, last_id = (_to_us(resume_after[0]), str(resume_after[1])) if resume_after else (_to_us(start) - 1, "")
+        start_us, end_us = _to_us(start), _to_us(end)
+        while True:
+            rows = self._select(LOG_BATCH_AFTER, [start_us, end_us, last_ts, last_id, batch_size])
+            if not rows:
+                return
+            yield [_log_document(row) for row in rows]
+            last_ts, last_id = rows[-1][1], rows[-1][0]
+
+    def insert_hunt_results(self, documents: List[Dict[str, Any]]) -> int:
+        """Writes retro-hunt hits to the hunt_results table. Returns the number written."""
+        if not documents:
+            return 0
+        return self._write_rows(INSERT_HUNT_RESULT, (
+            (document.get("hunt_id"), document.get("rule_name"), _to_us(document.get("timestamp")),
+             json.dumps(document, default=str))
+            for document in documents
+        ))
+
+    def get_recent_logs(self, limit: int = 20) -> List[LogEntry]:
+        """Retrieves the most recent logs."""
+        rows = self._select(f"{SELECT_LOGS} ORDER BY ts DESC LIMIT ?", [limit])
+        return [LogEntry.from_dict(_log_document(row)) for row in rows]
+
+    def get_open_alerts(self, severity: Optional[str] = None) -> List[Alert]:
+        """Retrieves open alerts, optionally filtered by severity."""
+        if severity:
+            rows = self._select(f"{SELECT_ALERTS} WHERE status = ? AND severity = ? ORDER BY ts DESC", ["Open", severity])
+        else:
+            rows = self._select(f"{SELECT_ALERTS} WHERE status = ? ORDER BY ts DESC", ["Open"])
+        return [_alert_from_row(row) for row in rows]
+
+    def get_all_alerts(self) -> List[Alert]:
+        """Retrieves all alerts."""
+        return [_alert_from_row(row) for row in self._select(f"{SELECT_ALERTS} ORDER BY ts DESC", [])]
+
+    def get_recent_network_flows(self, limit: int = 20) -> List[NetworkFlowEntry]:
+        """Retrieves recent network flow entries."""
+        return [_flow_from_row(row) for row in self._select(f"{SELECT_FLOWS} ORDER BY ts DESC LIMIT ?", [limit])]
+
+    def filter_logs(self, filter_text: str = '', source: str = 'All Sources', level: str = 'All Levels', limit: int = 100) -> List[LogEntry]:
+        """Filters logs based on text, source, and level."""
+        query = {}
+        if filter_text:
+            query["message"] = {"$regex": filter_text, "$options": "i"}
+        if source != 'All Sources':
+            query["source"] = source
+        if level != 'All Levels':
+            query["level"] = level
+        return self.get_logs_by_criteria(query, limit)
+
+    def update_alert_status(self, alert_id: str, new_status: str) -> bool:
+        """Updates the status of an alert by its ID."""
+        try:
+            with self._write_lock, self._writer:
+                cursor = self._writer.execute(UPDATE_ALERT_STATUS, (new_status, _to_us(datetime.now()), str(alert_id)))
+            return cursor.rowcount > 0
+        except sqlite3.Error as e:
+            print(f"Error updating alert status: {e}")
+            return False
+
+    def update_alert_occurrences(self, updates: List[tuple], last_seen: datetime, max_log_ids: int) -> int:
+        """
+        Folds repeat hits into existing alerts (occurrence_count += count, log_ids keeps the
+        newest max_log_ids, last_seen), all in one transaction. Returns the number updated.
+        """
+        updated = 0
+        try:
+            with self._write_lock, self._writer:
+                for alert_id, count, log_ids in updates:
+                    row = self._writer.execute(SELECT_ALERT_OCCURRENCES, (str(alert_id),)).fetchone()
+                    if row is None:
+                        continue
+                    merged = (json.loads(row[1] or "[]") + log_ids)[-max_log_ids:]
+                    self._writer.execute(UPDATE_ALERT_OCCURRENCES, ((row[0] or 1) + count, json.dumps(merged),
+                                                                     _to_us(last_seen), str(alert_id)))
+                    updated += 1
+        except sqlite3.Error as e:
+            print(f"Error updating deduplicated alerts: {e}")
+            return 0
+        return updated
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Blocks until all buffered (write-behind) inserts have been written. No-op otherwise."""
+        flushed = True
+        for write_buffer in (self.log_buffer, self.network_flow_buffer):
+            if write_buffer is not None:
+                flushed = write_buffer.flush(timeout) and flushed
+        return flushed
+
+    def get_spill_queue_stats(self) -> Optional[Dict[str, Any]]:
+        return None # Writes are local: nothing to spill
+
+    def get_memory_store_stats(self) -> Optional[Dict[str, Any]]:
+        return None
+
+    def get_partition_stats(self) -> Optional[Dict[str, Any]]:
+        return None # Not partitioned
+
+    def get_write_buffer_stats(self) -> Dict[str, Any]:
+        """Returns depth and backpressure counters for each write-behind buffer (empty when disabled)."""
+        return {
+            write_buffer.name: write_buffer.get_stats()
+            for write_buffer in (self.log_buffer, self.network_flow_buffer)
+            if write_buffer is not None
+        }
+
+    def close(self):
+        """Flushes any write-behind buffers, checkpoints the WAL and closes every connection."""
+        for write_buffer in (self.log_buffer, self.network_flow_buffer):
+            if write_buffer is not None:
+                write_buffer.close()
+        with self._write_lock:
+            try:
+                self._writer.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+            except sqlite3.Error as e:
+                print(f"SQLite WAL checkpoint failed: {e}")
+        self._closed = True
+        self._writer.close()
+        while True: # Idle readers now; busy ones are closed when they are released
+            try:
+                self._readers.get_nowait().close()
+            except queue.Empty:
+                break
@@ -0,0 +1,149 @@
+# backend/database/write_buffer.py
+
+import threading
+import time
+from collections import deque
+from typing import Callable, List, Dict, Any, Optional
+
+
+class WriteBehindBuffer:
+    """
+    Bounded in-memory buffer that decouples callers from database latency.
+    put() only appends to a deque; a background flusher thread hands batches to
+    write_batch (typically an unordered insert_many) whenever batch_size documents
+    are waiting or the oldest one has waited max_age_ms.
+    When the buffer is full, put() blocks for up to block_timeout_ms (backpressure)
+    and then drops the document, counting both events.
+    """
+
+    def __init__(self, name: str, write_batch: Callable[[List[Dict[str, Any]]], int], capacity: int = 50000,
+                 batch_size: int = 500, max_age_ms: int = 100, block_timeout_ms: int = 1000):
+        self.name = name
+        self.write_batch = write_batch # Returns the number of documents actually written
+        self.capacity = capacity
+        self.batch_size = batch_size
+        self.max_age = max_age_ms / 1000.0
+        self.block_timeout = block_timeout_ms / 1000.0
+
+        self._pending = deque() # (enqueued_at, document) pairs in arrival order
+        self._lock = threading.Lock()
+        self._not_empty = threading.Condition(self._lock)
+        self._not_full = threading.Condition(self._lock)
+        self._flushed = threading.Condition(self._lock)
+        self._enqueued_seq = 0 # Documents ever accepted
+        self._completed_seq = 0 # Documents handed to write_batch (written or failed)
+        self._flush_requested = False
+        self._closed = False
+
+        self.stats: Dict[str, int] = {
+            "enqueued": 0,
+            "written": 0,
+            "write_failures": 0,
+            "batches": 0,
+            "backpressure_waits": 0,
+            "dropped": 0,
+            "max_depth": 0,
+        }
+
+        self._thread = threading.Thread(target=self._run, name=f"write-behind-{name}", daemon=True)
+        self._thread.start()
+
+    def put(self, document: Dict[str, Any]) -> bool:
+        """Queues one document. Returns False if it was dropped because the buffer stayed full."""
+        return self.put_many([document])[0]
+
+    def put_many(self, documents: List[Dict[str, Any]]) -> List[bool]:
+        """Queues documents in order. Returns one flag per document: False where it was dropped."""
+        accepted = []
+        with self._lock:
+            if self._closed:
+                raise RuntimeError(f"Write-behind buffer '{self.name}' is closed.")
+            for document in documents:
+                if len(self._pending) >= self.capacity:
+                    self.stats["backpressure_waits"] += 1
+                    self._not_empty.notify() # Make sure the flusher is draining
+                    deadline = time.monotonic() + self.block_timeout
+                    while len(self._pending) >= self.capacity and not self._closed:
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            break
+                        self._not_full.wait(remaining)
+                    if len(self._pending) >= self.capacity:
+                        self.stats["dropped"] += 1
+                        accepted.append(False)
+                        continue
+                self._pending.append((time.monotonic(), document))
+                self._enqueued_seq += 1
+                self.stats["enqueued"] += 1
+                accepted.append(True)
+                if len(self._pending) > self.stats["max_depth"]:
+                    self.stats["max_depth"] = len(self._pending)
+            if len(self._pending) >= self.batch_size:
+                self._not_empty.notify()
+        return accepted
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Blocks until everything queued before this call has been handed to the database."""
+        with self._lock:
+            target = self._enqueued_seq
+            self._flush_requested = True
+            self._not_empty.notify()
+            return self._flushed.wait_for(lambda: self._completed_seq >= target, timeout)
+
+    def close(self, timeout: Optional[float] = None):
+        """Flushes what is left and stops the flusher thread."""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._not_empty.notify()
+            self._not_full.notify_all()
+        self._thread.join(timeout)
+
+    def depth(self) -> int:
+        return len(self._pending)
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self.stats)
+            stats["depth"] = len(self._pending)
+            stats["capacity"] = self.capacity
+        return stats
+
+    def _next_batch(self) -> Optional[List[Dict[str, Any]]]:
+        """Waits for a size/age/flush trigger and pops one batch. Returns None when closed and drained."""
+        with self._lock:
+            while True:
+                if self._pending:
+                    age = time.monotonic() - self._pending[0][0]
+                    if len(self._pending) >= self.batch_size or age >= self.max_age or self._flush_requested or self._closed:
+                        break
+                    self._not_empty.wait(self.max_age - age)
+                elif self._closed:
+                    return None
+                else:
+                    self._flush_requested = False
+                    self._not_empty.wait()
+            count = min(self.batch_size, len(self._pending))
+            batch = [self._pending.popleft()[1] for _ in range(count)]
+            if not self._pending:
+                self._flush_requested = False
+            self._not_full.notify_all()
+            return batch
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            if batch is None:
+                return
+            try:
+                written = self.write_batch(batch)
+            except Exception as e:
+                print(f"ERROR: Write-behind buffer '{self.name}' failed to write a batch of {len(batch)}: {e}")
+                written = 0
+            with self._lock:
+                self.stats["batches"] += 1
+                self.stats["written"] += written
+                self.stats["write_failures"] += len(batch) - written
+                self._completed_seq += len(batch)
+                self._flushed.notify_all()
@@ -0,0 +1,85 @@
+# backend/test_alert_suppression.py
+
+import threading
+import time
+import unittest
+
+from backend.core.alert_suppression import AlertSuppressor
+
+KEY = ("Multiple Failed Logins", "host-a", "10.0.0.1")
+
+
+class RecordingDatabase:
+    """Stands in for SiemDatabase: records the per-alert occurrence updates."""
+
+    def __init__(self):
+        self.updates = []
+
+    def update_alert_occurrences(self, updates, now, max_log_ids):
+        self.updates.extend(updates)
+        return len(updates)
+
+
+class AlertSuppressorTest(unittest.TestCase):
+    def setUp(self):
+        self.db = RecordingDatabase()
+        self.suppressor = AlertSuppressor(self.db, ttl_seconds=60, flush_interval_seconds=3600)
+
+    def tearDown(self):
+        self.suppressor.close()
+
+    def test_duplicate_inside_ttl_is_suppressed_and_counted(self):
+        self.assertFalse(self.suppressor.suppress(KEY, ["log-1"]))
+        self.suppressor.remember(KEY, "alert-1")
+        self.assertTrue(self.suppressor.suppress(KEY, ["log-2"]))
+        self.assertTrue(self.suppressor.suppress(KEY, ["log-3"]))
+        self.assertEqual(self.suppressor.flush(), 1)
+        self.assertEqual(self.db.updates, [("alert-1", 2, ["log-2", "log-3"])])
+
+    def test_key_expires_after_ttl(self):
+        suppressor = AlertSuppressor(self.db, ttl_seconds=0.05, flush_interval_seconds=3600)
+        try:
+            self.assertFalse(suppressor.suppress(KEY, ["log-1"]))
+            suppressor.remember(KEY, "alert-1")
+            time.sleep(0.1)
+            self.assertFalse(suppressor.suppress(KEY, ["log-2"]))
+            self.assertEqual(suppressor.get_stats()["expired"], 1)
+        finally:
+            suppressor.close()
+
+    def test_release_alert_rearms_the_key(self):
+        self.assertFalse(self.suppressor.suppress(KEY, ["log-1"]))
+        self.suppressor.remember(KEY, "alert-1")
+        self.suppressor.release_alert("alert-1")
+        self.assertFalse(self.suppressor.suppress(KEY, ["log-2"]))
+
+    def test_forget_drops_the_reservation(self):
+        self.assertFalse(self.suppressor.suppress(KEY, ["log-1"]))
+        self.assertTrue(self.suppressor.suppress(KEY, ["log-2"])) # Held against the reservation
+        self.suppressor.forget(KEY) # The alert insert failed
+        self.assertEqual(self.suppressor.flush(), 0)
+        self.assertFalse(self.suppressor.suppress(KEY, ["log-3"]))
+
+    def test_concurrent_hits_on_one_key_create_one_alert(self):
+        created = []
+        start = threading.Barrier(8)
+
+        def worker(index):
+            start.wait()
+            if not self.suppressor.suppress(KEY, [f"log-{index}"]):
+                time.sleep(0.05) # The alert insert
+                created.append(index)
+                self.suppressor.remember(KEY, "alert-1")
+
+        threads = [threading.Thread(target=worker, args=(index,)) for index in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(created), 1)
+        self.suppressor.flush()
+        self.assertEqual([(alert_id, count) for alert_id, count, _ in self.db.updates], [("alert-1", 7)])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,70 @@
+# backend/test_correlation.py
+
+import unittest
+from datetime import datetime, timedelta
+
+from bson import ObjectId
+
+from backend.core.correlation import ThresholdCorrelator
+from backend.database.models import LogEntry
+
+START = datetime(2026, 6, 17, 10, 0, 0)
+RULE = {
+    "name": "Multiple Failed Logins",
+    "threshold_count": 3,
+    "threshold_time_window_minutes": 5,
+    "group_by": ["source_ip_host", "host"],
+}
+
+
+def failed_login(minutes: float, source_ip_host: str = "10.0.0.1", host: str = "host-a") -> LogEntry:
+    return LogEntry(timestamp=START + timedelta(minutes=minutes), host=host, source="Authentication",
+                    level="AUTH_FAILED", message="Failed password", source_ip_host=source_ip_host, _id=ObjectId())
+
+
+class ThresholdCorrelatorTest(unittest.TestCase):
+    def setUp(self):
+        self.correlator = ThresholdCorrelator()
+
+    def observe_all(self, logs):
+        return [self.correlator.observe(RULE, log) for log in logs]
+
+    def test_fires_at_exactly_the_threshold_within_the_window(self):
+        logs = [failed_login(0), failed_login(2), failed_login(5)] # Last one exactly at the window's edge
+        fired = self.observe_all(logs)
+        self.assertEqual(fired[:2], [None, None])
+        self.assertEqual(fired[2], [str(log._id) for log in logs])
+
+    def test_does_not_fire_when_the_span_exceeds_the_window(self):
+        self.assertEqual(self.observe_all([failed_login(0), failed_login(2), failed_login(5.5)]), [None, None, None])
+        # The oldest event slides out: the next one completes a window of the last three
+        self.assertIsNotNone(self.correlator.observe(RULE, failed_login(6)))
+
+    def test_window_is_cleared_after_firing(self):
+        fired = self.observe_all([failed_login(minute) for minute in range(6)])
+        self.assertEqual([result is not None for result in fired], [False, False, True, False, False, True])
+        self.assertEqual(self.correlator.get_stats()["fired"], 2)
+
+    def test_group_by_keys_are_counted_separately(self):
+        logs = [failed_login(0, "10.0.0.1"), failed_login(1, "10.0.0.2"), failed_login(2, "10.0.0.1", "host-b"),
+                failed_login(3, "10.0.0.1"), failed_login(4, "10.0.0.2")]
+        self.assertEqual(self.observe_all(logs), [None] * 5)
+        self.assertIsNotNone(self.correlator.observe(RULE, failed_login(4.5, "10.0.0.1")))
+        self.assertEqual(self.correlator.get_stats()["keys"], 3)
+
+    def test_least_recently_seen_key_is_evicted_beyond_max_keys(self):
+        correlator = ThresholdCorrelator(max_keys=2)
+        correlator.observe(RULE, failed_login(0, "10.0.0.1"))
+        correlator.observe(RULE, failed_login(0, "10.0.0.2"))
+        correlator.observe(RULE, failed_login(1, "10.0.0.1")) # 10.0.0.2 is now least recently seen
+        correlator.observe(RULE, failed_login(1, "10.0.0.3"))
+        stats = correlator.get_stats()
+        self.assertEqual((stats["keys"], stats["evicted_overflow"]), (2, 1))
+        # 10.0.0.1 kept its two events; 10.0.0.2 starts over
+        self.assertIsNotNone(correlator.observe(RULE, failed_login(2, "10.0.0.1")))
+        self.assertIsNone(correlator.observe(RULE, failed_login(2, "10.0.0.2")))
+        self.assertIsNone(correlator.observe(RULE, failed_login(3, "10.0.0.2")))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,60 @@
+# backend/test_log_parser.py
+
+import json
+import os
+import unittest
+
+from backend.core.log_parser import LogParser
+
+# Lines with the fields the pre-unification parser produced for them (timestamps aside:
+# header timestamps carry no year, and headerless lines are stamped with the current time)
+GOLDEN_CORPUS = os.path.join(os.path.dirname(__file__), "test_data", "log_parser_golden.jsonl")
+GOLDEN_FIELDS = ("host", "source", "level", "message", "source_ip_host", "destination_ip_host")
+
+CEF_BEHIND_BSD = "Jun 17 10:00:00 fw01 CEF:0|Vendor|Firewall|1.0|100|Blocked|8|src=10.0.0.1 msg=blocked"
+PLAIN_BSD = "Jun 17 09:59:00 fw01 sshd[123]: [AUTH] Failed password for root from 10.0.0.2 port 22"
+LEEF_BAD_HEX_DELIMITER = "LEEF:2.0|V|P|1|E|xZ|a=b"
+LEEF_OUT_OF_RANGE_DELIMITER = "LEEF:2.0|V|P|1|E|x110000|a=b"
+
+
+class GoldenCorpusTest(unittest.TestCase):
+    def test_parse_log_line_matches_golden_corpus(self):
+        parser = LogParser()
+        with open(GOLDEN_CORPUS) as f:
+            cases = [json.loads(line) for line in f if line.strip()]
+        self.assertTrue(cases)
+        for case in cases:
+            entry = parser.parse_log_line(case["raw_log"])
+            for field in GOLDEN_FIELDS:
+                self.assertEqual(getattr(entry, field), case[field], f"{field} of {case['raw_log']!r}")
+            self.assertEqual(entry.raw_log, case["raw_log"])
+
+
+class FormatByOriginTest(unittest.TestCase):
+    def test_cached_bsd_format_does_not_take_cef_lines(self):
+        expected = LogParser().parse_log_entry(CEF_BEHIND_BSD)
+        parser = LogParser()
+        parser.parse_log_entry(PLAIN_BSD, origin="10.0.0.254") # Caches BSD syslog for this origin
+        parsed = parser.parse_log_entry(CEF_BEHIND_BSD, origin="10.0.0.254")
+        for field in ("source", "level", "message", "source_ip_host"):
+            self.assertEqual(parsed[field], expected[field], field)
+        self.assertEqual(parsed["message"], "blocked")
+
+    def test_cached_format_still_used_for_its_own_lines(self):
+        parser = LogParser()
+        first = parser.parse_log_entry(PLAIN_BSD, origin="10.0.0.254")
+        second = parser.parse_log_entry(PLAIN_BSD, origin="10.0.0.254")
+        self.assertEqual(first["source"], "Authentication")
+        self.assertEqual(second["level"], first["level"])
+
+
+class MalformedHeaderTest(unittest.TestCase):
+    def test_invalid_leef_delimiters_do_not_raise(self):
+        parser = LogParser()
+        for line in (LEEF_BAD_HEX_DELIMITER, LEEF_OUT_OF_RANGE_DELIMITER):
+            entry = parser.parse_log_line(line)
+            self.assertEqual(entry.raw_log, line)
+
+
+if __name__ == "__main__":
+    unittest.main()
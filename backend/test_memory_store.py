@@ -0,0 +1,75 @@
+# backend/test_memory_store.py
+
+import unittest
+from datetime import datetime, timedelta
+
+from bson import ObjectId
+
+from backend.database.memory_store import MemoryCollection
+from backend.database.models import LogEntry
+
+START = datetime(2026, 6, 17, 10, 0, 0)
+
+
+def log_entry(seconds: float, source: str = "Authentication", level: str = "INFO", host: str = "host-a") -> LogEntry:
+    return LogEntry(timestamp=START + timedelta(seconds=seconds), host=host, source=source, level=level,
+                    message=f"event at {seconds}", _id=ObjectId())
+
+
+class MemoryCollectionTest(unittest.TestCase):
+    def setUp(self):
+        self.collection = MemoryCollection("logs", ("source", "level", "host"))
+
+    def test_find_is_newest_first_with_insert_order_breaking_timestamp_ties(self):
+        same_time = [log_entry(10) for _ in range(3)]
+        late = log_entry(5)
+        self.collection.insert_many([log_entry(0)] + same_time + [late])
+        found = self.collection.find(limit=4)
+        self.assertEqual([record._id for record in found], [record._id for record in reversed(same_time)] + [late._id])
+        self.assertEqual(len(self.collection.find(limit=2)), 2)
+        self.assertEqual([record.timestamp for record in self.collection.find(start=START + timedelta(seconds=5),
+                                                                              end=START + timedelta(seconds=10))],
+                         [START + timedelta(seconds=5)])
+
+    def test_find_intersects_indexed_fields(self):
+        records = [
+            log_entry(0, "Authentication", "AUTH_FAILED", "host-a"),
+            log_entry(1, "Authentication", "INFO", "host-a"),
+            log_entry(2, "Web Server", "AUTH_FAILED", "host-a"),
+            log_entry(3, "Authentication", "AUTH_FAILED", "host-b"),
+            log_entry(4, "Authentication", "AUTH_FAILED", "host-a"),
+        ]
+        self.collection.insert_many(records)
+        found = self.collection.find({"source": "Authentication", "level": "AUTH_FAILED", "host": "host-a"})
+        self.assertEqual([record._id for record in found], [records[4]._id, records[0]._id])
+        self.assertEqual(self.collection.find({"source": "Authentication", "level": "WARN"}), [])
+        # Non-indexed fields are still checked on every candidate
+        self.assertEqual(self.collection.find({"level": "AUTH_FAILED", "message": "event at 3"})[0]._id, records[3]._id)
+
+    def test_id_lookup_after_eviction(self):
+        collection = MemoryCollection("logs", ("level",), capacity=10)
+        records = [log_entry(second) for second in range(11)] # The 11th insert evicts the oldest 2
+        collection.insert_many(records)
+        self.assertIsNone(collection.get(records[0]._id))
+        self.assertIsNone(collection.get(str(records[1]._id)))
+        self.assertIs(collection.get(str(records[2]._id)), records[2])
+        self.assertIsNone(collection.update(records[0]._id, {"level": "WARN"}))
+        self.assertEqual(collection.update(records[5]._id, {"level": "WARN"}).level, "WARN")
+        self.assertEqual([record._id for record in collection.find({"level": "WARN"})], [records[5]._id])
+
+    def test_eviction_keeps_the_collection_within_capacity(self):
+        collection = MemoryCollection("logs", ("level", "host"), capacity=100)
+        for second in range(1000):
+            collection.insert(log_entry(second, level=("INFO", "WARN")[second % 2], host=f"host-{second % 7}"))
+            self.assertLessEqual(len(collection), 100)
+        stats = collection.get_stats()
+        self.assertEqual(stats["evicted"], 1000 - stats["records"])
+        oldest = collection.find()[-1].timestamp
+        self.assertEqual(collection.find(), collection.find(start=oldest))
+        # Index postings only reference live records
+        self.assertEqual(sum(len(collection.find({"level": level})) for level in ("INFO", "WARN")), len(collection))
+        self.assertEqual(sum(len(collection.find({"host": f"host-{i}"})) for i in range(7)), len(collection))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,294 @@
+# scripts/benchmark.py
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+# Add the project root to the Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from backend.config import Config
+from backend.core.keyword_matcher import KeywordRuleSet
+from backend.core.log_parser import LogParser, MESSAGE_SOURCE_RULES, CONTENT_REFINEMENT_RULES
+from backend.core.parallel_parser import ParallelLogParser
+from backend.core.detection_rules import DetectionRules
+from backend.core.timestamp_decoder import SyslogTimestampDecoder
+from backend.core.threat_intel import IndicatorIndex, ThreatIntel
+from backend.core.rate_anomaly import RateAnomalyDetector
+from backend.database.db_client import open_database
+from backend.database.models import Alert, LogEntry
+
+# Representative lines (same shapes as the API's mock data) used to build synthetic corpora.
+SAMPLE_LOGS = [
+    "Jun 17 10:00:01 host-a kernel: [INFO] System boot successful.",
+    "Jun 17 10:00:05 host-b sshd[123]: [AUTH] Failed password for user flask_test from 192.168.1.10.",
+    "Jun 17 10:00:15 web-server-01 apache: [WARN] High CPU usage (85%).",
+    "Jun 17 10:00:20 db-server-01 postgres: [ERROR] Database connection pool exhausted.",
+    "Jun 17 10:00:25 firewall-01 firewall: [INFO] Policy update applied.",
+    "Jun 17 10:00:30 critical-db app: [CRITICAL] Unauthorized data export attempt detected from 10.0.0.5 to external_server.",
+    "Jun 17 10:00:35 backup-srv: [INFO] Daily backup initiated for critical_data_volume.",
+    "Jun 17 10:00:40 log-server-01 disk: [WARN] Low disk space on /var/log (90% full).",
+    "Jun 17 10:00:45 endpoint-sec-03 av: [INFO] Anti-virus definitions updated to latest version.",
+    "Jun 17 10:00:50 hr-laptop-03 endpoint: [ALERT] Ransomware activity detected and blocked on C:\\HR_Docs\\.",
+    "Jun 17 10:01:00 router-core-01 network: [INFO] New routing table deployed.",
+    "Jun 17 10:01:10 web-server-02 cert-monitor: [WARN] SSL certificate 'www.example.com' expires in 10 days.",
+    "Jun 17 10:01:20 db-dev-02 netflow: [ALERT] Suspicious high volume outbound connections to 172.16.20.100.",
+]
+
+
+def build_corpus(count: int, seed: int = 42) -> list:
+    """Synthetic syslog lines: sample shapes with varied hosts, IPs and per-second timestamps."""
+    rng = random.Random(seed)
+    lines = []
+    second = 0
+    for i in range(count):
+        if rng.random() < 0.05: # Consecutive lines mostly share the same second
+            second += 1
+        template = SAMPLE_LOGS[i % len(SAMPLE_LOGS)]
+        line = f"Jun 17 {10 + second // 3600 % 14:02d}:{second // 60 % 60:02d}:{second % 60:02d}" + template[15:]
+        lines.append(line.replace("192.168.1.10", f"192.168.{rng.randint(0, 255)}.{rng.randint(1, 254)}"))
+    return lines
+
+
+def report(name: str, count: int, elapsed: float, unit: str = "lines"):
+    print(f"{name:<40} {count:>9} {unit} in {elapsed:7.3f}s  {count / elapsed:>12,.0f} {unit}/sec")
+
+
+def bench_parser(args):
+    """Parser throughput (parse_log_line, i.e. what the API and syslog listener call)."""
+    lines = build_corpus(args.lines)
+    parser = LogParser()
+    for line in lines[:1000]: # Warm up
+        parser.parse_log_line(line)
+    start = time.perf_counter()
+    for line in lines:
+        parser.parse_log_line(line)
+    report("LogParser.parse_log_line", len(lines), time.perf_counter() - start)
+
+    # With an origin (as the listener and API pass) the detected format is cached per sender
+    start = time.perf_counter()
+    for line in lines:
+        parser.parse_log_line(line, origin="10.0.0.1")
+    report("LogParser.parse_log_line (origin)", len(lines), time.perf_counter() - start)
+
+
+def bench_classify(args):
+    """Message classification cost as vendor keywords are added: one compiled scan vs a substring test per keyword."""
+    messages = [line.split(': ', 1)[-1].lower() for line in build_corpus(args.lines)]
+    rng = random.Random(7)
+    for extra in (0, 100, 500):
+        # Synthetic vendor keywords that (like most real ones) do not occur in the corpus
+        vendor_rows = [((f"vendor{i} {''.join(rng.choice('bcdfghjklmnpqrstvwxz') for _ in range(6))}",), f"Vendor {i}") for i in range(extra)]
+        source_rules = MESSAGE_SOURCE_RULES + vendor_rows
+        rule_set = KeywordRuleSet({'source': source_rules, 'refine': CONTENT_REFINEMENT_RULES})
+        linear_rows = [(keywords, payload) for rows in (source_rules, CONTENT_REFINEMENT_RULES) for keywords, payload in rows]
+
+        start = time.perf_counter()
+        for message in messages:
+            rule_set.scan(message)
+        report(f"KeywordRuleSet.scan (+{extra} keywords)", len(messages), time.perf_counter() - start)
+
+        start = time.perf_counter()
+        for message in messages:
+            [payload for keywords, payload in linear_rows if any(keyword in message for keyword in keywords)]
+        report(f"linear substring tests (+{extra} keywords)", len(messages), time.perf_counter() - start)
+
+
+def bench_parallel(args):
+    """Parse throughput with a process pool (ParallelLogParser.iter_parse) for 1..cpu_count workers."""
+    lines = build_corpus(args.lines)
+    worker_counts = sorted({1, 2, 4, 8, os.cpu_count() or 1})
+    for workers in [count for count in worker_counts if count <= (os.cpu_count() or 1)]:
+        parallel_parser = ParallelLogParser(workers=workers)
+        list(parallel_parser.iter_parse(lines[:workers * parallel_parser.chunk_lines])) # Warm up the pool
+        start = time.perf_counter()
+        parsed = sum(1 for _ in parallel_parser.iter_parse(lines))
+        report(f"ParallelLogParser ({workers} workers)", parsed, time.perf_counter() - start)
+        parallel_parser.close()
+
+
+def bench_rules(args):
+    """Rule matching cost per log as rules are added: (level, source) dispatch index vs evaluating every rule."""
+    parser = LogParser()
+    log_entries = [parser.parse_log_line(line) for line in build_corpus(args.lines // 4)]
+    levels = ["INFO", "WARN", "ERROR", "CRITICAL", "ALERT", "AUTH_FAILED"]
+    rng = random.Random(11)
+    for extra in (0, 100, 500):
+        rules_engine = DetectionRules(None, Config())
+        # Synthetic vendor rules: each pins a level and a vendor source, plus a message keyword
+        rules = rules_engine.rules + [
+            {"name": f"Vendor rule {i}", "match": {"level": rng.choice(levels), "source": f"Vendor {i % 50}"},
+             "message_contains": [f"vendor event {i}"], "severity": "Low", "alert_immediately": True}
+            for i in range(extra)
+        ]
+        rules_engine.set_rules(rules)
+
+        start = time.perf_counter()
+        for log_entry in log_entries:
+            rules_engine.matching_rules(log_entry)
+        report(f"indexed dispatch ({len(rules)} rules)", len(log_entries), time.perf_counter() - start, "logs")
+
+        # The previous approach: one lambda per rule, each lowercasing the message itself
+        def as_lambda(rule):
+            match, substrings = rule.get("match", {}), rule.get("message_contains", [])
+            return lambda log: all(getattr(log, field) == value for field, value in match.items()) and \
+                all(substring in log.message.lower() for substring in substrings)
+        conditions = [as_lambda(rule) for rule in rules]
+        start = time.perf_counter()
+        for log_entry in log_entries:
+            [condition for condition in conditions if condition(log_entry)]
+        report(f"every rule per log ({len(rules)} rules)", len(log_entries), time.perf_counter() - start, "logs")
+
+
+def bench_timestamps(args):
+    """Header timestamp decoding: memoized SyslogTimestampDecoder vs the strptime call it replaced."""
+    headers = [(line[0:3], line[4:6].strip(), line[7:15]) for line in build_corpus(args.lines)]
+    year = datetime.now().year
+
+    start = time.perf_counter()
+    for month, day, time_str in headers:
+        datetime.strptime(f"{month} {day} {time_str} {year}", "%b %d %H:%M:%S %Y")
+    report("datetime.strptime", len(headers), time.perf_counter() - start)
+
+    decoder = SyslogTimestampDecoder()
+    start = time.perf_counter()
+    for month, day, time_str in headers:
+        decoder.decode(month, day, time_str)
+    report("SyslogTimestampDecoder.decode", len(headers), time.perf_counter() - start)
+
+    # Worst case for the memo: every line has a different second
+    unique = [("Jun", str(1 + i // 86400 % 28), f"{i // 3600 % 24:02d}:{i // 60 % 60:02d}:{i % 60:02d}") for i in range(len(headers))]
+    decoder = SyslogTimestampDecoder()
+    start = time.perf_counter()
+    for month, day, time_str in unique:
+        decoder.decode(month, day, time_str)
+    report("SyslogTimestampDecoder.decode (no reuse)", len(unique), time.perf_counter() - start)
+
+
+def bench_threat_intel(args):
+    """IoC lookups per value against 300k synthetic IPs/CIDRs: Bloom prefilter + CIDR trie, misses and hits."""
+    rng = random.Random(13)
+    index = IndicatorIndex()
+    listed = []
+    for i in range(300000):
+        address = f"{rng.randint(11, 99)}.{rng.randint(0, 255)}.{rng.randint(0, 255)}.{rng.randint(1, 254)}"
+        if i % 10 == 0:
+            index.add(f"{address.rsplit('.', 1)[0]}.0/24", "synthetic")
+        else:
+            index.add(address, "synthetic")
+            listed.append(address)
+    start = time.perf_counter()
+    index.freeze()
+    report("IndicatorIndex.freeze (Bloom build)", 300000, time.perf_counter() - start, "iocs")
+
+    threat_intel = ThreatIntel.__new__(ThreatIntel) # Skip the feed files: use the synthetic index
+    threat_intel.index = index
+    threat_intel.stats = {"lookups": 0, "hits": 0, "bloom_rejected": 0, "bloom_false_positives": 0, "reloads": 0}
+    misses = [f"192.168.{rng.randint(0, 255)}.{rng.randint(1, 254)}" for _ in range(args.lines)]
+    hits = [rng.choice(listed) for _ in range(args.lines // 10)]
+    for name, values in (("misses", misses), ("hits", hits)):
+        start = time.perf_counter()
+        for value in values:
+            threat_intel.lookup(value)
+        report(f"ThreatIntel.lookup ({name})", len(values), time.perf_counter() - start, "values")
+    print(f"  {threat_intel.stats}")
+
+
+def bench_anomaly(args):
+    """Per-minute scoring of every (host, source, level) series by RateAnomalyDetector.tick."""
+    rng = random.Random(17)
+    levels = ["INFO", "WARN", "ERROR", "CRITICAL"]
+    for series in (1000, 10000, 50000):
+        now = [0.0]
+        detector = RateAnomalyDetector(lambda anomalies: None, max_series=series, warmup_minutes=5, clock=lambda: now[0])
+        detector.close() # Drive tick() by hand with a fake clock
+        entries = [LogEntry(datetime.now(), f"host-{i // len(levels)}", "System", levels[i % len(levels)], "")
+                   for i in range(series)]
+        elapsed = 0.0
+        for minute in range(1, 11):
+            for log_entry in entries:
+                for _ in range(rng.randint(1, 3)):
+                    detector.observe(log_entry)
+            now[0] = minute * 60
+            start = time.perf_counter()
+            detector.tick()
+            elapsed += time.perf_counter() - start
+        report(f"RateAnomalyDetector.tick ({series} series)", 10, elapsed, "minutes")
+
+
+def bench_storage(args):
+    """Same ingest and query workload against each storage backend (MongoDB at MONGODB_URI, SQLite in a temp dir)."""
+    parser = LogParser()
+    log_entries = [parser.parse_log_line(line) for line in build_corpus(args.lines // 4)]
+    for backend in ("sqlite", "mongodb"):
+        config = Config()
+        config.DATABASE_BACKEND = backend
+        config.WRITE_BEHIND_ENABLED = False
+        config.SPILL_QUEUE_DIR = ""
+        config.SQLITE_PATH = os.path.join(tempfile.mkdtemp(prefix="siem-bench-"), "siem.db")
+        config.MONGODB_DB_NAME = f"siem_benchmark_{os.getpid()}" # Scratch database, dropped below
+        db_client = open_database(config)
+        label = backend if backend == "sqlite" or getattr(db_client, "db", None) is not None else "in-memory" # MongoDB unreachable
+        for log_entry in log_entries:
+            log_entry._id = None
+
+        start = time.perf_counter()
+        for offset in range(0, len(log_entries), 500):
+            db_client.insert_logs(log_entries[offset:offset + 500])
+        report(f"{label}: insert_logs (batches of 500)", len(log_entries), time.perf_counter() - start, "logs")
+
+        start = time.perf_counter()
+        for i in range(1000):
+            db_client.insert_alert(Alert(timestamp=datetime.now(), severity=("High", "Medium", "Low")[i % 3],
+                                         description="benchmark", rule_name="Benchmark"))
+        report(f"{label}: insert_alert", 1000, time.perf_counter() - start, "alerts")
+
+        queries = [
+            ("get_recent_logs(100)", lambda: db_client.get_recent_logs(100)),
+            ("filter_logs(level)", lambda: db_client.filter_logs(level="WARN")),
+            ("filter_logs(source, level)", lambda: db_client.filter_logs(source="System Monitor", level="WARN")),
+            ("filter_logs(text)", lambda: db_client.filter_logs("ransomware")),
+            ("get_open_alerts(severity)", lambda: db_client.get_open_alerts("High")),
+        ]
+        for name, query in queries:
+            start = time.perf_counter()
+            for _ in range(200):
+                query()
+            report(f"{label}: {name}", 200, time.perf_counter() - start, "queries")
+
+        if getattr(db_client, "db", None) is not None:
+            db_client.client.drop_database(config.MONGODB_DB_NAME)
+        db_client.close()
+
+
+BENCHMARKS = {
+    "anomaly": bench_anomaly,
+    "classify": bench_classify,
+    "parallel": bench_parallel,
+    "parser": bench_parser,
+    "rules": bench_rules,
+    "storage": bench_storage,
+    "threat_intel": bench_threat_intel,
+    "timestamps": bench_timestamps,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Micro-benchmarks for the SIEM backend hot paths.")
+    parser.add_argument('benchmarks', nargs='*', help=f"Benchmarks to run: {', '.join(sorted(BENCHMARKS))} (default: all)")
+    parser.add_argument('--lines', type=int, default=200000, help="Number of synthetic log lines")
+    args = parser.parse_args()
+    unknown = set(args.benchmarks) - set(BENCHMARKS)
+    if unknown:
+        parser.error(f"Unknown benchmark(s): {', '.join(sorted(unknown))}")
+    for name in args.benchmarks or sorted(BENCHMARKS):
+        print(f"--- {name}: {BENCHMARKS[name].__doc__}")
+        BENCHMARKS[name](args)
+
+
+if __name__ == "__main__":
+    main()
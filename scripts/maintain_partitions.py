@@ -0,0 +1,42 @@
+# scripts/maintain_partitions.py
+
+import argparse
+import json
+import os
+import sys
+
+# Add the project root to the Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from backend.config import Config
+from backend.database.db_client import SiemDatabase
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Archive and expire daily log / network flow partitions (run from cron, in one place only).")
+    parser.add_argument('--migrate', action='store_true', help="First copy documents from the unpartitioned collections into daily partitions")
+    args = parser.parse_args()
+
+    config = Config()
+    if not config.PARTITIONING_ENABLED:
+        print("ERROR: PARTITIONING_ENABLED is not set; nothing to maintain.")
+        sys.exit(1)
+    db_client = SiemDatabase(config)
+    if db_client.db is None:
+        print("ERROR: MongoDB is unreachable.")
+        sys.exit(1)
+
+    try:
+        if args.migrate:
+            for collection_name, copied in db_client.migrate_unpartitioned().items():
+                print(f"Copied {copied} documents from '{collection_name}' into daily partitions.")
+        for collection_name, counts in db_client.maintain_partitions().items():
+            print(f"{collection_name}: {counts['archived']} partitions archived, {counts['dropped']} dropped, "
+                  f"{counts['deleted_segments']} archive segments deleted")
+        print(json.dumps(db_client.get_partition_stats(), indent=2))
+    finally:
+        db_client.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,66 +1,60 @@
 # scripts/setup_db.py
 
-# from pymongo import MongoClient, ASCENDING, DESCENDING
-# from pymongo.errors import CollectionInvalid, ConnectionFailure
+import argparse
+import os
+import sys
+
+from pymongo import MongoClient
+from pymongo.errors import ConnectionFailure
+
+# Add the project root to the Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 from backend.config import Config
+from backend.database.indexes import NETWORK_FLOWS_COLLECTION_NAME, IndexVerificationError, ensure_indexes, verify_query_shapes
+from backend.database.partitions import PartitionedCollection
+
 
 def setup_mongodb():
     """
-    Connects to MongoDB and ensures necessary collections and indexes are set up.
-    This script should be run once during project setup.
+    Connects to MongoDB, creates the indexes SiemDatabase's queries need, and explains every
+    query shape. Exits non-zero if MongoDB is unreachable or a shape still does a collection scan.
+    The API does the same at startup (DB_ENSURE_INDEXES / DB_VERIFY_QUERY_PLANS); this script
+    lets a deployment provision a database ahead of time. With PARTITIONING_ENABLED, logs and
+    network flows are provisioned and checked through today's partition, as the API does.
     """
     config = Config()
-    print(f"Attempting to connect to MongoDB at: {config.MONGO_URI}")
-
-    # --- Real MongoDB Setup (Uncomment in a real project) ---
-    # try:
-    #     client = MongoClient(config.MONGO_URI)
-    #     # The ping command is cheap and does not require auth.
-    #     client.admin.command('ping')
-    #     db = client[config.DB_NAME]
-    #     print(f"Successfully connected to MongoDB database: '{config.DB_NAME}'")
-
-    #     # Ensure 'logs' collection exists and create indexes
-    #     try:
-    #         db.create_collection(config.LOGS_COLLECTION_NAME)
-    #         print(f"Collection '{config.LOGS_COLLECTION_NAME}' created.")
-    #     except CollectionInvalid:
-    #         print(f"Collection '{config.LOGS_COLLECTION_NAME}' already exists.")
-
-    #     print(f"Ensuring indexes for '{config.LOGS_COLLECTION_NAME}'...")
-    #     db[config.LOGS_COLLECTION_NAME].create_index([("timestamp", DESCENDING)], name="timestamp_desc_idx", background=True)
-    #     db[config.LOGS_COLLECTION_NAME].create_index([("level", ASCENDING)], name="level_asc_idx", background=True)
-    #     db[config.LOGS_COLLECTION_NAME].create_index([("source", ASCENDING)], name="source_asc_idx", background=True)
-    #     db[config.LOGS_COLLECTION_NAME].create_index([("ip_address", ASCENDING)], name="ip_address_asc_idx", sparse=True, background=True)
-    #     db[config.LOGS_COLLECTION_NAME].create_index([("message", ASCENDING)], name="message_text_idx", background=True) # For full-text search conceptual
-    #     print(f"Indexes for '{config.LOGS_COLLECTION_NAME}' ensured.")
-
-    #     # Ensure 'alerts' collection exists and create indexes
-    #     try:
-    #         db.create_collection(config.ALERTS_COLLECTION_NAME)
-    #         print(f"Collection '{config.ALERTS_COLLECTION_NAME}' created.")
-    #     except CollectionInvalid:
-    #         print(f"Collection '{config.ALERTS_COLLECTION_NAME}' already exists.")
-
-    #     print(f"Ensuring indexes for '{config.ALERTS_COLLECTION_NAME}'...")
-    #     db[config.ALERTS_COLLECTION_NAME].create_index([("timestamp", DESCENDING)], name="timestamp_desc_idx", background=True)
-    #     db[config.ALERTS_COLLECTION_NAME].create_index([("severity", ASCENDING)], name="severity_asc_idx", background=True)
-    #     db[config.ALERTS_COLLECTION_NAME].create_index([("status", ASCENDING)], name="status_asc_idx", background=True)
-    #     db[config.ALERTS_COLLECTION_NAME].create_index([("alert_type", ASCENDING)], name="alert_type_asc_idx", background=True)
-    #     print(f"Indexes for '{config.ALERTS_COLLECTION_NAME}' ensured.")
-
-    #     print("\nMongoDB setup complete.")
-
-    # except ConnectionFailure as e:
-    #     print(f"ERROR: Could not connect to MongoDB. Please ensure the MongoDB server is running at {config.MONGO_URI}. Details: {e}")
-    # except Exception as e:
-    #     print(f"An unexpected error occurred during MongoDB setup: {e}")
-    # -------------------------------------------------------------
+    parser = argparse.ArgumentParser(description="Create MongoDB indexes and verify that every query shape uses one.")
+    parser.add_argument('--verify-only', action='store_true', help="Do not create indexes, only explain the query shapes")
+    args = parser.parse_args()
+
+    try:
+        client = MongoClient(config.MONGODB_URI, serverSelectionTimeoutMS=5000)
+        client.admin.command('ping')
+    except ConnectionFailure as e:
+        print(f"ERROR: Could not connect to MongoDB: {e}")
+        sys.exit(1)
+    db = client[config.MONGODB_DB_NAME]
+    print(f"Connected to MongoDB database '{config.MONGODB_DB_NAME}'.")
+
+    collections = {}
+    if config.PARTITIONING_ENABLED:
+        for collection_name in (config.LOGS_COLLECTION_NAME, NETWORK_FLOWS_COLLECTION_NAME):
+            collections[collection_name] = PartitionedCollection(db, collection_name, []).current_partition()
+
+    if not args.verify_only:
+        for collection_name, names in ensure_indexes(db, config, collections).items():
+            print(f"Indexes ensured on '{collection_name}': {', '.join(names)}")
+
+    try:
+        plans = verify_query_shapes(db, config, collections)
+    except IndexVerificationError as e:
+        print(f"ERROR: {e}")
+        sys.exit(1)
+    for name, stages in plans.items():
+        print(f"  {name:<32} {' <- '.join(stages)}")
+    print("MongoDB setup complete: every query shape uses an index.")
 
-    print("Conceptual: MongoDB setup script. No actual connection made.")
-    print("Please ensure MongoDB is running and accessible at the URI specified in backend/config.py.")
-    print("In a real project, uncomment the 'pymongo' imports and the 'Real MongoDB Setup' block.")
 
 if __name__ == "__main__":
     setup_mongodb()
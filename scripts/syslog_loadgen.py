@@ -0,0 +1,125 @@
+# scripts/syslog_loadgen.py
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+# Add the project root to the Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from backend.config import Config
+
+SAMPLE_LINES = [
+    "<38>Jun 17 10:00:05 host-b sshd[123]: [AUTH] Failed password for user loadgen from 192.168.1.10.",
+    "<14>Jun 17 10:00:15 web-server-01 apache: [WARN] High CPU usage (85%).",
+    "<11>Jun 17 10:00:20 db-server-01 postgres: [ERROR] Database connection pool exhausted.",
+    "<14>Jun 17 10:00:25 firewall-01 firewall: [INFO] Policy update applied.",
+    "<12>Jun 17 10:00:40 log-server-01 disk: [WARN] Low disk space on /var/log (90% full).",
+]
+
+
+def build_frames(count: int, framing: str) -> list:
+    frames = []
+    for i in range(count):
+        payload = SAMPLE_LINES[i % len(SAMPLE_LINES)].encode()
+        if framing == 'octet':
+            frames.append(str(len(payload)).encode() + b' ' + payload)
+        else:
+            frames.append(payload + b'\n')
+    return frames
+
+
+async def send_tcp(host: str, port: int, frames: list, chunk: int = 500):
+    _, writer = await asyncio.open_connection(host, port)
+    for i in range(0, len(frames), chunk):
+        writer.write(b''.join(frames[i:i + chunk]))
+        await writer.drain()
+    writer.close()
+    await writer.wait_closed()
+
+
+async def send_udp(host: str, port: int, frames: list, rate: int = 0, chunk: int = 50):
+    """UDP has no flow control, so an optional rate (lines/sec) keeps the kernel buffer from overflowing."""
+    loop = asyncio.get_running_loop()
+    transport, _ = await loop.create_datagram_endpoint(asyncio.DatagramProtocol, remote_addr=(host, port))
+    start = time.perf_counter()
+    for i, frame in enumerate(frames):
+        transport.sendto(frame.rstrip(b'\n'))
+        if i % chunk == 0:
+            delay = (i / rate) - (time.perf_counter() - start) if rate else 0
+            await asyncio.sleep(max(delay, 0)) # Also lets an in-process receiver run
+    transport.close()
+
+
+async def run(args):
+    frames = build_frames(args.lines, args.framing)
+    listener = None
+    if args.loopback:
+        # Measure the full receive -> parse -> insert path with an in-process listener.
+        from backend.database.db_client import open_database
+        from backend.core.log_parser import LogParser
+        from backend.core.detection_rules import DetectionRules
+        from backend.core.detection_queue import DetectionStage
+        from backend.core.syslog_listener import SyslogListener
+
+        config = Config()
+        db_client = open_database(config)
+        detection_stage = None
+        if args.with_rules:
+            detection_stage = DetectionStage(DetectionRules(db_client, config), config.DETECTION_WORKERS,
+                                             config.DETECTION_QUEUE_SIZE, config.DETECTION_BATCH_SIZE)
+        listener = SyslogListener(db_client, LogParser(), detection_stage, config, host='127.0.0.1', port=0)
+        await listener.start()
+        args.host, args.port = '127.0.0.1', listener.port
+
+    start = time.perf_counter()
+    if args.protocol == 'tcp':
+        await send_tcp(args.host, args.port, frames)
+    else:
+        await send_udp(args.host, args.port, frames, rate=args.rate)
+    sent_elapsed = time.perf_counter() - start
+    print(f"Sent {len(frames)} lines over {args.protocol.upper()} ({args.framing} framing) in {sent_elapsed:.2f}s "
+          f"({len(frames) / sent_elapsed:,.0f} lines/sec offered)")
+
+    if listener is not None:
+        # Wait until the listener has accounted for every line, or stops making progress (UDP loss).
+        last_seen, last_progress = -1, time.perf_counter()
+        while True:
+            processed = listener.stats["ingested"] + listener.stats["failed"] + listener.stats["dropped"]
+            if processed >= len(frames):
+                break
+            if processed != last_seen:
+                last_seen, last_progress = processed, time.perf_counter()
+            elif time.perf_counter() - last_progress > 2.0:
+                break
+            await asyncio.sleep(0.05)
+        elapsed = last_progress - start if processed < len(frames) else time.perf_counter() - start
+        await listener.stop()
+        ingested = listener.stats["ingested"]
+        print(f"Ingested {ingested} of {len(frames)} lines in {elapsed:.2f}s "
+              f"({ingested / elapsed:,.0f} lines/sec sustained, dropped: {listener.stats['dropped']}, "
+              f"batches: {listener.stats['batches']})")
+        if detection_stage is not None:
+            detection_stage.close()
+            print(f"Detection: {detection_stage.get_stats()}")
+
+
+def main():
+    config = Config()
+    parser = argparse.ArgumentParser(description="Syslog load generator for measuring listener throughput.")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=config.SYSLOG_LISTENER_PORT)
+    parser.add_argument('--protocol', choices=['udp', 'tcp'], default='tcp')
+    parser.add_argument('--framing', choices=['newline', 'octet'], default='newline', help="TCP framing (RFC 6587)")
+    parser.add_argument('--lines', type=int, default=100000)
+    parser.add_argument('--rate', type=int, default=0, help="UDP send rate limit in lines/sec (0 = unpaced)")
+    parser.add_argument('--loopback', action='store_true',
+                        help="Start an in-process listener on an ephemeral port and report end-to-end lines/sec")
+    parser.add_argument('--with-rules', action='store_true', help="Run detection rules in loopback mode")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == '__main__':
+    main()
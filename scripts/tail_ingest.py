@@ -0,0 +1,348 @@
+# scripts/tail_ingest.py
+
+import argparse
+import glob
+import json
+import mmap
+import os
+import signal
+import sys
+import time
+from typing import Dict, Iterator, List, Optional, Tuple
+
+# Add the project root to the Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from backend.config import Config
+from backend.database.db_client import SiemDatabase, open_database
+from backend.core.log_parser import LogParser
+from backend.core.parallel_parser import ParallelLogParser
+from backend.core.detection_rules import DetectionRules
+from backend.core.detection_queue import DetectionStage
+
+READ_WINDOW_BYTES = 16 * 1024 * 1024 # Bytes mapped and split per read; bounds memory on multi-GB backfills
+
+
+def iter_line_batches(mapped: mmap.mmap, start: int, end: int, batch_size: int,
+                      include_partial: bool = False) -> Iterator[Tuple[List[str], int]]:
+    """
+    Splits mapped[start:end] into batches of decoded lines. Yields (lines, end_offset), where
+    end_offset is the byte offset just past the batch's last newline, i.e. the checkpoint to
+    store once the batch is safely written. Lines are located with mmap.find and decoded
+    straight from a memoryview of the map, so no intermediate bytes copies are made.
+    A trailing line without a newline is only emitted when include_partial is set
+    (the file was rotated away and will not grow any more).
+    """
+    view = memoryview(mapped)
+    try:
+        lines: List[str] = []
+        position = start
+        while position < end:
+            newline = mapped.find(b'\n', position, end)
+            if newline == -1:
+                if not include_partial:
+                    break
+                newline = end
+            line_end = newline - 1 if newline > position and mapped[newline - 1] == 13 else newline # Drop '\r'
+            if line_end > position:
+                lines.append(str(view[position:line_end], 'utf-8', 'replace'))
+            position = min(newline + 1, end)
+            if len(lines) >= batch_size:
+                yield lines, position
+                lines = []
+        if lines or position != start:
+            yield lines, position
+    finally:
+        view.release()
+
+
+class TailedFile:
+    """
+    Follows one path across rotations. Identity is (device, inode): when the path starts
+    pointing at a new file (rename-style rotation), the old file is drained to EOF through
+    its still-open descriptor before switching. A file shrinking below the read offset
+    (copytruncate-style rotation) is read again from the start.
+    """
+
+    def __init__(self, path: str, checkpoint: Optional[Dict] = None, from_end: bool = False):
+        self.path = path
+        self.file = None
+        self.identity: Optional[Tuple[int, int]] = None
+        self.offset = 0
+        self.pending_rotated = None # (file, offset) of a rotated-away file found at startup
+        self.bytes_read = 0
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return
+        if checkpoint and (checkpoint.get("device"), checkpoint.get("inode")) != (stat.st_dev, stat.st_ino):
+            # Rotated while we were not running: finish the old file first if it is still around.
+            rotated_path = self._find_by_identity(checkpoint.get("device"), checkpoint.get("inode"))
+            if rotated_path:
+                print(f"Tail ingest: {path} rotated while stopped; draining {rotated_path} from offset {checkpoint['offset']}.")
+                self.pending_rotated = (open(rotated_path, 'rb'), checkpoint["offset"])
+            checkpoint = None
+        self._open()
+        if checkpoint:
+            self.offset = checkpoint["offset"] if checkpoint["offset"] <= stat.st_size else 0 # Shrunk: truncated
+        elif from_end:
+            self.offset = stat.st_size
+
+    def _find_by_identity(self, device, inode) -> Optional[str]:
+        directory = os.path.dirname(os.path.abspath(self.path))
+        try:
+            for entry in os.scandir(directory):
+                if entry.is_file(follow_symlinks=False):
+                    stat = entry.stat(follow_symlinks=False)
+                    if (stat.st_dev, stat.st_ino) == (device, inode):
+                        return entry.path
+        except OSError:
+            pass
+        return None
+
+    def _open(self):
+        self.file = open(self.path, 'rb')
+        stat = os.fstat(self.file.fileno())
+        self.identity = (stat.st_dev, stat.st_ino)
+        self.offset = 0
+
+    def checkpoint(self, offset: int) -> Dict:
+        return {"device": self.identity[0], "inode": self.identity[1], "offset": offset}
+
+    @staticmethod
+    def _read(file, start: int, batch_size: int, include_partial: bool) -> Iterator[Tuple[List[str], int]]:
+        size = os.fstat(file.fileno()).st_size
+        while start < size:
+            window_end = min(start + READ_WINDOW_BYTES, size)
+            try:
+                mapped = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:
+                return # Truncated to zero length since the fstat
+            with mapped:
+                if window_end < size: # Cut the window at a line boundary
+                    cut = mapped.rfind(b'\n', start, window_end)
+                    window_end = cut + 1 if cut != -1 else size
+                last_offset = start
+                for lines, last_offset in iter_line_batches(mapped, start, window_end, batch_size,
+                                                            include_partial and window_end == size):
+                    yield lines, last_offset
+            if last_offset == start:
+                return # Only an incomplete line is left
+            start = last_offset
+
+    def poll(self, batch_size: int) -> Iterator[Tuple[List[str], Optional[Dict]]]:
+        """Yields (lines, checkpoint after those lines) for everything new since the last poll."""
+        if self.pending_rotated is not None:
+            rotated_file, rotated_offset = self.pending_rotated
+            for lines, offset in self._read(rotated_file, rotated_offset, batch_size, include_partial=True):
+                yield lines, None
+                self.bytes_read += offset - rotated_offset
+                rotated_offset = offset # Position in the old file is not checkpointed; the current file starts at 0
+            rotated_file.close()
+            self.pending_rotated = None
+
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            stat = None # Rotated away and not recreated yet
+        if self.file is None:
+            if stat is None:
+                return
+            self._open()
+        elif stat is not None and (stat.st_dev, stat.st_ino) != self.identity:
+            # Rename-style rotation: drain the old file through the open descriptor, then switch.
+            for lines, offset in self._read(self.file, self.offset, batch_size, include_partial=True):
+                yield lines, self.checkpoint(offset)
+                self.bytes_read += offset - self.offset
+                self.offset = offset # Only advanced once the caller has stored the batch
+            self.file.close()
+            print(f"Tail ingest: {self.path} rotated; following the new file.")
+            self._open()
+        elif os.fstat(self.file.fileno()).st_size < self.offset:
+            print(f"Tail ingest: {self.path} was truncated; reading from the start.")
+            self.offset = 0
+
+        for lines, offset in self._read(self.file, self.offset, batch_size, include_partial=False):
+            yield lines, self.checkpoint(offset)
+            self.bytes_read += offset - self.offset
+            self.offset = offset # Only advanced once the caller has stored the batch
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+        if self.pending_rotated is not None:
+            self.pending_rotated[0].close()
+
+
+class TailIngestor:
+    """Follows a set of files (glob patterns re-expanded on every poll) and ingests new lines in batches."""
+
+    def __init__(self, patterns: List[str], checkpoint_path: str, db_client: SiemDatabase, parse_lines,
+                 detection_stage: Optional[DetectionStage], batch_size: int, checkpoint_interval: float, from_end: bool):
+        self.patterns = patterns
+        self.checkpoint_path = checkpoint_path
+        self.db_client = db_client
+        self.parse_lines = parse_lines
+        self.detection_stage = detection_stage
+        self.batch_size = batch_size
+        self.checkpoint_interval = checkpoint_interval
+        self.from_end = from_end
+        self.checkpoints: Dict[str, Dict] = self._load_checkpoints()
+        self.files: Dict[str, TailedFile] = {}
+        self._last_checkpoint_write = time.monotonic()
+        self._dirty = False
+        self.stopping = False
+        self.stats = {"lines": 0, "ingested": 0, "failed": 0}
+
+    def _load_checkpoints(self) -> Dict[str, Dict]:
+        try:
+            with open(self.checkpoint_path) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except ValueError as e:
+            print(f"WARNING: Ignoring unreadable checkpoint file {self.checkpoint_path}: {e}")
+            return {}
+
+    def save_checkpoints(self):
+        """Atomically replaces the checkpoint file (write temp file, fsync, rename)."""
+        tmp_path = self.checkpoint_path + ".tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(self.checkpoints, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.checkpoint_path)
+        self._last_checkpoint_write = time.monotonic()
+        self._dirty = False
+
+    def _discover(self):
+        for pattern in self.patterns:
+            for path in glob.glob(pattern):
+                if path not in self.files and os.path.isfile(path):
+                    self.files[path] = TailedFile(path, self.checkpoints.get(path), self.from_end)
+                    print(f"Tail ingest: following {path} from offset {self.files[path].offset}")
+
+    def _ingest(self, path: str, lines: List[str]) -> bool:
+        """
+        Parses and stores one batch, retrying while the database is unreachable or rejects the
+        whole batch. Returns False if asked to stop before the batch could be stored (it is then
+        not checkpointed).
+        """
+        log_entries = self.parse_lines(lines, path) # The path is the origin: one cached format per file
+        while True:
+            try:
+                inserted_ids = self.db_client.insert_logs(log_entries)
+                if not log_entries or any(inserted_ids):
+                    break
+                error = "no line was stored"
+            except Exception as e:
+                error = e
+            print(f"ERROR: Tail ingest failed to store {len(log_entries)} lines from {path}: {error}; retrying in 5s.")
+            if self.stopping:
+                return False
+            time.sleep(5)
+        ingested = sum(1 for inserted_id in inserted_ids if inserted_id)
+        self.stats["lines"] += len(lines)
+        self.stats["ingested"] += ingested
+        self.stats["failed"] += len(lines) - ingested
+        if self.detection_stage is not None:
+            self.detection_stage.submit_many(log_entries)
+        return True
+
+    def poll_once(self) -> int:
+        """Ingests everything currently available. Returns the number of lines read."""
+        self._discover()
+        read = 0
+        for path, tailed in list(self.files.items()):
+            for lines, checkpoint in tailed.poll(self.batch_size):
+                if lines:
+                    if not self._ingest(path, lines):
+                        return read
+                    read += len(lines)
+                if checkpoint is not None:
+                    self.checkpoints[path] = checkpoint
+                    self._dirty = True
+                if self._dirty and time.monotonic() - self._last_checkpoint_write >= self.checkpoint_interval:
+                    self.save_checkpoints()
+                if self.stopping:
+                    return read
+        if self._dirty:
+            self.save_checkpoints()
+        return read
+
+    def run(self, poll_interval: float, once: bool):
+        start = time.perf_counter()
+        try:
+            while not self.stopping:
+                read = self.poll_once()
+                if once and not read:
+                    break
+                if not read:
+                    time.sleep(poll_interval)
+        finally:
+            if self._dirty:
+                self.save_checkpoints()
+            for tailed in self.files.values():
+                tailed.close()
+            elapsed = time.perf_counter() - start
+            bytes_read = sum(tailed.bytes_read for tailed in self.files.values())
+            print(f"Tail ingest stopped after {elapsed:.1f}s: {self.stats['lines']} lines "
+                  f"({self.stats['lines'] / elapsed if elapsed else 0:,.0f} lines/sec, "
+                  f"{bytes_read / elapsed / 1e6 if elapsed else 0:,.1f} MB/sec), "
+                  f"ingested: {self.stats['ingested']}, failed: {self.stats['failed']}")
+
+
+def main():
+    config = Config()
+    parser = argparse.ArgumentParser(description="Follow log files and ingest new lines in batches, resuming from byte-offset checkpoints.")
+    parser.add_argument('paths', nargs='+', help="Files or glob patterns (quoted), e.g. '/var/log/*.log'")
+    parser.add_argument('--checkpoint', default='tail_ingest_checkpoints.json', help="Checkpoint file (byte offsets per path)")
+    parser.add_argument('--batch-size', type=int, default=config.INGEST_BATCH_SIZE, help="Lines per bulk insert")
+    parser.add_argument('--poll-interval', type=float, default=1.0, help="Seconds between polls when idle")
+    parser.add_argument('--checkpoint-interval', type=float, default=1.0,
+                        help="Max seconds between checkpoint writes (a crash re-ingests at most this much)")
+    parser.add_argument('--from-end', action='store_true', help="Start files without a checkpoint at their end instead of backfilling")
+    parser.add_argument('--once', action='store_true', help="Exit once everything currently in the files is ingested")
+    parser.add_argument('--parse-workers', type=int, default=config.PARSE_WORKERS, help="Parser processes (0/1 = in-process)")
+    parser.add_argument('--with-rules', action='store_true', help="Run detection rules on ingested lines")
+    args = parser.parse_args()
+
+    db_client = open_database(config)
+    if isinstance(db_client, SiemDatabase) and db_client.db is None and db_client.spill_queue is None:
+        # Mock storage is lost on exit, but the checkpoints would still advance past the lines
+        print("ERROR: MongoDB is unreachable and neither SPILL_QUEUE_DIR nor DATABASE_BACKEND=sqlite is configured; "
+              "refusing to ingest into volatile in-memory storage.")
+        db_client.close()
+        sys.exit(1)
+    log_parser = LogParser()
+    if args.parse_workers > 1:
+        parallel_parser = ParallelLogParser(args.parse_workers, config.PARSE_CHUNK_LINES, log_parser)
+        parse_lines = lambda lines, origin: parallel_parser.parse_lines(lines, origin)
+    else:
+        parallel_parser = None
+        parse_lines = lambda lines, origin: [log_parser.parse_log_line(line, origin) for line in lines]
+    detection_stage = None
+    if args.with_rules:
+        detection_stage = DetectionStage(DetectionRules(db_client, config), config.DETECTION_WORKERS,
+                                         config.DETECTION_QUEUE_SIZE, config.DETECTION_BATCH_SIZE)
+
+    ingestor = TailIngestor(args.paths, args.checkpoint, db_client, parse_lines, detection_stage,
+                            args.batch_size, args.checkpoint_interval, args.from_end)
+
+    def request_stop(signum, frame):
+        ingestor.stopping = True
+    signal.signal(signal.SIGINT, request_stop)
+    signal.signal(signal.SIGTERM, request_stop)
+
+    try:
+        ingestor.run(args.poll_interval, args.once)
+    finally:
+        if parallel_parser is not None:
+            parallel_parser.close()
+        if detection_stage is not None:
+            detection_stage.close() # Runs the rules over whatever is still queued
+        db_client.close()
+
+
+if __name__ == '__main__':
+    main()